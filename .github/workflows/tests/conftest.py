@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models import Category, Post, Reply, User
+
+
+@pytest.fixture
+def app():
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="testuser")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_client(client, user):
+    client.post(
+        "/api/auth/login",
+        json={"username": "testuser", "password": "password123"},
+    )
+    return client
+
+
+@pytest.fixture
+def category(app):
+    category = Category(name="Match Discussions")
+    db.session.add(category)
+    db.session.commit()
+    return category
+
+
+@pytest.fixture
+def post(user, category):
+    post = Post(
+        title="Test Post",
+        content="This is a test post.",
+        user_id=user.id,
+        category_id=category.id,
+    )
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+@pytest.fixture
+def reply(user, post):
+    reply = Reply(
+        content="This is a test reply.", user_id=user.id, post_id=post.id
+    )
+    db.session.add(reply)
+    db.session.commit()
+    return reply
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the engine while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a callable that runs ``fn`` and reports how many queries ran."""
+
+    def run(fn):
+        counter = QueryCounter()
+        event.listen(db.engine, "before_cursor_execute", counter)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", counter)
+        return counter.count, result
+
+    return run
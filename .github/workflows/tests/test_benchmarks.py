@@ -0,0 +1,23 @@
+from benchmarks.suite import SCALES, compare, load_baseline, run_scenarios
+
+from app import create_app
+from app.extensions import db
+from app.seed import seed
+
+
+def test_endpoints_stay_within_query_budgets():
+    # Not the app fixture: its app context would be shared by every
+    # request, and with it Flask-Login's cached user
+    app = create_app("testing")
+    with app.app_context():
+        seed(**SCALES["1k"], log=lambda message: None)
+    results = run_scenarios(app, iterations=20)
+
+    budgets = {
+        name: {"queries": metrics["queries"], "p95_ms": float("inf"),
+               "peak_kb": float("inf")}
+        for name, metrics in load_baseline()["1k"].items()
+    }
+    assert compare(results, budgets) == []
+    with app.app_context():
+        db.drop_all()
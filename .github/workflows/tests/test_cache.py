@@ -0,0 +1,48 @@
+from app.cache import LRUCache
+from app.extensions import payload_cache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats() == {"size": 2, "evictions": 1}
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_size=2, ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_get_post_is_served_from_cache(client, post, count_queries):
+    url = f"/api/posts/{post.id}"
+    cold, _ = count_queries(lambda: client.get(url))
+    warm, response = count_queries(lambda: client.get(url))
+
+    assert response.get_json()["title"] == "Test Post"
+    assert warm < cold
+    assert payload_cache.stats()["hits"] == 1
+    assert payload_cache.stats()["misses"] == 1
+
+
+def test_reply_invalidates_cached_post(auth_client, post):
+    auth_client.get(f"/api/posts/{post.id}")
+    auth_client.post(f"/api/posts/{post.id}/replies", json={"content": "hi"})
+
+    data = auth_client.get(f"/api/posts/{post.id}").get_json()
+    assert [reply["content"] for reply in data["replies"]] == ["hi"]
+
+
+def test_vote_updates_cached_post(auth_client, post):
+    auth_client.get(f"/api/posts/{post.id}")
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+
+    data = auth_client.get(f"/api/posts/{post.id}").get_json()
+    assert data["vote_count"] == 1
+    assert data["user_vote"] == 1
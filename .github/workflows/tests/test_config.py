@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from config import env_flag
+from app.extensions import db
+
+
+def test_production_profile_tunes_sqlite(tmp_path):
+    app = create_app(
+        "production",
+        {
+            "SECRET_KEY": "test",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'forum.db'}",
+        },
+    )
+    with app.app_context():
+        def pragma(name):
+            return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert db.engine.pool.size() == 10
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_production_profile_requires_secret_key():
+    with pytest.raises(RuntimeError):
+        create_app("production", {"SECRET_KEY": None})
+
+
+def test_production_profile_hides_metrics(tmp_path):
+    app = create_app(
+        "production",
+        {
+            "SECRET_KEY": "test",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'forum.db'}",
+            "SCHEMA_AUTO_UPGRADE": True,
+        },
+    )
+    assert app.test_client().get("/metrics").status_code == 404
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, False), ("", False), ("0", False), ("1", True), ("True", True),
+])
+def test_env_flag(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("METRICS_ENABLED", raising=False)
+    else:
+        monkeypatch.setenv("METRICS_ENABLED", value)
+    assert env_flag("METRICS_ENABLED") is expected
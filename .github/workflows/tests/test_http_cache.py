@@ -0,0 +1,49 @@
+def test_get_post_revalidates_with_etag(client, post):
+    response = client.get(f"/api/posts/{post.id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+    response = client.get(
+        f"/api/posts/{post.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_reply_changes_post_and_list_validators(auth_client, post):
+    post_etag = auth_client.get(f"/api/posts/{post.id}").headers["ETag"]
+    list_etag = auth_client.get("/api/posts").headers["ETag"]
+
+    auth_client.post(f"/api/posts/{post.id}/replies", json={"content": "hi"})
+
+    response = auth_client.get(
+        f"/api/posts/{post.id}", headers={"If-None-Match": post_etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    response = auth_client.get(
+        "/api/posts", headers={"If-None-Match": list_etag}
+    )
+    assert response.status_code == 200
+
+
+def test_get_posts_honours_if_modified_since(client, post):
+    response = client.get("/api/posts")
+    last_modified = response.headers["Last-Modified"]
+
+    response = client.get(
+        "/api/posts", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+
+def test_get_categories_is_cacheable(client, category):
+    response = client.get("/api/categories")
+    assert response.get_json() == [category.to_dict()]
+    assert "max-age=300" in response.headers["Cache-Control"]
+
+    response = client.get(
+        "/api/categories",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
@@ -0,0 +1,110 @@
+import copy
+import logging
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app.extensions import db
+from app.models import Category
+
+
+def test_server_timing_reports_queries(client, post, count_queries):
+    url = f"/api/posts/{post.id}"
+    queries, response = count_queries(lambda: client.get(url))
+
+    db_part, app_part = response.headers["Server-Timing"].split(", ")
+    assert db_part.startswith("db;dur=")
+    assert db_part.endswith(f';desc="{queries} queries"')
+    assert app_part.startswith("app;dur=")
+
+
+def test_request_log_has_structured_fields(client, category, caplog):
+    with caplog.at_level(logging.INFO, logger="app.instrumentation"):
+        client.get("/api/categories")
+
+    record = next(
+        record for record in caplog.records
+        if getattr(record, "endpoint", None) == "categories.get_categories"
+    )
+    assert record.status == 200
+    assert record.db_queries >= 1
+    assert record.db_ms >= 0
+
+
+@pytest.fixture
+def slow_app():
+    app = create_app(
+        "testing", {"SLOW_QUERY_MS": 0, "N_PLUS_ONE_THRESHOLD": 3}
+    )
+
+    @app.route("/each-category")
+    def each_category():
+        ids = db.session.scalars(select(Category.id)).all()
+        names = [
+            db.session.scalar(select(Category.name).where(Category.id == id_))
+            for id_ in ids
+        ]
+        return {"names": names}
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            Category(name=name) for name in ("Golf", "Rugby", "Tennis")
+        )
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def test_slow_query_is_logged_with_plan(slow_app, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        slow_app.test_client().get("/api/categories")
+
+    slow = [
+        record for record in caplog.records
+        if record.getMessage().startswith("Slow query")
+    ]
+    assert slow
+    message = slow[0].getMessage()
+    assert "FROM category" in message
+    assert "Plan:\nSCAN category" in message
+    assert slow[0].endpoint == "categories.get_categories"
+
+
+def test_repeated_statement_is_flagged(slow_app, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        slow_app.test_client().get("/each-category")
+
+    flagged = [
+        record for record in caplog.records
+        if record.getMessage().startswith("Possible N+1")
+    ]
+    assert len(flagged) == 1
+    assert flagged[0].repeats == 3
+    assert "WHERE category.id = ?" in flagged[0].statement
+
+
+def test_failed_statements_leave_no_timing_state(app, count_queries):
+    connection = db.session.connection()
+    info = copy.deepcopy(connection.info)
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+    assert connection.info == info
+
+    queries, _ = count_queries(
+        lambda: db.session.execute(select(Category.id)).all()
+    )
+    assert queries == 1
+
+
+def test_instrumentation_can_be_disabled():
+    app = create_app("testing", {"SQL_INSTRUMENTATION": False})
+    with app.app_context():
+        db.create_all()
+        response = app.test_client().get("/api/categories")
+        db.drop_all()
+    assert "Server-Timing" not in response.headers
@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app import create_app
+from app.extensions import db, metrics
+from app.metrics import render
+
+
+def _sample(text, line_start):
+    """Value of the first exposition line starting with ``line_start``."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {line_start!r} in:\n{text}")
+
+
+def test_requests_are_counted_per_endpoint(client, post):
+    client.get("/api/posts")
+    client.get("/api/posts")
+    client.get("/api/posts/999999")
+
+    response = client.get("/metrics")
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert _sample(
+        text,
+        'forum_http_requests_total{endpoint="posts.get_posts",'
+        'method="GET",status="200"}',
+    ) == 2
+    assert _sample(
+        text,
+        'forum_http_requests_total{endpoint="posts.get_post",'
+        'method="GET",status="404"}',
+    ) == 1
+    assert _sample(
+        text,
+        'forum_http_request_duration_seconds_count{'
+        'endpoint="posts.get_posts",method="GET"}',
+    ) == 2
+    assert _sample(
+        text,
+        'forum_http_request_duration_seconds_bucket{'
+        'endpoint="posts.get_posts",method="GET",le="+Inf"}',
+    ) == 2
+    # The scrape itself is the one request in flight
+    assert _sample(
+        text,
+        'forum_http_requests_in_flight{endpoint="main.prometheus_metrics"}',
+    ) == 1
+    assert 'forum_cache_misses_total{cache="payload"}' in text
+
+
+def test_histogram_buckets_are_cumulative(app):
+    metrics.observe("posts.get_posts", "GET", 200, 0.003)
+    metrics.observe("posts.get_posts", "GET", 200, 0.2)
+    metrics.observe("posts.get_posts", "BREW", 418, 60)
+
+    text = render(metrics.samples())
+    prefix = (
+        "forum_http_request_duration_seconds_bucket"
+        '{endpoint="posts.get_posts",method="GET",'
+    )
+    assert _sample(text, prefix + 'le="0.005"}') == 1
+    assert _sample(text, prefix + 'le="0.1"}') == 1
+    assert _sample(text, prefix + 'le="0.25"}') == 2
+    assert _sample(text, prefix + 'le="+Inf"}') == 2
+    # Unknown methods share one label value
+    assert 'method="other",status="418"' in text
+
+
+@pytest.fixture
+def shared_app(tmp_path):
+    app = create_app(
+        "testing",
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'forum.db'}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {},
+            "METRICS_DIR": str(tmp_path / "metrics"),
+        },
+    )
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+def _serve_one_request(app):
+    app.test_client().get("/health")
+    metrics.write()
+
+
+def test_workers_are_aggregated(shared_app):
+    worker = multiprocessing.get_context("fork").Process(
+        target=_serve_one_request, args=(shared_app,)
+    )
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
+
+    client = shared_app.test_client()
+    client.get("/health")
+    text = client.get("/metrics").get_data(as_text=True)
+
+    snapshots = os.listdir(shared_app.config["METRICS_DIR"])
+    assert f"metrics-{worker.pid}.json" in snapshots
+    # The exited worker's requests still count
+    assert _sample(
+        text,
+        'forum_http_requests_total{endpoint="health_check",method="GET",'
+        'status="200"}',
+    ) == 2
+    # Gauges of exited workers are dropped: one pool, not two
+    assert _sample(text, 'forum_db_pool_size{engine="primary"}') == 5
+    assert 'forum_db_pool_connections{engine="primary",state="in_use"}' in text
+
+
+def test_metrics_can_be_disabled():
+    app = create_app("testing", {"METRICS_ENABLED": False})
+    assert app.test_client().get("/metrics").status_code == 404
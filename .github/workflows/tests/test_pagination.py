@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Category, Post
+
+
+def _cursor(values) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.fixture
+def feed(user, category):
+    """Posts in two categories with many shared timestamps; returns the
+    second category's id."""
+    other = Category(name="Transfers")
+    db.session.add(other)
+    db.session.flush()
+    start = datetime(2024, 3, 1, 18, 0)
+    db.session.add_all(
+        Post(
+            title=f"Post {i}",
+            content="Feed",
+            user_id=user.id,
+            category_id=category.id if i % 3 else other.id,
+            # Three posts per minute, so pages split ties
+            timestamp=start + timedelta(minutes=i // 3),
+        )
+        for i in range(25)
+    )
+    db.session.commit()
+    return other.id
+
+
+def _all_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        query = f"&cursor={cursor}" if cursor else ""
+        page = client.get(f"{url}{query}").get_json()
+        ids.extend(post["id"] for post in page["posts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def _expected(category_id=None, key=lambda post: post.timestamp):
+    query = Post.query
+    if category_id:
+        query = query.filter_by(category_id=category_id)
+    posts = query.all()
+    return [
+        post.id for post in sorted(
+            posts, key=lambda post: (key(post), post.id), reverse=True
+        )
+    ]
+
+
+def test_feed_pages_cover_every_post_once(client, feed):
+    ids = _all_pages(client, "/api/posts?sort=new&limit=4")
+    assert ids == _expected()
+    assert len(ids) == len(set(ids)) == 25
+
+
+def test_category_feed_pages_cover_its_posts_once(client, category, feed):
+    for category_id in (category.id, feed):
+        ids = _all_pages(
+            client, f"/api/posts?sort=new&limit=2&category_id={category_id}"
+        )
+        assert ids == _expected(category_id)
+
+
+@pytest.mark.parametrize("sort", ["hot", "top"])
+def test_ranked_feeds_page_through_tied_scores(client, feed, sort):
+    # Every post has score 0, so ids alone break the ties
+    ids = _all_pages(client, f"/api/posts?sort={sort}&limit=3")
+    assert len(ids) == len(set(ids)) == 25
+
+
+def test_last_page_has_no_cursor(client, feed):
+    page = client.get("/api/posts?limit=25").get_json()
+    assert len(page["posts"]) == 25
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    _cursor([[1], [2]]),
+    _cursor({"timestamp": "2024-03-01T18:00:00", "id": 1}),
+    _cursor(["2024-03-01T18:00:00"]),
+    _cursor(["yesterday", 1]),
+    _cursor(["2024-03-01T18:00:00", "1"]),
+    _cursor(["2024-03-01T18:00:00", True]),
+    _cursor(["2024-03-01T18:00:00", [1]]),
+])
+def test_tampered_cursors_are_rejected(client, post, cursor):
+    response = client.get(f"/api/posts?sort=new&cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("url", [
+    "/api/posts?sort=hot&cursor={}",
+    "/api/posts?sort=top&t=week&cursor={}",
+    "/api/posts/{post_id}/replies?cursor={}",
+    "/api/posts/{post_id}/replies?sort=top&cursor={}",
+])
+def test_cursors_of_the_wrong_type_are_rejected(client, post, url):
+    for values in ([[1], [2]], [{"a": 1}, 2], [float("nan"), 1]):
+        cursor = _cursor(values)
+        response = client.get(
+            url.replace("{post_id}", str(post.id)).format(cursor)
+        )
+        assert response.status_code == 400
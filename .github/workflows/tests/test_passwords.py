@@ -0,0 +1,49 @@
+import threading
+
+from app.extensions import db, password_hasher
+from app.models import User
+
+
+def login(client):
+    return client.post(
+        "/api/auth/login",
+        json={"username": "testuser", "password": "password123"},
+    )
+
+
+def test_login_upgrades_outdated_hash(app, client, user):
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    password_hasher.init_app(app)
+    assert user.password_needs_rehash()
+
+    assert login(client).status_code == 200
+    db.session.expire_all()
+    stored = db.session.get(User, user.id)
+    assert stored.password_hash.startswith("pbkdf2:sha256:2000$")
+    assert stored.check_password("password123")
+    assert not stored.password_needs_rehash()
+
+
+def test_login_is_refused_when_hashing_pool_is_full(app, client, user):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_DEPTH=0)
+    password_hasher.init_app(app)
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold_worker():
+        started.set()
+        release.wait()
+
+    holder = threading.Thread(target=password_hasher.run, args=(hold_worker,))
+    holder.start()
+    started.wait()
+    try:
+        response = login(client)
+    finally:
+        release.set()
+        holder.join()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert password_hasher.stats()["rejected"] == 1
+    assert login(client).status_code == 200
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.profiling import PROFILE_HEADER, profile_token
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        "testing",
+        {"PROFILING": True, "PROFILE_DIR": str(tmp_path / "profiles")},
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin(app):
+    admin = User(username="admin", is_admin=True)
+    admin.set_password("password123")
+    db.session.add(admin)
+    db.session.commit()
+    return admin
+
+
+def _dumps(app):
+    return sorted(os.listdir(app.config["PROFILE_DIR"]))
+
+
+def _login(client, username):
+    client.post(
+        "/api/auth/login",
+        json={"username": username, "password": "password123"},
+    )
+
+
+def test_sampled_request_is_profiled(app, post):
+    app.config["PROFILE_SAMPLE_RATE"] = 1
+    response = app.test_client().get("/api/posts")
+
+    queries = response.headers["Server-Timing"].split('desc="')[1].split()[0]
+    (dump,) = _dumps(app)
+    assert dump.startswith(f"posts.get_posts--q{queries}--")
+    assert dump.endswith(".prof")
+
+
+def test_requests_without_token_are_not_profiled(client, post):
+    client.get("/api/posts", headers={PROFILE_HEADER: "not-a-token"})
+    assert _dumps(client.application) == []
+
+
+def test_admin_token_profiles_request(app, admin):
+    client = app.test_client()
+    _login(client, "admin")
+    token = profile_token(app, admin.id)
+
+    client.get("/api/categories")
+    assert _dumps(app) == []
+    client.get("/api/categories", headers={PROFILE_HEADER: token})
+    client.get(f"/api/posts?profile={token}")
+
+    dumps = _dumps(app)
+    assert [dump.split("--")[0] for dump in dumps] == [
+        "categories.get_categories",
+        "posts.get_posts",
+    ]
+
+
+def test_token_requires_its_admin(app, admin, user):
+    token = profile_token(app, admin.id)
+    client = app.test_client()
+    client.get("/api/posts", headers={PROFILE_HEADER: token})
+    _login(client, "testuser")
+    client.get("/api/posts", headers={PROFILE_HEADER: token})
+
+    assert _dumps(app) == []
+
+
+def test_report_aggregates_per_endpoint(app, post):
+    app.config["PROFILE_SAMPLE_RATE"] = 1
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/api/posts")
+    client.get("/api/categories")
+
+    result = app.test_cli_runner().invoke(args=["profile", "report"])
+    assert result.exit_code == 0, result.output
+    assert "== posts.get_posts: 3 requests" in result.output
+    assert "== categories.get_categories: 1 requests" in result.output
+    assert "get_posts" in result.output
+
+
+def test_token_command_only_serves_admins(app, admin, user):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["profile", "token", "admin"])
+    assert result.exit_code == 0
+    assert result.output.strip()
+
+    result = runner.invoke(args=["profile", "token", "testuser"])
+    assert result.exit_code != 0
+    assert "not an admin" in result.output
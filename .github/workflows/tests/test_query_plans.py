@@ -0,0 +1,213 @@
+import pytest
+from sqlalchemy import event, func, select
+
+from app import create_app
+from app.extensions import db, payload_cache
+from app.models import Category, Post, Reply, User
+from app.seed import SEED_PASSWORD, seed
+from app.votes import rebuild_vote_totals
+
+# Tables a hot query may read whole: the category list is a handful of
+# rows that is always listed in full
+SMALL_TABLES = {"category"}
+
+# Hot requests as (method, URL, JSON body); URLs are formatted with the ids
+# from the seeded fixture
+HOT_REQUESTS = [
+    ("get", "/api/posts?sort=new", None),
+    ("get", "/api/posts?sort=hot", None),
+    ("get", "/api/posts?sort=top", None),
+    ("get", "/api/posts?sort=top&t=week", None),
+    ("get", "/api/posts?view=full", None),
+    ("get", "/api/posts?sort=new&category_id={category_id}", None),
+    ("get", "/api/posts?sort=hot&category_id={category_id}", None),
+    ("get", "/api/posts?sort=top&category_id={category_id}", None),
+    ("get", "/api/posts?sort=top&t=week&category_id={category_id}", None),
+    ("get", "/api/posts/{post_id}", None),
+    ("get", "/api/posts/{post_id}/replies", None),
+    ("get", "/api/posts/{post_id}/replies?sort=top", None),
+    ("get", "/api/posts/{post_id}/replies?view=tree", None),
+    ("get", "/api/replies/{reply_id}/thread", None),
+    ("get", "/api/categories", None),
+    ("get", "/api/search?q=match", None),
+    ("post", "/api/posts/{post_id}/vote", {"value": 1}),
+    ("post", "/api/replies/{reply_id}/vote", {"value": -1}),
+    ("post", "/api/posts/{post_id}/replies",
+     {"content": "Answer", "parent_id": "{reply_id}"}),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """An app with a small seeded forum and a logged-in client; returns
+    ``(app, client, ids)``."""
+    # Not the app fixture: its app context would be shared by every
+    # request, and with it Flask-Login's cached user
+    app = create_app("testing")
+    with app.app_context():
+        seed(50, 100, 400, 1000, 400, log=lambda message: None)
+        post_id = db.session.scalar(
+            select(Post.id).order_by(Post.reply_count.desc()).limit(1)
+        )
+        ids = {
+            "post_id": post_id,
+            "reply_id": db.session.scalar(
+                select(Reply.id).where(
+                    Reply.post_id == post_id, Reply.path == ""
+                ).limit(1)
+            ),
+            "category_id": db.session.scalar(select(func.min(Category.id))),
+        }
+        username = db.session.scalar(select(func.min(User.username)))
+
+    client = app.test_client()
+    client.post(
+        "/api/auth/login",
+        json={"username": username, "password": SEED_PASSWORD},
+    )
+    yield app, client, ids
+    with app.app_context():
+        db.drop_all()
+
+
+def _capture(app, fn) -> list:
+    """Run ``fn`` and return the statements it sent as ``(sql, params)``."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, many):
+        if not many and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE", "WITH")
+        ):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def _plan(app, statement, parameters) -> list:
+    with app.app_context():
+        rows = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+    return [row[3] for row in rows]
+
+
+def full_scans(plan, limited=False) -> set:
+    """Tables a query plan reads in full.
+
+    That is a bare ``SCAN t``, or ``SCAN t USING INDEX i`` unless the
+    query is ``limited``: then the index is walked in the order the query
+    wants and the walk stops at the LIMIT. ``SCAN t VIRTUAL TABLE`` is
+    full-text search, and subqueries scanned by name are not tables.
+    """
+    subqueries = {
+        detail.split()[1] for detail in plan
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    tables = set()
+    for detail in plan:
+        words = detail.split()
+        if words[0] != "SCAN" or "VIRTUAL" in words:
+            continue
+        if len(words) > 2 and (limited or words[2] != "USING"):
+            continue
+        name = words[1]
+        if name.startswith("(") or name in subqueries:
+            continue
+        # Joined tables are aliased as <table>_<n>
+        table, _, suffix = name.rpartition("_")
+        tables.add(table if suffix.isdigit() else name)
+    return tables
+
+
+def _format(value, ids):
+    if isinstance(value, dict):
+        return {key: _format(item, ids) for key, item in value.items()}
+    if value == "{reply_id}":
+        return ids["reply_id"]
+    return value
+
+
+@pytest.mark.parametrize(
+    "method, url, body", HOT_REQUESTS,
+    ids=[f"{method} {url}" for method, url, _ in HOT_REQUESTS],
+)
+def test_hot_requests_never_scan_whole_tables(seeded, method, url, body):
+    app, client, ids = seeded
+    url = url.format(**ids)
+    responses = []
+    statements = _capture(app, lambda: responses.append(
+        getattr(client, method)(url, json=_format(body, ids))
+    ))
+    assert responses[0].status_code < 400
+    assert statements
+
+    for statement, parameters in statements:
+        plan = _plan(app, statement, parameters)
+        limited = "LIMIT" in statement
+        assert full_scans(plan, limited) <= SMALL_TABLES, (
+            f"{statement}\n" + "\n".join(plan)
+        )
+
+
+FEEDS = [
+    url for method, url, _ in HOT_REQUESTS
+    if method == "get"
+    and url.startswith(("/api/posts?", "/api/posts/{post_id}/replies"))
+]
+
+
+@pytest.mark.parametrize("url", FEEDS)
+def test_feeds_page_in_index_order(seeded, url):
+    app, client, ids = seeded
+    url = url.format(**ids)
+    separator = "&" if "?" in url else "?"
+    cursor = client.get(f"{url}{separator}limit=5").get_json()["next_cursor"]
+    assert cursor
+
+    # The first page and a later one, which seeks past the cursor
+    for page in ("", f"&cursor={cursor}"):
+        payload_cache.clear()
+        statements = _capture(
+            app, lambda: client.get(f"{url}{separator}limit=5{page}")
+        )
+        # The query that pages the feed; the replies and authors loaded
+        # for a page are bounded by it, so sorting those is cheap
+        paged = [
+            statement for statement in statements if "LIMIT" in statement[0]
+        ]
+        assert paged
+        for statement, parameters in paged:
+            plan = _plan(app, statement, parameters)
+            assert "USE TEMP B-TREE FOR ORDER BY" not in plan, (
+                f"{statement}\n" + "\n".join(plan)
+            )
+
+
+def test_vote_totals_are_summed_from_an_index(seeded):
+    app, _, _ = seeded
+
+    def rebuild():
+        with app.app_context():
+            rebuild_vote_totals()
+
+    statements = _capture(app, rebuild)
+    checked = 0
+    for statement, parameters in statements:
+        plan = _plan(app, statement, parameters)
+        if "CORRELATED SCALAR SUBQUERY 1" not in plan:
+            continue
+        # Rebuilding updates every row of the table it rebuilds, but the
+        # totals for each row come off an index
+        updated = statement.split()[1]
+        assert full_scans(plan) <= {updated}, (
+            f"{statement}\n" + "\n".join(plan)
+        )
+        checked += 1
+    assert checked
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Post, PostVote, Reply
+from app.ranking import hot_rank, refresh_rankings
+
+
+def make_posts(user, category, count):
+    posts = [
+        Post(title=f"Post {i}", content="c", user_id=user.id,
+             category_id=category.id,
+             timestamp=datetime(2024, 1, 1) + timedelta(minutes=i))
+        for i in range(count)
+    ]
+    db.session.add_all(posts)
+    db.session.commit()
+    return posts
+
+
+def feed(client, query):
+    data = client.get(f"/api/posts?fields=id&{query}").get_json()
+    return [post["id"] for post in data["posts"]]
+
+
+def test_hot_rank_prefers_activity_and_recency():
+    now = datetime(2024, 1, 1)
+    assert hot_rank(10, 0, now) > hot_rank(1, 0, now)
+    assert hot_rank(1, 0, now + timedelta(hours=1)) > hot_rank(1, 0, now)
+    assert hot_rank(-5, 0, now) < hot_rank(0, 0, now)
+
+
+def test_votes_reorder_hot_and_top_feeds(auth_client, user, category):
+    oldest, middle, newest = make_posts(user, category, 3)
+    assert feed(auth_client, "sort=hot") == [newest.id, middle.id, oldest.id]
+
+    auth_client.post(f"/api/posts/{oldest.id}/vote", json={"value": 1})
+    auth_client.post(f"/api/posts/{newest.id}/vote", json={"value": -1})
+
+    assert feed(auth_client, "sort=top") == [oldest.id, middle.id, newest.id]
+    assert feed(auth_client, "sort=top&t=week")[0] == oldest.id
+
+    db.session.refresh(newest)
+    assert newest.hot_score == hot_rank(-1, 0, newest.timestamp)
+
+
+def test_ranked_feed_pages_with_cursor(client, user, category):
+    posts = make_posts(user, category, 5)
+    seen, cursor = [], ""
+    while True:
+        data = client.get(
+            f"/api/posts?fields=id&sort=hot&limit=2&cursor={cursor}"
+        ).get_json()
+        seen += [post["id"] for post in data["posts"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [post.id for post in reversed(posts)]
+
+
+def test_replies_update_reply_count(post, user):
+    db.session.add(Reply(content="r", user_id=user.id, post_id=post.id))
+    db.session.commit()
+    db.session.refresh(post)
+    assert post.reply_count == 1
+
+
+def test_refresh_rankings_ages_votes_out_of_window(post, user):
+    db.session.add(
+        PostVote(user_id=user.id, post_id=post.id, value=1,
+                 timestamp=datetime.utcnow() - timedelta(days=30))
+    )
+    post.week_score = 1
+    db.session.commit()
+
+    refresh_rankings()
+    db.session.refresh(post)
+    assert post.week_score == 0
+
+
+def _old_vote(user, post, value):
+    db.session.add(
+        PostVote(user_id=user.id, post_id=post.id, value=value,
+                 timestamp=datetime.utcnow() - timedelta(days=30))
+    )
+    db.session.commit()
+
+
+def test_revotes_count_in_the_window_on_every_path(auth_client, user,
+                                                   category):
+    single, batched = make_posts(user, category, 2)
+    for post in (single, batched):
+        _old_vote(user, post, 1)
+
+    auth_client.post(f"/api/posts/{single.id}/vote", json={"value": -1})
+    auth_client.post("/api/votes:batch", json={"votes": [
+        {"target_type": "post", "target_id": batched.id, "value": -1},
+    ]})
+
+    # The old upvote never counted this week; the downvote does
+    for post in (single, batched):
+        db.session.refresh(post)
+        assert post.week_score == -1
+    refresh_rankings()
+    for post in (single, batched):
+        db.session.refresh(post)
+        assert post.week_score == -1
+
+
+def test_refresh_rankings_leaves_unchanged_posts_alone(auth_client, user,
+                                                       category):
+    voted, old, quiet = make_posts(user, category, 3)
+    auth_client.post(f"/api/posts/{voted.id}/vote", json={"value": 1})
+    _old_vote(user, old, 1)
+    old.week_score = 1
+    db.session.commit()
+    refresh_rankings()
+    stamps = {
+        post.id: post.modified_at for post in Post.query.all()
+    }
+
+    refresh_rankings()
+    db.session.expire_all()
+    assert {
+        post.id: post.modified_at for post in Post.query.all()
+    } == stamps
+    assert db.session.get(Post, old.id).week_score == 0
+
+
+def test_invalid_sort_is_rejected(client):
+    assert client.get("/api/posts?sort=best").status_code == 400
+    assert client.get("/api/posts?sort=top&t=year").status_code == 400
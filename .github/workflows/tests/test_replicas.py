@@ -0,0 +1,84 @@
+import shutil
+
+import pytest
+from flask import g
+
+from app import create_app
+from app.extensions import db
+from app.replicas import PRIMARY_UNTIL_KEY
+
+
+@pytest.fixture
+def app(tmp_path):
+    primary = tmp_path / "primary.db"
+    replica = tmp_path / "replica.db"
+    app = create_app(
+        "testing",
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {},
+            "SQLALCHEMY_REPLICAS": [f"sqlite:///file:{replica}?mode=ro&uri=true"],
+        },
+    )
+    app.config["replica_files"] = (primary, replica)
+    with app.app_context():
+        db.create_all()
+        shutil.copyfile(primary, replica)
+        yield app
+        db.session.remove()
+        db.drop_all()
+        for engine in [db.engine, *app.extensions["replicas"]]:
+            engine.dispose()
+
+
+@pytest.fixture
+def sync_replica(app):
+    """Copy the primary over the replica, like a replication catch-up."""
+
+    def sync():
+        db.session.commit()
+        primary, replica = app.config["replica_files"]
+        app.extensions["replicas"][0].dispose()
+        shutil.copyfile(primary, replica)
+
+    return sync
+
+
+def test_listing_reads_from_replica(client, post, sync_replica):
+    assert client.get("/api/posts").get_json()["posts"] == []
+
+    sync_replica()
+    posts = client.get("/api/posts").get_json()["posts"]
+    assert [document["id"] for document in posts] == [post.id]
+
+
+def test_writer_reads_own_writes_from_primary(
+    app, auth_client, category, sync_replica
+):
+    sync_replica()
+    response = auth_client.post(
+        "/api/posts",
+        json={"title": "Kickoff", "content": "Live thread",
+              "category_id": category.id},
+    )
+    post_id = response.get_json()["id"]
+
+    assert auth_client.get(f"/api/posts/{post_id}").status_code == 200
+    # Anyone else still reads the lagging replica
+    assert app.test_client().get(f"/api/posts/{post_id}").status_code == 404
+
+
+def test_current_user_is_read_from_replica(app, auth_client, sync_replica):
+    # Let the login's read-your-writes window lapse
+    with auth_client.session_transaction() as session:
+        del session[PRIMARY_UNTIL_KEY]
+    # Requests share the test's app context, so forget the user that
+    # earlier requests loaded; the next lookup has to run SQL
+    db.session.remove()
+    g.pop("_login_user", None)
+    assert auth_client.get("/api/auth/user").status_code == 401
+
+    sync_replica()
+    g.pop("_login_user", None)
+    response = auth_client.get("/api/auth/user")
+    assert response.get_json()["username"] == "testuser"
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import REPLY_PREVIEW_SIZE, Post, Reply, ReplyVote
+from app.serializers import post_query, serialize_posts
+
+
+@pytest.fixture
+def thread(user, post):
+    """A post with replies a minute apart and varied scores; returns their
+    ids oldest first."""
+    start = datetime(2024, 3, 1, 18, 0)
+    replies = [
+        Reply(
+            content=f"Reply {i}",
+            user_id=user.id,
+            post_id=post.id,
+            timestamp=start + timedelta(minutes=i),
+            score=(i * 7) % 5,
+        )
+        for i in range(REPLY_PREVIEW_SIZE + 5)
+    ]
+    db.session.add_all(replies)
+    db.session.commit()
+    return [reply.id for reply in replies]
+
+
+def _all_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        query = f"&cursor={cursor}" if cursor else ""
+        page = client.get(f"{url}{query}").get_json()
+        ids.extend(reply["id"] for reply in page["replies"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_replies_page_in_each_order(client, post, thread):
+    url = f"/api/posts/{post.id}/replies?limit=4"
+    assert _all_pages(client, url) == thread
+    assert _all_pages(client, url + "&sort=old") == thread
+    assert _all_pages(client, url + "&sort=new") == thread[::-1]
+
+    scores = {
+        reply.id: reply.score
+        for reply in Reply.query.filter(Reply.id.in_(thread))
+    }
+    top = _all_pages(client, url + "&sort=top")
+    assert top == sorted(thread, key=lambda id_: (scores[id_], id_),
+                         reverse=True)
+
+
+def test_post_embeds_a_preview_of_its_replies(client, post, thread):
+    document = client.get(f"/api/posts/{post.id}").get_json()
+    assert [reply["id"] for reply in document["replies"]] == (
+        thread[:REPLY_PREVIEW_SIZE]
+    )
+    assert document["reply_count"] == len(thread)
+
+    rest = client.get(
+        f"/api/posts/{post.id}/replies?cursor="
+        f"{document['replies_next_cursor']}"
+    ).get_json()
+    assert [reply["id"] for reply in rest["replies"]] == (
+        thread[REPLY_PREVIEW_SIZE:]
+    )
+    assert rest["next_cursor"] is None
+
+
+def test_listing_embeds_a_preview_per_post(user, category, post, thread):
+    other = Post(title="Other", content="Thread", user_id=user.id,
+                 category_id=category.id)
+    db.session.add(other)
+    db.session.flush()
+    db.session.add_all(
+        Reply(content="Short", user_id=user.id, post_id=other.id)
+        for _ in range(2)
+    )
+    db.session.commit()
+
+    documents = {
+        document["id"]: document
+        for document in serialize_posts(post_query().all())
+    }
+    assert [reply["id"] for reply in documents[post.id]["replies"]] == (
+        thread[:REPLY_PREVIEW_SIZE]
+    )
+    assert documents[post.id]["replies_next_cursor"]
+    assert len(documents[other.id]["replies"]) == 2
+    assert documents[other.id]["replies_next_cursor"] is None
+
+
+def test_replies_include_the_users_votes(auth_client, user, post, thread):
+    db.session.add(ReplyVote(user_id=user.id, reply_id=thread[1], value=-1))
+    db.session.commit()
+
+    page = auth_client.get(f"/api/posts/{post.id}/replies?limit=2")
+    assert [reply["user_vote"] for reply in page.get_json()["replies"]] == [
+        0, -1,
+    ]
+
+
+def test_replies_reject_bad_requests(client, post):
+    url = f"/api/posts/{post.id}/replies"
+    assert client.get(url + "?sort=best").status_code == 400
+    assert client.get(url + "?cursor=garbage").status_code == 400
+    assert client.get("/api/posts/999/replies").status_code == 404
+
+
+def test_new_reply_changes_the_etag(auth_client, post, thread):
+    url = f"/api/posts/{post.id}/replies"
+    etag = auth_client.get(url).headers["ETag"]
+    assert auth_client.get(
+        url, headers={"If-None-Match": etag}
+    ).status_code == 304
+
+    auth_client.post(url, json={"content": "Late equaliser"})
+    assert auth_client.get(
+        url, headers={"If-None-Match": etag}
+    ).status_code == 200
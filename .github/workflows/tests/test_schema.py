@@ -0,0 +1,172 @@
+import sqlite3
+
+from sqlalchemy import inspect, text
+
+from app import create_app
+from app.extensions import db
+from app.models import Post, Reply, User
+from app.schema import SCHEMA_VERSION, ensure_schema
+
+# Tables as the first release of the app created them
+LEGACY_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER PRIMARY KEY, created_at DATETIME, updated_at DATETIME,
+    username VARCHAR(64) UNIQUE, password_hash VARCHAR(128)
+);
+CREATE TABLE category (id INTEGER PRIMARY KEY, name VARCHAR(64) UNIQUE);
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY, title VARCHAR(140), content TEXT,
+    timestamp DATETIME, user_id INTEGER, category_id INTEGER
+);
+CREATE TABLE reply (
+    id INTEGER PRIMARY KEY, content TEXT, timestamp DATETIME,
+    user_id INTEGER, post_id INTEGER
+);
+CREATE TABLE post_vote (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL, value INTEGER NOT NULL, timestamp DATETIME,
+    UNIQUE (user_id, post_id)
+);
+CREATE TABLE reply_vote (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,
+    reply_id INTEGER NOT NULL, value INTEGER NOT NULL, timestamp DATETIME,
+    UNIQUE (user_id, reply_id)
+);
+INSERT INTO user (id, username) VALUES (1, 'fan'), (2, 'captain');
+INSERT INTO category (id, name) VALUES (1, 'Match Discussions');
+INSERT INTO post VALUES
+    (1, 'Derby day', 'Who wins tonight?', '2024-03-01 18:00:00', 1, 1);
+INSERT INTO reply VALUES (1, 'The home side', '2024-03-01 18:05:00', 2, 1);
+INSERT INTO post_vote (user_id, post_id, value) VALUES (1, 1, 1), (2, 1, 1);
+"""
+
+
+def test_new_database_is_created_at_head(app):
+    version = db.session.execute(text("PRAGMA user_version")).scalar()
+    assert version == SCHEMA_VERSION
+
+
+def test_startup_at_head_only_reads_the_version(app, count_queries):
+    count, _ = count_queries(lambda: ensure_schema(app))
+    assert count == 1
+
+
+def test_unversioned_database_is_upgraded(tmp_path):
+    path = tmp_path / "legacy.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.close()
+
+    app = create_app(
+        "testing",
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {},
+        },
+    )
+    with app.app_context():
+        version = db.session.execute(text("PRAGMA user_version")).scalar()
+        post = db.session.get(Post, 1)
+        assert version == SCHEMA_VERSION
+        assert post.score == 2
+        assert post.reply_count == 1
+        assert post.hot_score > 0
+
+        results = app.test_client().get("/api/search?q=derby").get_json()
+        assert [result["post_id"] for result in results["results"]] == [1]
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_version_1_database_gets_admin_flag(tmp_path):
+    path = tmp_path / "forum.db"
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {},
+    }
+    app = create_app("testing", settings)
+    with app.app_context():
+        db.engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "ALTER TABLE user DROP COLUMN is_admin;"
+        "INSERT INTO user (id, username) VALUES (1, 'fan');"
+        "PRAGMA user_version = 1;"
+    )
+    connection.close()
+
+    app = create_app("testing", settings)
+    with app.app_context():
+        version = db.session.execute(text("PRAGMA user_version")).scalar()
+        assert version == SCHEMA_VERSION
+        assert db.session.get(User, 1).is_admin is False
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_version_3_database_gets_nested_replies(tmp_path):
+    path = tmp_path / "forum.db"
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {},
+    }
+    app = create_app("testing", settings)
+    with app.app_context():
+        db.engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "INSERT INTO reply (id, content, timestamp) "
+        "VALUES (1, 'Early', '2024-03-01 18:00:00');"
+        # SQLite cannot drop a column used by a foreign key
+        "CREATE TABLE reply_v3 AS SELECT id, content, timestamp, score, "
+        "upvotes, downvotes, user_id, post_id FROM reply;"
+        "DROP TABLE reply;"
+        "ALTER TABLE reply_v3 RENAME TO reply;"
+        "PRAGMA user_version = 3;"
+    )
+    connection.close()
+
+    app = create_app("testing", settings)
+    with app.app_context():
+        version = db.session.execute(text("PRAGMA user_version")).scalar()
+        assert version == SCHEMA_VERSION
+        reply = db.session.get(Reply, 1)
+        assert (reply.parent_id, reply.path, reply.depth) == (None, "", 0)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_version_5_database_gets_ranked_category_indexes(tmp_path):
+    path = tmp_path / "forum.db"
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {},
+    }
+    indexes = {
+        "ix_post_category_hot_score",
+        "ix_post_category_score",
+        "ix_post_category_week_score",
+    }
+    app = create_app("testing", settings)
+    with app.app_context():
+        db.engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "".join(f"DROP INDEX {name};" for name in indexes)
+        + "PRAGMA user_version = 5;"
+    )
+    connection.close()
+
+    app = create_app("testing", settings)
+    with app.app_context():
+        version = db.session.execute(text("PRAGMA user_version")).scalar()
+        assert version == SCHEMA_VERSION
+        names = {index["name"] for index in inspect(db.engine).get_indexes("post")}
+        assert indexes <= names
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_schema_cli_reports_version(app):
+    result = app.test_cli_runner().invoke(args=["schema", "current"])
+    assert f"head: {SCHEMA_VERSION}" in result.output
@@ -0,0 +1,46 @@
+from app.extensions import db
+from app.models import Reply
+from app.search_index import build_match_query, rebuild_search_index
+
+
+def test_build_match_query_quotes_words():
+    assert build_match_query('lakers "OR (') == '"lakers" "OR"*'
+    assert build_match_query("  ") == ""
+
+
+def test_search_finds_posts_and_replies(client, post, user):
+    db.session.add(
+        Reply(content="A test of <b>patience</b>", user_id=user.id,
+              post_id=post.id)
+    )
+    db.session.commit()
+
+    data = client.get("/api/search?q=test").get_json()
+    assert {result["type"] for result in data["results"]} == {"post", "reply"}
+    reply = next(r for r in data["results"] if r["type"] == "reply")
+    assert reply["snippet"] == (
+        "A <mark>test</mark> of &lt;b&gt;patience&lt;/b&gt;"
+    )
+    assert reply["post_title"] == post.title
+
+
+def test_search_index_follows_updates(client, post):
+    post.title = "Renamed"
+    db.session.commit()
+
+    assert client.get("/api/search?q=Renamed").get_json()["results"]
+    rebuild_search_index()
+    assert client.get("/api/search?q=Renamed").get_json()["results"]
+
+
+def test_search_paginates(client, post, reply):
+    data = client.get("/api/search?q=test&limit=1").get_json()
+    assert len(data["results"]) == 1
+    assert data["next_offset"] == 1
+
+    data = client.get("/api/search?q=test&limit=1&offset=1").get_json()
+    assert data["next_offset"] is None
+
+
+def test_search_requires_query(client):
+    assert client.get("/api/search").status_code == 400
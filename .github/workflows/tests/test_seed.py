@@ -0,0 +1,69 @@
+import random
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import Post, PostVote, Reply, ReplyVote
+from app.search_index import search
+from app.seed import allocate, seed, zipf_weights
+
+
+def snapshot():
+    return db.session.execute(
+        select(Post.id, Post.title, Post.score, Post.reply_count)
+        .order_by(Post.id)
+    ).all()
+
+
+def test_allocate_respects_total_and_cap():
+    weights = zipf_weights(1000, 1.2, random.Random(1))
+    counts = allocate(50000, weights, cap=300)
+
+    assert sum(counts) == 50000
+    assert max(counts) == 300
+    assert counts[weights.index(max(weights))] == 300
+
+
+def test_seed_totals_match_generated_rows(app):
+    inserted = seed(50, 200, 600, 3000, 800, log=lambda message: None)
+    assert inserted["post_vote"] == 3000
+    assert inserted["reply_vote"] == 800
+
+    vote_totals = dict(db.session.execute(
+        select(PostVote.post_id, func.sum(PostVote.value))
+        .group_by(PostVote.post_id)
+    ).all())
+    reply_counts = dict(db.session.execute(
+        select(Reply.post_id, func.count()).group_by(Reply.post_id)
+    ).all())
+    for post_id, _, score, reply_count in snapshot():
+        assert score == vote_totals.get(post_id, 0)
+        assert reply_count == reply_counts.get(post_id, 0)
+
+    reply_score = db.session.scalar(select(func.sum(Reply.score)))
+    assert reply_score == db.session.scalar(select(func.sum(ReplyVote.value)))
+    assert search("match", limit=5)
+
+
+def test_seed_is_deterministic(app):
+    seed(20, 50, 100, 500, 100, seed_value=7, log=lambda message: None)
+    first = snapshot()
+    db.drop_all()
+    db.create_all()
+    seed(20, 50, 100, 500, 100, seed_value=7, log=lambda message: None)
+
+    assert snapshot() == first
+
+
+def test_seeded_replies_nest_under_earlier_ones(app):
+    seed(10, 20, 300, 0, 0, log=lambda message: None)
+    replies = {reply.id: reply for reply in Reply.query}
+    nested = [reply for reply in replies.values() if reply.parent_id]
+
+    assert nested
+    for reply in nested:
+        parent = replies[reply.parent_id]
+        assert parent.post_id == reply.post_id
+        assert reply.path == parent.subtree_path
+        assert reply.depth == parent.depth + 1
+        assert reply.timestamp >= parent.timestamp
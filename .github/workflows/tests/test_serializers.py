@@ -0,0 +1,130 @@
+from app.extensions import db
+from app.models import (
+    EXCERPT_LENGTH,
+    REPLY_PREVIEW_SIZE,
+    Post,
+    PostVote,
+    Reply,
+    ReplyVote,
+    User,
+)
+from app.serializers import SUMMARY_FIELDS, post_query, serialize_posts
+
+
+def seed_posts(category_id, n_posts, n_replies):
+    offset = User.query.count()
+    users = [
+        User(username=f"user{offset + i}") for i in range(n_replies + 1)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+
+    for i in range(n_posts):
+        post = Post(
+            title=f"Post {i}",
+            content="content",
+            user_id=users[0].id,
+            category_id=category_id,
+        )
+        db.session.add(post)
+        db.session.flush()
+        for user in users[1:]:
+            db.session.add(
+                Reply(content="reply", user_id=user.id, post_id=post.id)
+            )
+            db.session.add(PostVote(user_id=user.id, post_id=post.id, value=1))
+    db.session.commit()
+    # Start every measurement from a cold identity map
+    db.session.expunge_all()
+
+
+def test_serialize_posts_matches_to_dict(post, reply):
+    serialized = serialize_posts(post_query().all())[0]
+    expected = db.session.get(Post, post.id).to_dict()
+    assert serialized == expected
+
+
+def test_get_posts_query_count_is_constant(client, category, count_queries):
+    category_id = category.id
+    seed_posts(category_id, n_posts=2, n_replies=1)
+    small, response = count_queries(lambda: client.get("/api/posts"))
+    assert len(response.get_json()["posts"]) == 2
+
+    seed_posts(category_id, n_posts=15, n_replies=6)
+    large, response = count_queries(lambda: client.get("/api/posts"))
+    assert len(response.get_json()["posts"]) == 17
+
+    assert small == large
+
+
+def test_get_post_query_count_is_constant(client, category, count_queries):
+    category_id = category.id
+    seed_posts(category_id, n_posts=1, n_replies=1)
+    small, _ = count_queries(lambda: client.get("/api/posts/1"))
+
+    seed_posts(category_id, n_posts=1, n_replies=25)
+    large, response = count_queries(lambda: client.get("/api/posts/2"))
+    document = response.get_json()
+    assert len(document["replies"]) == REPLY_PREVIEW_SIZE
+    assert document["reply_count"] == 25
+    assert document["replies_next_cursor"]
+
+    assert small == large
+
+
+def test_get_posts_returns_summaries(client, user, category):
+    db.session.add(
+        Post(
+            title="Long",
+            content="word " * 100,
+            user_id=user.id,
+            category_id=category.id,
+        )
+    )
+    db.session.commit()
+
+    post = client.get("/api/posts").get_json()["posts"][0]
+    assert set(post) == set(SUMMARY_FIELDS) - {"user_vote"}
+    assert post["excerpt"].endswith("…")
+    assert len(post["excerpt"]) <= EXCERPT_LENGTH + 1
+
+
+def test_get_posts_fields_selection(client, post):
+    response = client.get("/api/posts?fields=id,title")
+    assert response.get_json()["posts"] == [
+        {"id": post.id, "title": post.title}
+    ]
+
+    response = client.get("/api/posts?fields=id,nope")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unknown fields: nope"
+
+    for fields in (",,", " ", " , "):
+        response = client.get(f"/api/posts?fields={fields}")
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "No fields requested"
+
+
+def test_listing_includes_user_votes(auth_client, user, category):
+    posts = [
+        Post(title=f"Post {i}", content="c", user_id=user.id,
+             category_id=category.id)
+        for i in range(3)
+    ]
+    db.session.add_all(posts)
+    db.session.flush()
+    reply = Reply(content="r", user_id=user.id, post_id=posts[0].id)
+    db.session.add(reply)
+    db.session.flush()
+    db.session.add(PostVote(user_id=user.id, post_id=posts[0].id, value=1))
+    db.session.add(PostVote(user_id=user.id, post_id=posts[2].id, value=-1))
+    db.session.add(ReplyVote(user_id=user.id, reply_id=reply.id, value=-1))
+    db.session.commit()
+    expected = {posts[0].id: 1, posts[1].id: 0, posts[2].id: -1}
+
+    data = auth_client.get("/api/posts").get_json()["posts"]
+    assert {post["id"]: post["user_vote"] for post in data} == expected
+
+    data = auth_client.get("/api/posts?view=full").get_json()["posts"]
+    replies = [reply for post in data for reply in post["replies"]]
+    assert [reply["user_vote"] for reply in replies] == [-1]
@@ -0,0 +1,28 @@
+import json
+
+from app.extensions import db
+from app.models import Post
+
+
+def test_stream_returns_every_post_as_ndjson(client, user, category):
+    db.session.add_all(
+        Post(title=f"Post {i}", content="c", user_id=user.id,
+             category_id=category.id)
+        for i in range(30)
+    )
+    db.session.commit()
+
+    response = client.get("/api/posts?stream=1&fields=id,title")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    posts = [json.loads(line) for line in lines]
+    assert len(posts) == 30
+    assert posts[0] == {"id": 30, "title": "Post 29"}
+
+
+def test_stream_is_selected_by_accept_header(client, post):
+    response = client.get(
+        "/api/posts", headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.mimetype == "application/x-ndjson"
+    assert json.loads(response.get_data(as_text=True))["id"] == post.id
@@ -0,0 +1,224 @@
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import MAX_REPLY_DEPTH, Post, Reply, ReplyVote
+from app.routes.posts import THREAD_CHILDREN
+from app.serializers import load_subtrees
+
+
+def _answer(client, post_id, parent_id, content="Answer"):
+    response = client.post(
+        f"/api/posts/{post_id}/replies",
+        json={"content": content, "parent_id": parent_id},
+    )
+    return response.status_code, response.get_json()
+
+
+def _shape(nodes):
+    """Nested ``(id, children)`` pairs of a reply tree."""
+    return [(node["id"], _shape(node["replies"])) for node in nodes]
+
+
+@pytest.fixture
+def tree(user, post):
+    """Two top-level replies; the first has a chain three deep below it
+    and a second child. Returns the replies by name."""
+    replies = {}
+
+    def add(name, parent=None, score=0):
+        reply = Reply(content=name, user_id=user.id, post_id=post.id,
+                      score=score)
+        if parent is not None:
+            reply.place_under(replies[parent])
+        db.session.add(reply)
+        db.session.flush()
+        replies[name] = reply
+
+    add("a", score=1)
+    add("a1", "a")
+    add("a1x", "a1")
+    add("a1xy", "a1x")
+    add("a2", "a")
+    add("b", score=5)
+    db.session.commit()
+    return {name: reply.id for name, reply in replies.items()}
+
+
+def test_answers_are_placed_under_their_parent(auth_client, post, reply):
+    status, child = _answer(auth_client, post.id, reply.id)
+    assert status == 201
+    assert child["parent_id"] == reply.id
+    assert child["depth"] == 1
+
+    status, grandchild = _answer(auth_client, post.id, child["id"])
+    stored = db.session.get(Reply, grandchild["id"])
+    assert stored.depth == 2
+    assert stored.path == reply.subtree_path + f"{child['id']:010d}/"
+
+
+def test_answers_need_a_parent_on_the_same_post(auth_client, user, post,
+                                                category, reply):
+    other = Post(title="Other", content="Thread", user_id=user.id,
+                 category_id=category.id)
+    db.session.add(other)
+    db.session.commit()
+
+    assert _answer(auth_client, post.id, 999)[0] == 400
+    assert _answer(auth_client, post.id, "1")[0] == 400
+    assert _answer(auth_client, post.id, True)[0] == 400
+    assert _answer(auth_client, post.id, False)[0] == 400
+    assert _answer(auth_client, other.id, reply.id)[0] == 400
+
+    reply.depth = MAX_REPLY_DEPTH
+    db.session.commit()
+    assert _answer(auth_client, post.id, reply.id)[0] == 400
+
+
+def test_thread_is_nested_to_the_requested_depth(client, tree):
+    url = f"/api/replies/{tree['a']}/thread"
+    assert _shape([client.get(url).get_json()]) == [
+        (tree["a"], [
+            (tree["a1"], [(tree["a1x"], [(tree["a1xy"], [])])]),
+            (tree["a2"], []),
+        ]),
+    ]
+    assert _shape([client.get(url + "?depth=1").get_json()]) == [
+        (tree["a"], [(tree["a1"], []), (tree["a2"], [])]),
+    ]
+    assert _shape([client.get(
+        f"/api/replies/{tree['a1']}/thread?depth=1"
+    ).get_json()]) == [(tree["a1"], [(tree["a1x"], [])])]
+    assert client.get("/api/replies/999/thread").status_code == 404
+
+
+def test_tree_view_pages_top_level_replies(auth_client, user, post, tree):
+    db.session.add(ReplyVote(user_id=user.id, reply_id=tree["a1x"], value=1))
+    db.session.commit()
+    url = f"/api/posts/{post.id}/replies?view=tree&sort=top&depth=2&limit=1"
+
+    first = auth_client.get(url).get_json()
+    assert _shape(first["replies"]) == [(tree["b"], [])]
+    second = auth_client.get(
+        f"{url}&cursor={first['next_cursor']}"
+    ).get_json()
+    # Nested replies follow the sort too: a1 and a2 tie on score, so the
+    # newer comes first
+    assert _shape(second["replies"]) == [
+        (tree["a"], [(tree["a2"], []), (tree["a1"], [(tree["a1x"], [])])]),
+    ]
+    assert second["next_cursor"] is None
+    assert second["replies"][0]["replies"][1]["replies"][0]["user_vote"] == 1
+
+
+def _add_children(parent_id, count, **columns):
+    parent = db.session.get(Reply, parent_id)
+    children = []
+    for i in range(count):
+        child = Reply(content=f"Child {i}", user_id=parent.user_id,
+                      post_id=parent.post_id, **columns)
+        child.place_under(parent)
+        db.session.add(child)
+        db.session.flush()
+        children.append(child.id)
+    db.session.commit()
+    return children
+
+
+def test_tree_view_caps_children_per_reply(client, post, tree):
+    scores = list(range(THREAD_CHILDREN * 2))
+    children = [
+        _add_children(tree["a1"], 1, score=score)[0] for score in scores
+    ]
+    url = f"/api/posts/{post.id}/replies?view=tree&sort=top&limit=1"
+    first = client.get(url).get_json()
+    (b,) = first["replies"]
+    assert "replies_next_cursor" in b and b["replies_next_cursor"] is None
+
+    page = client.get(f"{url}&cursor={first['next_cursor']}").get_json()
+    (a1,) = [node for node in page["replies"][0]["replies"]
+             if node["id"] == tree["a1"]]
+    # a1x scores 0, so the highest-scoring new children come first
+    shown = [node["id"] for node in a1["replies"]]
+    assert shown == children[::-1][:THREAD_CHILDREN]
+    assert a1["replies_next_cursor"]
+
+    # The cursor pages on through a1's children, in the same order
+    rest = client.get(
+        f"/api/posts/{post.id}/replies?sort=top&parent_id={tree['a1']}"
+        f"&cursor={a1['replies_next_cursor']}"
+    ).get_json()
+    assert [reply["id"] for reply in rest["replies"]] == (
+        children[::-1][THREAD_CHILDREN:] + [tree["a1x"]]
+    )
+    assert rest["next_cursor"] is None
+
+
+def test_thread_children_are_capped_and_sorted(client, tree):
+    children = _add_children(tree["a"], THREAD_CHILDREN)
+    url = f"/api/replies/{tree['a']}/thread?depth=1"
+
+    thread = client.get(url).get_json()
+    assert [node["id"] for node in thread["replies"]] == (
+        [tree["a1"], tree["a2"], *children][:THREAD_CHILDREN]
+    )
+    assert thread["replies_next_cursor"]
+    newest = client.get(url + "&sort=new").get_json()
+    assert [node["id"] for node in newest["replies"]] == (
+        children[::-1][:THREAD_CHILDREN]
+    )
+    assert client.get(url + "&sort=best").status_code == 400
+
+
+def test_children_of_a_reply_on_another_post_are_not_found(
+    client, user, category, post, tree
+):
+    other = Post(title="Other", content="Thread", user_id=user.id,
+                 category_id=category.id)
+    db.session.add(other)
+    db.session.commit()
+    url = f"/api/posts/{other.id}/replies?parent_id={tree['a']}"
+    assert client.get(url).status_code == 404
+
+
+def test_tree_view_query_count_is_constant(client, count_queries, post,
+                                           tree):
+    url = f"/api/posts/{post.id}/replies?view=tree&depth=3"
+    small, _ = count_queries(lambda: client.get(url))
+
+    # Wider and deeper than the view: one query per level either way
+    _add_children(tree["a"], THREAD_CHILDREN * 3)
+    parent = tree["a1xy"]
+    for _ in range(10):
+        (parent,) = _add_children(parent, 1)
+
+    large, response = count_queries(lambda: client.get(url))
+    assert large == small
+    assert response.status_code == 200
+
+
+def test_subtrees_are_index_lookups(app, tree):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    parents = [db.session.get(Reply, tree["a"]),
+               db.session.get(Reply, tree["b"])]
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        load_subtrees(parents, 2, THREAD_CHILDREN)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    # One query per level
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).all()
+        details = [row[3] for row in plan]
+        assert any(
+            "USING INDEX ix_reply_post_path (post_id=? AND path=?)" in detail
+            for detail in details
+        ), details
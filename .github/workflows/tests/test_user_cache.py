@@ -0,0 +1,26 @@
+from flask import g
+
+from app.extensions import db
+
+
+def get_current_user(client):
+    # Requests share the test's app context; make Flask-Login load again
+    g.pop("_login_user", None)
+    return client.get("/api/auth/user").get_json()
+
+
+def test_authenticated_requests_reuse_cached_user(auth_client, count_queries):
+    first, document = count_queries(lambda: get_current_user(auth_client))
+    second, document = count_queries(lambda: get_current_user(auth_client))
+
+    assert first == 1
+    assert second == 0
+    assert document["username"] == "testuser"
+
+
+def test_user_changes_invalidate_cache(auth_client, user):
+    get_current_user(auth_client)
+    user.username = "renamed"
+    db.session.commit()
+
+    assert get_current_user(auth_client)["username"] == "renamed"
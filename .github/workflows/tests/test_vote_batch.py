@@ -0,0 +1,64 @@
+from app.extensions import db
+from app.models import Post, PostVote
+
+
+def test_vote_batch_applies_votes(auth_client, post, reply):
+    votes = [
+        {"target_type": "post", "target_id": post.id, "value": 1},
+        {"target_type": "reply", "target_id": reply.id, "value": -1},
+    ]
+    response = auth_client.post("/api/votes:batch", json={"votes": votes})
+
+    assert response.status_code == 200
+    post_result, reply_result = response.get_json()["results"]
+    assert post_result["score"] == 1
+    assert post_result["upvotes"] == 1
+    assert post_result["user_vote"] == 1
+    assert reply_result["score"] == -1
+    assert reply_result["downvotes"] == 1
+
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).hot_score != 0
+    assert PostVote.query.count() == 1
+
+
+def test_vote_batch_updates_and_removes_votes(auth_client, post, reply):
+    url = "/api/votes:batch"
+    auth_client.post(url, json={"votes": [
+        {"target_type": "post", "target_id": post.id, "value": 1},
+    ]})
+    response = auth_client.post(url, json={"votes": [
+        {"target_type": "post", "target_id": post.id, "value": -1},
+        {"target_type": "post", "target_id": post.id, "value": 0},
+    ]})
+
+    results = response.get_json()["results"]
+    assert [result["score"] for result in results] == [0, 0]
+    assert [result["user_vote"] for result in results] == [0, 0]
+    assert PostVote.query.count() == 0
+
+
+def test_vote_batch_reports_item_errors(auth_client, post):
+    response = auth_client.post("/api/votes:batch", json={"votes": [
+        {"target_type": "post", "target_id": 999, "value": 1},
+        {"target_type": "thread", "target_id": post.id, "value": 1},
+        {"target_type": "post", "target_id": post.id, "value": 2},
+        {"target_type": "post", "target_id": post.id, "value": 1},
+    ]})
+
+    results = response.get_json()["results"]
+    assert results[0]["error"] == "Post not found"
+    assert "error" in results[1]
+    assert "error" in results[2]
+    assert results[3]["score"] == 1
+
+
+def test_vote_batch_rejects_malformed_bodies(auth_client):
+    for body in ([1, 2], "votes", {"votes": "all"}, {}):
+        response = auth_client.post("/api/votes:batch", json=body)
+        assert response.status_code == 400
+
+
+def test_vote_batch_requires_login(client):
+    response = client.post("/api/votes:batch", json={"votes": []})
+    assert response.status_code == 401
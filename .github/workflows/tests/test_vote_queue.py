@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+
+import pytest
+
+from app import create_app
+from app.extensions import db, vote_queue
+from app.models import Post, PostVote
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        "testing",
+        {
+            "VOTE_WRITE_BEHIND": True,
+            # Flush only when a test asks to
+            "VOTE_FLUSH_INTERVAL": 3600,
+            "VOTE_QUEUE_JOURNAL": str(tmp_path / "votes.log"),
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        yield app
+        vote_queue.shutdown()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_queued_votes_are_coalesced_and_flushed(auth_client, post, reply):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    response = auth_client.post(
+        f"/api/posts/{post.id}/vote", json={"value": -1}
+    )
+    auth_client.post(f"/api/replies/{reply.id}/vote", json={"value": 1})
+
+    document = response.get_json()
+    assert document["user_vote"] == -1
+    assert document["vote_count"] == -1
+    assert document["downvotes"] == 1
+    assert PostVote.query.count() == 0
+
+    # The voter reads their own vote back before it is written, with the
+    # totals it will produce
+    listed = auth_client.get(f"/api/posts/{post.id}").get_json()
+    assert listed["user_vote"] == -1
+    assert listed["vote_count"] == -1
+    assert listed["downvotes"] == 1
+    assert listed["replies"][0]["user_vote"] == 1
+    assert listed["replies"][0]["vote_count"] == 1
+    (summary,) = auth_client.get("/api/posts").get_json()["posts"]
+    assert (summary["user_vote"], summary["score"]) == (-1, -1)
+    replies = auth_client.get(f"/api/posts/{post.id}/replies").get_json()
+    assert replies["replies"][0]["vote_count"] == 1
+
+    assert vote_queue.flush() == {post.id}
+    db.session.expire_all()
+    stored = db.session.get(Post, post.id)
+    assert stored.score == -1
+    assert stored.downvotes == 1
+    assert stored.replies.first().score == 1
+    assert PostVote.query.count() == 1
+    with open(vote_queue.journal_path) as journal:
+        assert journal.read() == ""
+
+
+def test_journal_is_replayed_on_startup(app, user, post):
+    with open(vote_queue.journal_path, "w") as journal:
+        journal.write(f'[{user.id}, "post", {post.id}, 1]\n')
+        journal.write(f'[{user.id}, "post", {post.id}, -1]\n')
+        journal.write('[1, "po')
+
+    vote_queue.init_app(app)
+    assert vote_queue.pending_votes(user.id, "post") == {post.id: -1}
+
+    vote_queue.shutdown()
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).score == -1
+
+
+def test_queued_vote_changes_the_voters_etags(auth_client, post):
+    urls = [f"/api/posts/{post.id}", "/api/posts"]
+    etags = [auth_client.get(url).headers["ETag"] for url in urls]
+
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    for url, etag in zip(urls, etags):
+        response = auth_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert "Last-Modified" not in response.headers
+
+
+def test_batch_vote_beats_an_earlier_queued_vote(auth_client, post):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    auth_client.post("/api/votes:batch", json={"votes": [
+        {"target_type": "post", "target_id": post.id, "value": -1},
+    ]})
+
+    vote_queue.flush()
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).score == -1
+    with open(vote_queue.journal_path) as journal:
+        assert journal.read() == ""
+
+
+def test_journals_are_kept_per_process(app, tmp_path, user, post):
+    journal_path = tmp_path / f"votes-{os.getpid()}.log"
+    assert vote_queue.journal_path == str(journal_path)
+    # A live process's journal is left to it; a dead one's is taken over
+    live = tmp_path / f"votes-{os.getppid()}.log"
+    live.write_text(f'[{user.id}, "post", {post.id}, 1]\n')
+    dead = tmp_path / f"votes-{_dead_pid()}.log"
+    dead.write_text(f'[{user.id}, "post", {post.id}, -1]\n')
+
+    vote_queue.init_app(app)
+    assert vote_queue.pending_votes(user.id, "post") == {post.id: -1}
+    assert live.exists()
+    assert not dead.exists()
+    with open(vote_queue.journal_path) as journal:
+        assert journal.read() == f'[{user.id}, "post", {post.id}, -1]\n'
+
+
+def _dead_pid():
+    process = multiprocessing.get_context("fork").Process(target=os.getpid)
+    process.start()
+    process.join()
+    return process.pid
+
+
+def _check_forked_queue(user_id):
+    thread = vote_queue._thread
+    ok = (
+        thread is not None and thread.is_alive()
+        and vote_queue.pending_votes(user_id, "post") == {}
+        and vote_queue.journal_path.endswith(f"-{os.getpid()}.log")
+    )
+    os._exit(0 if ok else 1)
+
+
+def test_forked_worker_gets_its_own_flusher(auth_client, user, post):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    worker = multiprocessing.get_context("fork").Process(
+        target=_check_forked_queue, args=(user.id,)
+    )
+    worker.start()
+    worker.join()
+    assert worker.exitcode == 0
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import update
+
+from app.extensions import db, payload_cache
+from app.models import Post, Reply
+from app.votes import rebuild_vote_totals
+
+# (vote, score, upvotes, downvotes) after each vote by one user
+TRANSITIONS = [(1, 1, 1, 0), (-1, -1, 0, 1), (0, 0, 0, 0)]
+
+
+def _totals(target) -> tuple:
+    db.session.expire_all()
+    target = db.session.get(type(target), target.id)
+    return target.score, target.upvotes, target.downvotes
+
+
+@pytest.mark.parametrize("kind", ["posts", "replies"])
+def test_vote_transitions_update_every_total(auth_client, post, reply, kind):
+    target = post if kind == "posts" else reply
+    url = f"/api/{kind}/{target.id}/vote"
+
+    for value, score, upvotes, downvotes in TRANSITIONS:
+        document = auth_client.post(url, json={"value": value}).get_json()
+        assert document["user_vote"] == value
+        expected = (score, upvotes, downvotes)
+        assert (
+            document["vote_count"],
+            document["upvotes"],
+            document["downvotes"],
+        ) == expected
+        assert _totals(target) == expected
+
+
+def test_rebuild_repairs_corrupted_totals(auth_client, post, reply):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    auth_client.post(f"/api/replies/{reply.id}/vote", json={"value": -1})
+    for model in (Post, Reply):
+        db.session.execute(
+            update(model).values(score=40, upvotes=7, downvotes=3)
+        )
+    db.session.execute(update(Post).values(reply_count=9))
+    db.session.commit()
+
+    assert rebuild_vote_totals() == 1
+    assert _totals(post) == (1, 1, 0)
+    assert _totals(reply) == (-1, 0, 1)
+    assert db.session.get(Post, post.id).reply_count == 1
+
+
+def test_rebuild_drops_documents_built_from_wrong_totals(auth_client, post):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    db.session.execute(update(Post).values(score=40))
+    db.session.commit()
+    # Rebuild the cached document from the corrupted row
+    payload_cache.clear()
+    stale = auth_client.get(f"/api/posts/{post.id}")
+    assert stale.get_json()["vote_count"] == 40
+
+    rebuild_vote_totals()
+    response = auth_client.get(
+        f"/api/posts/{post.id}", headers={"If-None-Match": stale.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["vote_count"] == 1
+
+
+def test_rebuild_leaves_correct_rows_alone(auth_client, post, reply):
+    auth_client.post(f"/api/posts/{post.id}/vote", json={"value": 1})
+    db.session.expire_all()
+    revision = db.session.get(Post, post.id).revision
+
+    assert rebuild_vote_totals() == 0
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).revision == revision
+
+
+def test_rebuild_touches_posts_whose_replies_were_wrong(post, reply):
+    revision = post.revision
+    db.session.execute(update(Reply).values(downvotes=2))
+    db.session.commit()
+
+    assert rebuild_vote_totals() == 1
+    db.session.expire_all()
+    assert db.session.get(Post, post.id).revision == revision + 1
+    assert _totals(reply) == (0, 0, 0)
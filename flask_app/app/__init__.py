@@ -1,9 +1,47 @@
+import os
+
 from flask import Flask
 from flask_cors import CORS
-from .extensions import db, login_manager
+from werkzeug.utils import import_string
+from config import config
+from .database import configure_engines
+from .extensions import (
+    db,
+    login_manager,
+    metrics,
+    password_hasher,
+    payload_cache,
+    user_cache,
+    vote_queue,
+)
+from .instrumentation import init_instrumentation
+from .profiling import init_profiling, profile_cli
+from .replicas import init_replicas
+from .schema import ensure_schema, schema_cli
+
+# Blueprints as (import path, URL prefix), imported only when registered
+BLUEPRINTS = [
+    ("app.routes.main:main", None),
+    ("app.routes.auth:auth", "/api"),
+    ("app.routes.posts:posts", "/api"),
+    ("app.routes.categories:categories", "/api"),
+    ("app.routes.search:search", "/api"),
+]
+
 
+def create_app(config_name=None, test_config=None, routes=True):
+    """Build the Flask app.
 
-def create_app():
+    Args:
+        config_name: Profile from ``config.config``; defaults to the
+            FLASK_CONFIG environment variable, then "development"
+        test_config: Settings applied on top of the profile
+        routes: Whether to register the blueprints; scripts that only
+            touch the database can skip importing them
+
+    Raises:
+        RuntimeError: if the profile leaves SECRET_KEY unset
+    """
     app = Flask(__name__)
 
     # Configure CORS with more detailed settings
@@ -20,25 +58,49 @@ def create_app():
     # Add health check endpoint
     @app.route('/health')
     def health_check():
-        return {"status": "healthy", "version": "1.0.0"}
+        return {
+            "status": "healthy",
+            "version": "1.0.0",
+            "cache": payload_cache.stats(),
+            "password_hashing": password_hasher.stats(),
+            "users": user_cache.stats(),
+        }
 
     # Load configuration
-    app.config.from_object("config.Config")
+    config_name = config_name or os.environ.get("FLASK_CONFIG", "default")
+    app.config.from_object(config[config_name])
+    if test_config is not None:
+        app.config.from_mapping(test_config)
+    if not app.config["SECRET_KEY"]:
+        raise RuntimeError("SECRET_KEY must be set")
 
     # Initialize extensions
     db.init_app(app)
+    init_replicas(app)
+    configure_engines(app)
+    init_instrumentation(app)
     login_manager.init_app(app)
+    payload_cache.init_app(app)
+    password_hasher.init_app(app)
+    user_cache.init_app(app)
+    vote_queue.init_app(app)
+    metrics.init_app(app)
+    init_profiling(app)
 
-    # Create database tables
+    # Create or upgrade the database schema
     with app.app_context():
-        db.create_all()
+        # Models must be registered before the schema can see their tables
+        from . import models, search_index  # noqa: F401
 
-    # Register blueprints
-    from .routes import main, auth, posts, categories
+        ensure_schema(app)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(profile_cli)
 
-    app.register_blueprint(main)
-    app.register_blueprint(auth, url_prefix="/api")
-    app.register_blueprint(posts, url_prefix="/api")
-    app.register_blueprint(categories, url_prefix="/api")
+    # Register blueprints
+    if routes:
+        for import_path, url_prefix in BLUEPRINTS:
+            app.register_blueprint(
+                import_string(import_path), url_prefix=url_prefix
+            )
 
     return app
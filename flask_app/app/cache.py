@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.utils import import_string
+
+
+class CacheBackend:
+    """Storage interface for ``PayloadCache``.
+
+    Backends hold already-serialized documents and must be safe to call
+    from several request threads at once.
+    """
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None."""
+        raise NotImplementedError
+
+    def set(self, key, value) -> None:
+        raise NotImplementedError
+
+    def delete(self, key) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Return backend counters such as ``size`` and ``evictions``."""
+        return {}
+
+
+class NullCache(CacheBackend):
+    """Backend that stores nothing, for disabling the cache."""
+
+    def __init__(self, **options):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value) -> None:
+        pass
+
+    def delete(self, key) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUCache(CacheBackend):
+    """Bounded in-process cache with least-recently-used eviction and TTL."""
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "evictions": self.evictions}
+
+
+BACKENDS = {"lru": LRUCache, "null": NullCache}
+
+
+class UserCache:
+    """Per-process cache of the users that sessions point at.
+
+    Saves the user lookup that Flask-Login would otherwise make on every
+    authenticated request. Entries are dropped when the user row changes
+    in this process and expire after ``USER_CACHE_TTL`` seconds, which
+    bounds how long other processes can serve a stale copy.
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        self.backend = LRUCache(
+            max_size=app.config.get("USER_CACHE_SIZE", 4096),
+            ttl=app.config.get("USER_CACHE_TTL", 30),
+        )
+        self.hits = 0
+        self.misses = 0
+        app.extensions["user_cache"] = self
+
+    def get(self, user_id: int):
+        user = self.backend.get(user_id)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set(self, user_id: int, user) -> None:
+        self.backend.set(user_id, user)
+
+    def invalidate(self, user_id: int) -> None:
+        self.backend.delete(user_id)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                **self.backend.stats()}
+
+
+class PayloadCache:
+    """Read-through cache of serialized post documents and listing pages.
+
+    Post documents are stored with the revision they were built from, so a
+    post that changed since is treated as a miss even before the writer's
+    explicit invalidation lands. Listing pages are keyed by the listing's
+    version stamp. Cached documents never contain per-user fields.
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app) -> None:
+        backend = app.config.get("PAYLOAD_CACHE_BACKEND", "lru")
+        if isinstance(backend, str):
+            backend = BACKENDS.get(backend) or import_string(backend)
+        self.backend = backend(
+            max_size=app.config.get("PAYLOAD_CACHE_SIZE", 1024),
+            ttl=app.config.get("PAYLOAD_CACHE_TTL", 60),
+        )
+        self.hits = 0
+        self.misses = 0
+        app.extensions["payload_cache"] = self
+
+    def _record(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_post(self, post_id: int, revision: int):
+        """Return the cached document for a post at ``revision``, or None."""
+        entry = self.backend.get(("post", post_id))
+        if entry is not None and entry[0] != revision:
+            entry = None
+        return self._record(entry[1] if entry else None)
+
+    def set_post(self, post_id: int, revision: int, document: dict) -> None:
+        self.backend.set(("post", post_id), (revision, document))
+
+    def invalidate_post(self, post_id: int) -> None:
+        self.backend.delete(("post", post_id))
+
+    def get_page(self, key):
+        """Return a cached listing page, or None."""
+        return self._record(self.backend.get(("page",) + key))
+
+    def set_page(self, key, page: dict) -> None:
+        self.backend.set(("page",) + key, page)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                **self.backend.stats()}
@@ -0,0 +1,32 @@
+from sqlalchemy import event
+from app.extensions import db
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+def configure_engines(app) -> None:
+    """Apply ``SQLITE_PRAGMAS`` to new connections of the app's engines.
+
+    PRAGMAs such as ``synchronous`` and ``cache_size`` are per connection,
+    so they must run each time the pool opens one. Engines for other
+    databases are left alone.
+
+    Args:
+        app: Flask app whose extensions are already initialized
+    """
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if not pragmas:
+        return
+    with app.app_context():
+        engines = [*db.engines.values(), *app.extensions.get("replicas", ())]
+        for engine in engines:
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", _pragma_listener(pragmas))
@@ -1,20 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from app.cache import PayloadCache, UserCache
+from app.metrics import Metrics
+from app.passwords import PasswordHasher
+from app.replicas import RoutingSession
+from app.vote_queue import VoteQueue
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
+payload_cache = PayloadCache()
+password_hasher = PasswordHasher()
+vote_queue = VoteQueue()
+user_cache = UserCache()
 
-
-@login_manager.user_loader
-def load_user(id):
-    """Load a user given the ID for Flask-Login.
-
-    Args:
-        id: The user ID to load
-
-    Returns:
-        User object or None if not found
-    """
-    from app.models import User
-
-    return User.query.get(int(id))
+metrics = Metrics()
@@ -0,0 +1,57 @@
+import hashlib
+from datetime import timezone
+
+from flask import jsonify, make_response, request
+
+# Cache-Control policies for read endpoints
+NO_CACHE_PUBLIC = "public, no-cache"
+NO_CACHE_PRIVATE = "private, no-cache"
+CATEGORIES_CACHE = "public, max-age=300, stale-while-revalidate=60"
+
+
+def make_etag(*parts) -> str:
+    """Hash version stamps into an entity tag."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110, 13.1.3)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since:
+        # HTTP dates have one-second resolution
+        stamp = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        return stamp <= request.if_modified_since
+    return False
+
+
+def conditional_json(build, etag, last_modified=None, cache_control=None,
+                     user_id=None, vary_cookie=False):
+    """Answer a GET from validators, serializing only when necessary.
+
+    Args:
+        build: Callable returning the JSON-serializable body
+        etag: Entity tag derived from the data's version stamps
+        last_modified: Naive UTC datetime of the latest change, if known
+        cache_control: Cache-Control value; defaults to revalidating on
+            every use, privately when ``user_id`` is set
+        user_id: The authenticated user the body was built for, if any
+        vary_cookie: Whether the body can depend on the session cookie
+
+    Returns:
+        A 304 response when the client's copy is current, else the body
+    """
+    if _not_modified(etag, last_modified):
+        response = make_response("", 304)
+    else:
+        response = jsonify(build())
+
+    if cache_control is None:
+        cache_control = NO_CACHE_PRIVATE if user_id else NO_CACHE_PUBLIC
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers["Cache-Control"] = cache_control
+    if vary_cookie:
+        response.vary.add("Cookie")
+    return response
@@ -1,31 +1,38 @@
 from app import db, create_app
 from app.models import Category
 
+# Default categories
+DEFAULT_CATEGORIES = [
+    "Football",
+    "Basketball",
+    "Baseball",
+    "Soccer",
+    "Tennis",
+    "Golf",
+    "Hockey",
+    "Rugby",
+    "Cricket",
+    "Swimming",
+]
 
-def init_categories():
-    app = create_app()
-    with app.app_context():
-        # Create default categories
-        categories = [
-            "Football",
-            "Basketball",
-            "Baseball",
-            "Soccer",
-            "Tennis",
-            "Golf",
-            "Hockey",
-            "Rugby",
-            "Cricket",
-            "Swimming",
-        ]
 
-        for category_name in categories:
-            category = Category.query.filter_by(name=category_name).first()
-            if not category:
-                category = Category(name=category_name)
-                db.session.add(category)
+def add_categories(names) -> None:
+    """Create the categories in ``names`` that do not exist yet."""
+    existing = set(
+        db.session.scalars(
+            db.select(Category.name).where(Category.name.in_(names))
+        )
+    )
+    db.session.add_all(
+        Category(name=name) for name in names if name not in existing
+    )
+    db.session.commit()
+
 
-        db.session.commit()
+def init_categories():
+    app = create_app(routes=False)
+    with app.app_context():
+        add_categories(DEFAULT_CATEGORIES)
         print("Categories initialized successfully!")
 
 
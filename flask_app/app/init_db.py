@@ -1,10 +1,11 @@
 from app import create_app
 from .extensions import db
 from .models import User, Category, Post, Reply, PostVote, ReplyVote
+from .votes import rebuild_vote_totals
 
 
 def init_db():
-    app = create_app()
+    app = create_app(routes=False)
     with app.app_context():
         # Drop all existing tables
         db.drop_all()
@@ -117,6 +118,7 @@ def init_db():
             db.session.add(vote)
 
         db.session.commit()
+        rebuild_vote_totals()
 
         print("Database initialized successfully with test data!")
 
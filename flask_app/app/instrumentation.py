@@ -0,0 +1,185 @@
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Longest statement or parameter text written to the log, in characters
+MAX_LOGGED_LENGTH = 2000
+
+
+class RequestQueries:
+    """SQL statements run while handling one request."""
+
+    def __init__(self, track_statements: bool):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        # Statement text -> executions; only kept for N+1 detection
+        self.statements = Counter() if track_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None:
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """Statements run at least ``threshold`` times, most frequent
+        first, as ``(statement, count)`` pairs."""
+        if self.statements is None:
+            return []
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def _shorten(text) -> str:
+    text = str(text)
+    if len(text) > MAX_LOGGED_LENGTH:
+        return text[:MAX_LOGGED_LENGTH] + "..."
+    return text
+
+
+def _query_plan(conn, statement, parameters) -> str:
+    """EXPLAIN QUERY PLAN output for a statement, run on a raw cursor so
+    the lookup is neither counted nor timed itself."""
+    if conn.dialect.name != "sqlite":
+        return "(query plans are only collected on SQLite)"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(row[3] for row in cursor.fetchall()) or "(none)"
+    except conn.dialect.loaded_dbapi.Error as error:
+        return f"(unavailable: {error})"
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    # Kept on the statement's own execution context rather than a stack
+    # on the pooled connection: a statement that raises never reaches
+    # after_cursor_execute, and its start would be left behind
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute_listener(slow_seconds):
+    def after_cursor_execute(conn, cursor, statement, parameters, context,
+                             executemany):
+        started = getattr(context, "query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if has_request_context():
+            stats = g.get("sql_queries")
+            if stats is not None:
+                stats.record(statement, elapsed)
+        if slow_seconds is not None and elapsed >= slow_seconds:
+            # Plans for executemany would need one parameter set per row
+            plan = (
+                "(executemany)" if executemany
+                else _query_plan(conn, statement, parameters)
+            )
+            logger.warning(
+                "Slow query (%.1f ms): %s\nParameters: %s\nPlan:\n%s",
+                elapsed * 1000,
+                _shorten(statement),
+                _shorten(parameters),
+                plan,
+                extra={
+                    "db_ms": round(elapsed * 1000, 3),
+                    "statement": statement,
+                    "endpoint": request.endpoint
+                    if has_request_context() else None,
+                },
+            )
+
+    return after_cursor_execute
+
+
+def init_instrumentation(app) -> None:
+    """Time SQL statements on the app's engines, including replicas.
+
+    Each request's statement count and database time are sent back in a
+    ``Server-Timing`` header and logged with the request as structured
+    fields (``logging`` extras). Statements slower than ``SLOW_QUERY_MS``
+    are logged with their parameters and query plan, and with
+    ``N_PLUS_ONE_THRESHOLD`` set, a request that runs one statement that
+    many times is flagged as a likely N+1 query.
+
+    Args:
+        app: Flask app whose extensions are already initialized
+    """
+    if not app.config.get("SQL_INSTRUMENTATION", True):
+        return
+    slow_ms = app.config.get("SLOW_QUERY_MS")
+    after_cursor_execute = _after_cursor_execute_listener(
+        None if slow_ms is None else slow_ms / 1000
+    )
+    with app.app_context():
+        engines = [*db.engines.values(), *app.extensions.get("replicas", ())]
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_report_request)
+
+
+def _start_request():
+    # The test client can reuse one app context, and with it ``g``, for
+    # several requests, so always start from fresh counts
+    threshold = current_app.config.get("N_PLUS_ONE_THRESHOLD")
+    g.sql_queries = RequestQueries(track_statements=threshold is not None)
+
+
+def _report_request(response):
+    stats = g.get("sql_queries")
+    if stats is None:
+        return response
+    db_ms = stats.seconds * 1000
+    total_ms = (time.perf_counter() - stats.started) * 1000
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={db_ms:.2f};desc="{stats.count} queries", '
+        f"app;dur={total_ms:.2f}",
+    )
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": round(total_ms, 3),
+        "db_queries": stats.count,
+        "db_ms": round(db_ms, 3),
+    }
+    logger.info(
+        "%s %s %s in %.1f ms, %d queries in %.1f ms",
+        request.method,
+        request.path,
+        response.status_code,
+        total_ms,
+        stats.count,
+        db_ms,
+        extra=fields,
+    )
+
+    threshold = current_app.config.get("N_PLUS_ONE_THRESHOLD")
+    for statement, count in stats.repeated(threshold):
+        logger.warning(
+            "Possible N+1 query in %s: ran %d times: %s",
+            request.endpoint,
+            count,
+            _shorten(statement),
+            extra={**fields, "statement": statement, "repeats": count},
+        )
+    return response
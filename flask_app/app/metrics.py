@@ -0,0 +1,327 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+# Upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Endpoint label for requests that matched no route
+UNMATCHED = "unmatched"
+# Other methods are counted as "other", so clients cannot create series
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Metric families as name: (type, help), in the order they are rendered
+FAMILIES = {
+    "forum_http_request_duration_seconds": (
+        "histogram", "Time spent handling requests, by endpoint."
+    ),
+    "forum_http_requests_total": (
+        "counter", "Requests handled, by endpoint and status code."
+    ),
+    "forum_http_requests_in_flight": (
+        "gauge", "Requests being handled right now."
+    ),
+    "forum_db_pool_size": (
+        "gauge", "Connections the database pool keeps open."
+    ),
+    "forum_db_pool_connections": (
+        "gauge", "Database pool connections by state."
+    ),
+    "forum_cache_hits_total": (
+        "counter", "Cache lookups that found an entry."
+    ),
+    "forum_cache_misses_total": (
+        "counter", "Cache lookups that found nothing."
+    ),
+    "forum_cache_evictions_total": (
+        "counter", "Cache entries evicted."
+    ),
+    "forum_cache_entries": ("gauge", "Entries held by the cache."),
+    "forum_password_hash_rejected_total": (
+        "counter", "Password checks turned away by a full hashing queue."
+    ),
+}
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _escape(value) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid() or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def render(samples) -> str:
+    """Format ``(family, sample, labels, value)`` tuples in the Prometheus
+    text exposition format."""
+    by_family = {}
+    for family, sample, labels, value in samples:
+        by_family.setdefault(family, []).append((sample, labels, value))
+    lines = []
+    for family, (kind, help_text) in FAMILIES.items():
+        if family not in by_family:
+            continue
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for sample, labels, value in by_family[family]:
+            label_text = ",".join(
+                f'{name}="{_escape(label)}"' for name, label in labels
+            )
+            if label_text:
+                sample = f"{sample}{{{label_text}}}"
+            lines.append(f"{sample} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """Request, database pool and cache metrics for ``/metrics``.
+
+    Recording a request costs a lock and a few dictionary updates. Pool
+    and cache figures are read from their owners when metrics are
+    collected.
+
+    Every worker process counts on its own. With ``METRICS_DIR`` set, each
+    one also writes a snapshot to ``metrics-<pid>.json`` in that directory
+    at most every ``METRICS_SYNC_INTERVAL`` seconds, and whichever worker
+    is scraped adds up all snapshots. Counters of workers that have exited
+    are kept, so totals never go down; their gauges are dropped.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.directory = None
+        self.sync_interval = 5
+        self._exit_hook = False
+        self._reset()
+        # A forked worker must not report its parent's requests as its own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        # (endpoint, method) -> requests per latency bucket, then requests
+        # above the last bucket, then the sum of latencies
+        self._latency = {}
+        self._statuses = Counter()
+        self._in_flight = Counter()
+        self._next_sync = 0.0
+
+    def init_app(self, app) -> None:
+        app.extensions["metrics"] = self
+        self.app = app
+        self._reset()
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        if not self.enabled:
+            return
+        self.directory = app.config.get("METRICS_DIR")
+        self.sync_interval = app.config.get("METRICS_SYNC_INTERVAL", 5)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            if not self._exit_hook:
+                atexit.register(self._write_at_exit)
+                self._exit_hook = True
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._leave_request)
+
+    def _start_request(self):
+        endpoint = request.endpoint or UNMATCHED
+        g.metrics_request = (endpoint, time.perf_counter())
+        with self._lock:
+            self._in_flight[endpoint] += 1
+
+    def _finish_request(self, response):
+        started = g.get("metrics_request")
+        if started is not None:
+            endpoint, started_at = started
+            self.observe(
+                endpoint,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started_at,
+            )
+        return response
+
+    def _leave_request(self, error=None):
+        started = g.pop("metrics_request", None)
+        if started is not None:
+            with self._lock:
+                self._in_flight[started[0]] -= 1
+
+    def observe(self, endpoint, method, status, seconds) -> None:
+        """Record one finished request."""
+        if method not in KNOWN_METHODS:
+            method = "other"
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        key = (endpoint, method)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = [0] * (len(LATENCY_BUCKETS) + 2)
+                self._latency[key] = histogram
+            histogram[bucket] += 1
+            histogram[-1] += seconds
+            self._statuses[(endpoint, method, str(status))] += 1
+        if self.directory and time.monotonic() >= self._next_sync:
+            self.write()
+
+    def _request_samples(self):
+        with self._lock:
+            latency = {key: list(counts) for key, counts in
+                       self._latency.items()}
+            statuses = dict(self._statuses)
+            in_flight = dict(self._in_flight)
+
+        family = "forum_http_request_duration_seconds"
+        for (endpoint, method), counts in sorted(latency.items()):
+            labels = [["endpoint", endpoint], ["method", method]]
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, counts):
+                cumulative += count
+                yield (family, f"{family}_bucket",
+                       labels + [["le", repr(bound)]], cumulative)
+            cumulative += counts[len(LATENCY_BUCKETS)]
+            yield (family, f"{family}_bucket", labels + [["le", "+Inf"]],
+                   cumulative)
+            yield family, f"{family}_sum", labels, counts[-1]
+            yield family, f"{family}_count", labels, cumulative
+
+        family = "forum_http_requests_total"
+        for (endpoint, method, status), count in sorted(statuses.items()):
+            yield (family, family, [["endpoint", endpoint],
+                                    ["method", method], ["status", status]],
+                   count)
+
+        family = "forum_http_requests_in_flight"
+        for endpoint, count in sorted(in_flight.items()):
+            yield family, family, [["endpoint", endpoint]], count
+
+    def _pool_samples(self):
+        from app.extensions import db
+
+        with self.app.app_context():
+            engines = {
+                key or "primary": engine
+                for key, engine in db.engines.items()
+            }
+        for number, engine in enumerate(
+            self.app.extensions.get("replicas", ())
+        ):
+            engines[f"replica{number}"] = engine
+
+        for name, engine in engines.items():
+            pool = engine.pool
+            # Only queue pools keep counts; SQLite memory databases use
+            # single-connection pools without them
+            if not hasattr(pool, "checkedout"):
+                continue
+            yield ("forum_db_pool_size", "forum_db_pool_size",
+                   [["engine", name]], pool.size())
+            for state, value in (
+                ("idle", pool.checkedin()),
+                ("in_use", pool.checkedout()),
+                ("overflow", max(pool.overflow(), 0)),
+            ):
+                yield ("forum_db_pool_connections",
+                       "forum_db_pool_connections",
+                       [["engine", name], ["state", state]], value)
+
+    def _cache_samples(self):
+        from app.extensions import password_hasher, payload_cache, user_cache
+
+        for name, cache in (("payload", payload_cache),
+                            ("users", user_cache)):
+            stats = cache.stats()
+            labels = [["cache", name]]
+            for family, stat in (
+                ("forum_cache_hits_total", "hits"),
+                ("forum_cache_misses_total", "misses"),
+                ("forum_cache_evictions_total", "evictions"),
+                ("forum_cache_entries", "size"),
+            ):
+                if stat in stats:
+                    yield family, family, labels, stats[stat]
+        family = "forum_password_hash_rejected_total"
+        yield family, family, [], password_hasher.stats()["rejected"]
+
+    def samples(self) -> list:
+        """This process's metrics as ``(family, sample, labels, value)``."""
+        return [
+            *self._request_samples(),
+            *self._pool_samples(),
+            *self._cache_samples(),
+        ]
+
+    def write(self) -> None:
+        """Write this process's snapshot to ``METRICS_DIR``."""
+        self._next_sync = time.monotonic() + self.sync_interval
+        snapshot = {"pid": os.getpid(), "samples": self.samples()}
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        with os.fdopen(descriptor, "w") as output:
+            json.dump(snapshot, output)
+        os.replace(
+            temporary,
+            os.path.join(self.directory, f"metrics-{os.getpid()}.json"),
+        )
+
+    def _write_at_exit(self):
+        if self.enabled and self.directory:
+            self.write()
+
+    def collect(self) -> list:
+        """Samples for the whole deployment: this process's alone, or the
+        sum over every snapshot in ``METRICS_DIR``."""
+        if not self.directory:
+            return self.samples()
+        self.write()
+        merged = {}
+        pattern = os.path.join(self.directory, "metrics-*.json")
+        for path in glob.glob(pattern):
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            alive = _alive(snapshot["pid"])
+            for family, sample, labels, value in snapshot["samples"]:
+                kind = FAMILIES.get(family, ("unknown",))[0]
+                if kind == "unknown" or (kind == "gauge" and not alive):
+                    continue
+                key = (family, sample, tuple(map(tuple, labels)))
+                merged[key] = merged.get(key, 0) + value
+        return [
+            (family, sample, labels, value)
+            for (family, sample, labels), value in merged.items()
+        ]
+
+    def render(self) -> str:
+        return render(self.collect())
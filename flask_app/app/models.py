@@ -1,7 +1,20 @@
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.extensions import db
+from sqlalchemy import event, func, select, update
+from app.extensions import db, login_manager, password_hasher, user_cache
+from app.pagination import split_page
+from app.ranking import hot_rank, hot_rank_sql
+
+# Characters of post content shown in list views
+EXCERPT_LENGTH = 200
+# Replies embedded in a post document; the rest are paged through
+# GET /api/posts/<id>/replies
+REPLY_PREVIEW_SIZE = 20
+# Digits of each reply id in a materialized path; fixed width keeps paths
+# sorting like the ids they are made of
+PATH_SEGMENT_WIDTH = 10
+# Deepest nesting of replies under a post
+MAX_REPLY_DEPTH = 32
 
 
 class BaseModel(db.Model):
@@ -15,19 +28,34 @@ class User(UserMixin, BaseModel):
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
+    is_admin = db.Column(
+        db.Boolean, nullable=False, default=False, server_default="0"
+    )
     posts = db.relationship("Post", backref="author", lazy="dynamic")
     replies = db.relationship("Reply", backref="author", lazy="dynamic")
     post_votes = db.relationship("PostVote", backref="user", lazy="dynamic")
     reply_votes = db.relationship("ReplyVote", backref="user", lazy="dynamic")
 
     def set_password(self, password: str) -> None:
-        """Hashes and sets the password."""
-        self.password_hash = generate_password_hash(password)
+        """Hashes and sets the password.
+
+        Raises:
+            HashingBusy: if the hashing pool is saturated
+        """
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        """Checks if the provided password matches the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        """Checks if the provided password matches the stored hash.
+
+        Raises:
+            HashingBusy: if the hashing pool is saturated
+        """
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        """Whether the stored hash predates the configured method or cost."""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self) -> dict:
         return {"id": self.id, "username": self.username}
@@ -36,6 +64,52 @@ class User(UserMixin, BaseModel):
         return f"<User {self.username}>"
 
 
+class CachedUser(UserMixin):
+    """Detached snapshot of a user, as ``current_user`` sees it.
+
+    Holds only what requests read from ``current_user``; load the ``User``
+    row when anything more is needed.
+    """
+
+    def __init__(self, id: int, username: str, is_admin: bool = False):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "username": self.username}
+
+
+@login_manager.user_loader
+def load_user(id):
+    """Load a user given the ID for Flask-Login.
+
+    Args:
+        id: The user ID to load
+
+    Returns:
+        CachedUser or None if not found
+    """
+    user_id = int(id)
+    user = user_cache.get(user_id)
+    if user is None:
+        row = db.session.execute(
+            select(User.id, User.username, User.is_admin)
+            .where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        user_cache.set(user_id, user)
+    return user
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _forget_cached_user(mapper, connection, user):
+    user_cache.invalidate(user.id)
+
+
 class Category(db.Model):
     __tablename__ = "category"
 
@@ -68,6 +142,8 @@ class PostVote(db.Model):
         db.UniqueConstraint(
             "user_id", "post_id", name="uq_post_vote_user_post"
         ),
+        # A post's votes; covers the totals in app.votes.rebuild_vote_totals
+        db.Index("ix_post_vote_post_value", "post_id", "value"),
     )
 
     def to_dict(self) -> dict:
@@ -95,6 +171,8 @@ class ReplyVote(db.Model):
         db.UniqueConstraint(
             "user_id", "reply_id", name="uq_reply_vote_user_reply"
         ),
+        # A reply's votes; covers the totals in app.votes.rebuild_vote_totals
+        db.Index("ix_reply_vote_reply_value", "reply_id", "value"),
     )
 
     def to_dict(self) -> dict:
@@ -114,13 +192,78 @@ class Post(db.Model):
     title = db.Column(db.String(140))
     content = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    # One character past the excerpt so callers can tell it was cut short
+    excerpt = db.column_property(
+        func.substr(content, 1, EXCERPT_LENGTH + 1), deferred=True
+    )
+
+    # Denormalized totals, maintained by app.votes and the Reply mapper
+    # events at the bottom of this module
+    score = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    upvotes = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    downvotes = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    reply_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    # Stored rankings for the hot and top feeds, maintained by app.votes
+    # and app.ranking
+    hot_score = db.Column(
+        db.Float, nullable=False, default=0.0, server_default="0"
+    )
+    week_score = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    # Version stamps for HTTP validators; bumped by Post.touch
+    revision = db.Column(
+        db.Integer, nullable=False, default=1, server_default="1"
+    )
+    modified_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     category_id = db.Column(db.Integer, db.ForeignKey("category.id"))
     replies = db.relationship("Reply", backref="post", lazy="dynamic")
     votes = db.relationship("PostVote", backref="post", lazy="dynamic")
 
-    def to_dict(self) -> dict:
+    __table_args__ = (
+        db.Index("ix_post_category_modified", "category_id", "modified_at"),
+        # The newest posts in a category, already in feed order
+        db.Index("ix_post_category_timestamp", "category_id", "timestamp"),
+        # Ranked category feeds, likewise
+        db.Index(
+            "ix_post_category_hot_score", "category_id", "hot_score", "id"
+        ),
+        db.Index("ix_post_category_score", "category_id", "score", "id"),
+        db.Index(
+            "ix_post_category_week_score", "category_id", "week_score", "id"
+        ),
+        db.Index("ix_post_hot_score", "hot_score", "id"),
+        db.Index("ix_post_score", "score", "id"),
+        db.Index("ix_post_week_score", "week_score", "id"),
+    )
+
+    def to_dict(self, replies=None) -> dict:
+        """Serialize the post with its first ``REPLY_PREVIEW_SIZE`` replies
+        embedded.
+
+        Args:
+            replies: Preloaded replies in thread order, at least one more
+                than the preview if there are more; queried if omitted
+        """
+        if replies is None:
+            replies = self.replies.order_by(*REPLY_THREAD_ORDER).limit(
+                REPLY_PREVIEW_SIZE + 1
+            )
+        replies, next_cursor = split_page(
+            list(replies), REPLY_THREAD_ORDER, REPLY_PREVIEW_SIZE
+        )
         return {
             "id": self.id,
             "title": self.title,
@@ -130,8 +273,12 @@ class Post(db.Model):
             "category_id": self.category_id,
             "author": self.author.to_dict() if self.author else None,
             "category": self.category.to_dict() if self.category else None,
-            "replies": [reply.to_dict() for reply in self.replies],
+            "replies": [reply.to_dict() for reply in replies],
+            "replies_next_cursor": next_cursor,
+            "reply_count": self.reply_count or 0,
             "vote_count": self.vote_count,
+            "upvotes": self.upvotes or 0,
+            "downvotes": self.downvotes or 0,
         }
 
     def __repr__(self):
@@ -142,22 +289,24 @@ class Post(db.Model):
         """Check if post has no content."""
         return not bool(self.content.strip())
 
-    @property
-    def reply_count(self) -> int:
-        """Get number of replies to this post."""
-        return self.replies.count()
-
     @property
     def vote_count(self) -> int:
         """Get vote count (upvotes minus downvotes)"""
-        from sqlalchemy import func
+        return self.score or 0
 
-        result = (
-            db.session.query(func.sum(PostVote.value))
-            .filter(PostVote.post_id == self.id)
-            .scalar()
+    @classmethod
+    def touch(cls, post_id) -> None:
+        """Mark a post as changed so cached copies get revalidated.
+
+        Args:
+            post_id: The post ID, or a scalar subquery selecting it
+        """
+        db.session.execute(
+            update(cls)
+            .where(cls.id == post_id)
+            .values(revision=cls.revision + 1, modified_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
         )
-        return result or 0
 
     def get_user_vote(self, user_id) -> int:
         """Get the value of a user's vote for this post.
@@ -181,10 +330,51 @@ class Reply(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+    # Denormalized vote totals, maintained by app.votes
+    score = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    upvotes = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+    downvotes = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     post_id = db.Column(db.Integer, db.ForeignKey("post.id"))
     votes = db.relationship("ReplyVote", backref="reply", lazy="dynamic")
 
+    # Nesting: the reply this one answers, if any, and the materialized
+    # path of its ancestors' ids ("" for top-level replies), so a subtree
+    # is one range of (post_id, path); see place_under
+    parent_id = db.Column(db.Integer, db.ForeignKey("reply.id"))
+    path = db.Column(
+        db.String, nullable=False, default="", server_default=""
+    )
+    depth = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
+
+    __table_args__ = (
+        # One post's replies in thread order, and by score for sort=top
+        db.Index("ix_reply_post_timestamp", "post_id", "timestamp"),
+        db.Index("ix_reply_post_score", "post_id", "score"),
+        # Subtrees, and top-level replies (path = "")
+        db.Index("ix_reply_post_path", "post_id", "path"),
+    )
+
+    @property
+    def subtree_path(self) -> str:
+        """Path prefix shared by every reply below this one."""
+        return f"{self.path}{self.id:0{PATH_SEGMENT_WIDTH}d}/"
+
+    def place_under(self, parent) -> None:
+        """Make this reply an answer to ``parent``, a reply on the same
+        post that has been flushed."""
+        self.parent_id = parent.id
+        self.path = parent.subtree_path
+        self.depth = parent.depth + 1
+
     def to_dict(self) -> dict:
         return {
             "id": self.id,
@@ -192,8 +382,12 @@ class Reply(db.Model):
             "timestamp": self.timestamp.isoformat(),
             "user_id": self.user_id,
             "post_id": self.post_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth or 0,
             "author": self.author.to_dict() if self.author else None,
             "vote_count": self.vote_count,
+            "upvotes": self.upvotes or 0,
+            "downvotes": self.downvotes or 0,
         }
 
     def __repr__(self):
@@ -202,14 +396,7 @@ class Reply(db.Model):
     @property
     def vote_count(self) -> int:
         """Get vote count (upvotes minus downvotes)"""
-        from sqlalchemy import func
-
-        result = (
-            db.session.query(func.sum(ReplyVote.value))
-            .filter(ReplyVote.reply_id == self.id)
-            .scalar()
-        )
-        return result or 0
+        return self.score or 0
 
     def get_user_vote(self, user_id) -> int:
         """Get the value of a user's vote for this reply.
@@ -221,3 +408,37 @@ class Reply(db.Model):
             reply_id=self.id, user_id=user_id
         ).first()
         return vote.value if vote else 0
+
+
+# Keyset columns that put a post's replies in the order they were written
+REPLY_THREAD_ORDER = (Reply.timestamp, Reply.id)
+
+
+@event.listens_for(Post, "before_insert")
+def _rank_new_post(mapper, connection, post):
+    if post.timestamp is None:
+        post.timestamp = datetime.utcnow()
+    post.hot_score = hot_rank(post.score, post.reply_count, post.timestamp)
+
+
+def _adjust_reply_count(connection, post_id, delta) -> None:
+    connection.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values(
+            reply_count=Post.reply_count + delta,
+            hot_score=hot_rank_sql(
+                Post, reply_count=Post.reply_count + delta
+            ),
+        )
+    )
+
+
+@event.listens_for(Reply, "after_insert")
+def _count_new_reply(mapper, connection, reply):
+    _adjust_reply_count(connection, reply.post_id, 1)
+
+
+@event.listens_for(Reply, "after_delete")
+def _count_deleted_reply(mapper, connection, reply):
+    _adjust_reply_count(connection, reply.post_id, -1)
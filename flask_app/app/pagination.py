@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we could not have issued."""
+
+
+def parse_limit(limit) -> int:
+    """Clamp a requested page size to ``1..MAX_PAGE_SIZE``."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    """Unpack a cursor produced by ``encode_cursor`` for ``columns``.
+
+    Raises:
+        InvalidCursor: if the token is malformed or has the wrong shape
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Malformed cursor")
+
+    return [_decode_value(column, value) for column, value in
+            zip(columns, values)]
+
+
+def _decode_value(column, value):
+    """Check one cursor value against the type of ``column``."""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        expected = None
+
+    if expected is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Malformed cursor")
+    # Anything but a scalar of the column's type, such as a list, would
+    # reach the SQL comparison; bool is an int subclass but never a key
+    if isinstance(value, bool):
+        raise InvalidCursor("Malformed cursor")
+    if expected is float:
+        valid = isinstance(value, (int, float)) and math.isfinite(value)
+    elif expected is not None:
+        valid = isinstance(value, expected)
+    else:
+        valid = isinstance(value, (str, int, float))
+    if not valid:
+        raise InvalidCursor("Malformed cursor")
+    return value
+
+
+def order_keyset(query, columns, cursor=None, descending=True):
+    """Order ``query`` by ``columns``, resuming after ``cursor``.
+
+    Raises:
+        InvalidCursor: if ``cursor`` is malformed
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < values if descending else key > values)
+    return query.order_by(
+        *[column.desc() if descending else column.asc() for column in columns]
+    )
+
+
+def split_page(items, columns, limit):
+    """Cut up to ``limit + 1`` fetched rows down to one page.
+
+    Returns:
+        A ``(items, next_cursor)`` tuple; ``next_cursor`` is None when no
+        row was left over.
+    """
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(
+        [getattr(last, column.key) for column in columns]
+    )
+
+
+def paginate_keyset(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE,
+                    descending=True):
+    """Fetch one page of ``query`` ordered by ``columns``.
+
+    The columns must form a unique key (end with the primary key) so that
+    ``(col1, col2, ...) < cursor`` picks up exactly where the last page
+    stopped, no matter how deep the client has scrolled. Pages run from
+    the highest key down unless ``descending`` is False.
+
+    Returns:
+        A ``(items, next_cursor)`` tuple; ``next_cursor`` is None on the
+        last page.
+    """
+    items = (
+        order_keyset(query, columns, cursor, descending)
+        .limit(limit + 1)
+        .all()
+    )
+    return split_page(items, columns, limit)
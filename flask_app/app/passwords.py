@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool already has a full queue of work."""
+
+
+@lru_cache(maxsize=None)
+def _canonical_method(method: str) -> str:
+    """Return ``method`` with werkzeug's defaults filled in, as stored in
+    hashes, e.g. "pbkdf2:sha256" becomes "pbkdf2:sha256:600000"."""
+    return generate_password_hash("", method, salt_length=1).split("$", 1)[0]
+
+
+class PasswordHasher:
+    """Password hashing on a small bounded thread pool.
+
+    Hashing is deliberately slow and CPU-bound. Running it on at most
+    ``PASSWORD_HASH_WORKERS`` threads (hashlib releases the GIL while it
+    works) caps how much CPU a login burst can take from other requests,
+    and ``PASSWORD_HASH_QUEUE_DEPTH`` caps how many requests may wait for
+    a worker; past that ``HashingBusy`` is raised instead of queueing.
+    With no workers, hashing runs in the calling thread.
+    """
+
+    def __init__(self):
+        self.method = "scrypt"
+        self.salt_length = 16
+        self.rejected = 0
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app) -> None:
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        self.salt_length = app.config.get("PASSWORD_SALT_LENGTH", 16)
+        workers = app.config.get("PASSWORD_HASH_WORKERS", 2)
+        depth = app.config.get("PASSWORD_HASH_QUEUE_DEPTH", 16)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        if workers:
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="password-hash"
+            )
+            self._slots = threading.BoundedSemaphore(workers + depth)
+        self.rejected = 0
+        app.extensions["password_hasher"] = self
+
+    def run(self, fn, *args):
+        """Call ``fn(*args)`` on the pool and wait for its result.
+
+        Raises:
+            HashingBusy: if every worker is busy and the queue is full
+        """
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy("Too many password checks in progress")
+        try:
+            future = self._executor.submit(self._call, fn, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+    def _call(self, fn, args):
+        # Free the slot before the result is published, so a caller that
+        # saw its hash finish can always submit the next one
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash ``password`` with the configured method and cost."""
+        return self.run(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Check ``password`` against a hash made with any method."""
+        return self.run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Whether a stored hash was made with other method or cost."""
+        return pwhash.split("$", 1)[0] != _canonical_method(self.method)
+
+    def stats(self) -> dict:
+        return {"rejected": self.rejected}
@@ -0,0 +1,194 @@
+import cProfile
+import glob
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask import current_app, g, request
+from flask.cli import AppGroup
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Header and query parameter that carry an admin's profiling token
+PROFILE_HEADER = "X-Profile"
+PROFILE_ARG = "profile"
+TOKEN_SALT = "request-profile"
+# Separates the endpoint, query count and unique suffix in dump names
+NAME_SEPARATOR = "--"
+
+# Only one request is profiled at a time: profiling slows a request
+# down several times, and concurrent profilers would interfere
+_active = threading.Lock()
+
+
+def _serializer(app) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+def profile_token(app, user_id: int) -> str:
+    """Sign a token that lets the admin ``user_id`` profile requests."""
+    return _serializer(app).dumps(user_id)
+
+
+def _token_allows_profiling() -> bool:
+    token = request.headers.get(PROFILE_HEADER) or request.args.get(
+        PROFILE_ARG
+    )
+    if not token:
+        return False
+    try:
+        user_id = _serializer(current_app).loads(
+            token, max_age=current_app.config["PROFILE_TOKEN_MAX_AGE"]
+        )
+    except BadSignature:
+        return False
+    return (
+        current_user.is_authenticated
+        and current_user.is_admin
+        and current_user.id == user_id
+    )
+
+
+def profile_dir(app) -> str:
+    return app.config.get("PROFILE_DIR") or os.path.join(
+        app.instance_path, "profiles"
+    )
+
+
+def init_profiling(app) -> None:
+    """Profile selected requests with cProfile when ``PROFILING`` is set.
+
+    A request is profiled when it is picked at ``PROFILE_SAMPLE_RATE``, or
+    when an admin sends a token from ``flask profile token`` in the
+    ``X-Profile`` header or the ``profile`` query parameter. Each profile
+    is written to ``PROFILE_DIR`` as ``<endpoint>--q<queries>--<id>.prof``,
+    where ``queries`` is the request's SQL statement count (see
+    ``app.instrumentation``). The body of a streamed response is produced
+    after the profile is taken and is not included.
+    """
+    if not app.config.get("PROFILING", False):
+        return
+    os.makedirs(profile_dir(app), exist_ok=True)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_discard_profile)
+
+
+def _start_profile():
+    rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0)
+    sampled = rate and random.random() < rate
+    if not (sampled or _token_allows_profiling()):
+        return
+    if not _active.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    g.profiler = profiler
+    profiler.enable()
+
+
+def _finish_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    _active.release()
+
+    stats = g.get("sql_queries")
+    queries = "na" if stats is None else stats.count
+    name = NAME_SEPARATOR.join((
+        request.endpoint or "unmatched",
+        f"q{queries}",
+        f"{time.time_ns()}-{os.getpid()}",
+    ))
+    path = os.path.join(profile_dir(current_app), f"{name}.prof")
+    profiler.dump_stats(path)
+    current_app.logger.info("Profile of %s written to %s", request.path, path)
+    return response
+
+
+def _discard_profile(error=None):
+    # Only reached with a profile still running when after_request was
+    # skipped, e.g. by an error in another after_request function
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        _active.release()
+
+
+def _parse_name(path):
+    """Return the endpoint and query count encoded in a dump's name."""
+    name = os.path.basename(path)[:-len(".prof")]
+    endpoint, queries, _ = name.split(NAME_SEPARATOR)
+    return endpoint, None if queries == "qna" else int(queries[1:])
+
+
+def aggregate(directory, endpoint=None) -> dict:
+    """Group the dumps in ``directory`` by endpoint.
+
+    Returns:
+        Mapping of endpoint to ``(paths, queries)``, where ``queries`` is
+        the mean SQL statement count or None when it was not recorded
+    """
+    paths = defaultdict(list)
+    queries = defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(directory, "*.prof"))):
+        try:
+            name, count = _parse_name(path)
+        except ValueError:
+            continue
+        if endpoint is not None and name != endpoint:
+            continue
+        paths[name].append(path)
+        if count is not None:
+            queries[name].append(count)
+    return {
+        name: (
+            files,
+            sum(queries[name]) / len(queries[name]) if queries[name]
+            else None,
+        )
+        for name, files in paths.items()
+    }
+
+
+profile_cli = AppGroup("profile", help="Profile requests.")
+
+
+@profile_cli.command("token")
+@click.argument("username")
+def token_command(username):
+    """Print a profiling token for the admin USERNAME."""
+    from app.models import User
+
+    user = User.query.filter_by(username=username).first()
+    if user is None or not user.is_admin:
+        raise click.ClickException(f"{username} is not an admin")
+    click.echo(profile_token(current_app, user.id))
+
+
+@profile_cli.command("report")
+@click.option("--dir", "directory", help="Defaults to PROFILE_DIR.")
+@click.option("--endpoint", help="Only report this endpoint.")
+@click.option("--sort", default="tottime", show_default=True,
+              help="pstats sort key, e.g. cumulative.")
+@click.option("--limit", default=20, show_default=True,
+              help="Functions shown per endpoint.")
+def report_command(directory, endpoint, sort, limit):
+    """Show the hottest functions per endpoint across all dumps."""
+    directory = directory or profile_dir(current_app)
+    endpoints = aggregate(directory, endpoint)
+    if not endpoints:
+        raise click.ClickException(f"No profiles in {directory}")
+    for name, (paths, queries) in sorted(endpoints.items()):
+        mean = "unknown" if queries is None else f"{queries:.1f}"
+        click.echo(f"== {name}: {len(paths)} requests, {mean} queries each")
+        output = io.StringIO()
+        pstats.Stats(*paths, stream=output).sort_stats(sort).print_stats(
+            limit
+        )
+        click.echo(output.getvalue())
@@ -0,0 +1,104 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.engine import Engine
+from app.extensions import db
+
+# Reference point for hot scores; only differences between posts matter
+HOT_EPOCH = datetime(2005, 12, 8, 7, 46, 43)
+# Seconds of age that cost a post one order of magnitude of activity
+HOT_DECAY_SECONDS = 45000
+# How much a reply counts towards activity, relative to a net upvote
+REPLY_WEIGHT = 0.5
+
+# Length of the windowed "top" feed
+TOP_WINDOW = timedelta(days=7)
+
+
+def hot_rank(score, reply_count, timestamp) -> float:
+    """Time-decayed ranking in the style of Reddit's "hot" sort.
+
+    Activity counts logarithmically and every HOT_DECAY_SECONDS of age is
+    worth one order of magnitude of it. Newer posts start higher instead
+    of older posts sinking, so stored scores never need rewriting just
+    because time has passed; they only change when activity does.
+
+    Args:
+        score: Net votes
+        reply_count: Number of replies
+        timestamp: Creation time, as a datetime or SQLite ISO string
+    """
+    if timestamp is None:
+        return 0.0
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+
+    activity = (score or 0) + REPLY_WEIGHT * (reply_count or 0)
+    order = math.log10(max(abs(activity), 1))
+    sign = (activity > 0) - (activity < 0)
+    age = (timestamp - HOT_EPOCH).total_seconds()
+    return round(sign * order + age / HOT_DECAY_SECONDS, 7)
+
+
+@event.listens_for(Engine, "connect")
+def register_sql_functions(dbapi_connection, connection_record):
+    """Expose ``hot_rank`` to SQL so updates can rank rows in place."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            "hot_rank", 3, hot_rank, deterministic=True
+        )
+
+
+def hot_rank_sql(model, score=None, reply_count=None):
+    """SQL expression ranking ``model`` rows, optionally with new totals."""
+    return func.hot_rank(
+        model.score if score is None else score,
+        model.reply_count if reply_count is None else reply_count,
+        model.timestamp,
+    )
+
+
+def refresh_rankings(now=None) -> None:
+    """Recompute windowed top scores and hot scores for every post.
+
+    Votes are added to the windowed score as they arrive; this job is what
+    lets them age out of the window. Run it periodically.
+    """
+    from app.models import Post, PostVote
+
+    now = now or datetime.utcnow()
+    window = (
+        select(
+            PostVote.post_id.label("post_id"),
+            func.sum(PostVote.value).label("total"),
+        )
+        .where(PostVote.timestamp >= now - TOP_WINDOW)
+        .group_by(PostVote.post_id)
+        .subquery()
+    )
+
+    # Only rows whose score changes are written, so listing validators
+    # and cached pages survive a refresh that changed nothing
+    db.session.execute(
+        update(Post)
+        .where(
+            Post.week_score != 0,
+            Post.id.not_in(select(window.c.post_id)),
+        )
+        .values(week_score=0, modified_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Post)
+        .where(Post.id == window.c.post_id, Post.week_score != window.c.total)
+        .values(week_score=window.c.total, modified_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Post)
+        .values(hot_score=hot_rank_sql(Post))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
@@ -0,0 +1,13 @@
+from app import create_app
+from app.search_index import rebuild_search_index
+
+
+def main():
+    app = create_app(routes=False)
+    with app.app_context():
+        rebuild_search_index()
+        print("Search index rebuilt successfully!")
+
+
+if __name__ == "__main__":
+    main()
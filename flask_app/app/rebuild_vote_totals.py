@@ -0,0 +1,13 @@
+from app import create_app
+from app.votes import rebuild_vote_totals
+
+
+def main():
+    app = create_app(routes=False)
+    with app.app_context():
+        changed = rebuild_vote_totals()
+        print(f"Vote totals rebuilt successfully! {changed} posts repaired.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from app import create_app
+from app.ranking import refresh_rankings
+
+
+def main():
+    app = create_app(routes=False)
+    with app.app_context():
+        refresh_rankings()
+        print("Rankings refreshed successfully!")
+
+
+if __name__ == "__main__":
+    main()
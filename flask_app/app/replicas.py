@@ -0,0 +1,105 @@
+import os
+import random
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request, session
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# Session key holding the time until which a user reads from the primary
+PRIMARY_UNTIL_KEY = "_primary_until"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when the view allows it.
+
+    Only SELECT statements outside of a flush are routed; writes, flushes
+    and raw SQL always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get("replica_engine") if has_app_context() else None
+        if (
+            replica is not None
+            and bind is None
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+        ):
+            return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _resolve_url(app, uri):
+    """Resolve relative SQLite paths against the instance folder, as
+    Flask-SQLAlchemy does for the primary."""
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite" or url.database in (None, ""):
+        return url
+    is_uri = url.query.get("uri", False)
+    path = url.database[5:] if is_uri else url.database
+    if path == ":memory:" or os.path.isabs(path):
+        return url
+    path = os.path.join(app.instance_path, path)
+    return url.set(database=f"file:{path}" if is_uri else path)
+
+
+def init_replicas(app) -> None:
+    """Create engines for ``SQLALCHEMY_REPLICAS``.
+
+    Replicas are database URIs, e.g. a copy of the primary SQLite file
+    opened read-only with ``sqlite:///file:replica.db?mode=ro&uri=true``,
+    and share the primary's SQLALCHEMY_ENGINE_OPTIONS. They are kept out
+    of SQLALCHEMY_BINDS so ``create_all`` never tries to write to them;
+    keeping them current is up to whatever produces the copies.
+    """
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    engines = [
+        create_engine(_resolve_url(app, uri), **options)
+        for uri in app.config.get("SQLALCHEMY_REPLICAS") or []
+    ]
+    app.extensions["replicas"] = engines
+    if engines:
+        app.before_request(_reset_routing)
+        app.after_request(_remember_writes)
+
+
+def _reset_routing():
+    g.pop("replica_engine", None)
+
+
+def _remember_writes(response):
+    """Pin a user who just wrote to the primary, so they read their writes.
+
+    Replicas lag behind the primary; for REPLICA_STICKY_SECONDS after a
+    successful write the user's reads skip them.
+    """
+    if (
+        request.method not in READ_METHODS
+        and response.status_code < 400
+        and current_user.is_authenticated
+    ):
+        session[PRIMARY_UNTIL_KEY] = (
+            time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+        )
+    return response
+
+
+def read_replica(view):
+    """Let a read-only view query a replica instead of the primary.
+
+    Falls back to the primary when no replicas are configured or the user
+    wrote recently (see ``_remember_writes``).
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.extensions.get("replicas")
+        if replicas and session.get(PRIMARY_UNTIL_KEY, 0) < time.time():
+            g.replica_engine = random.choice(replicas)
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -1,6 +1 @@
-from .main import main
-from .auth import auth
-from .posts import posts
-from .categories import categories
-
-__all__ = ["main", "auth", "posts", "categories"]
+# Blueprints are imported by create_app as it registers them; see BLUEPRINTS
@@ -1,10 +1,22 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user, login_user, logout_user
 from app.models import User
+from app.passwords import HashingBusy
+from app.replicas import read_replica
 from app import db
 
 auth = Blueprint("auth", __name__)
 
+# Seconds a client should wait after the hashing pool turned it away
+HASHING_RETRY_AFTER = 1
+
+
+@auth.errorhandler(HashingBusy)
+def hashing_busy(error):
+    response = jsonify({"error": "Server busy, please try again"})
+    response.headers["Retry-After"] = str(HASHING_RETRY_AFTER)
+    return response, 503
+
 
 @auth.route("/auth/register", methods=["POST"])
 def register():
@@ -37,6 +49,11 @@ def login():
     if not user or not user.check_password(data["password"]):
         return jsonify({"error": "Invalid username or password"}), 401
 
+    if user.password_needs_rehash():
+        # The password is known to be right, so upgrade its hash in place
+        user.set_password(data["password"])
+        db.session.commit()
+
     login_user(user)
     return jsonify(user.to_dict())
 
@@ -49,6 +66,7 @@ def logout():
 
 
 @auth.route("/auth/user", methods=["GET"])
+@read_replica
 def get_user():
     if not current_user.is_authenticated:
         return jsonify({"error": "Not authenticated"}), 401
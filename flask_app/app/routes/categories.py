@@ -1,12 +1,23 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+from sqlalchemy import func
+from app.extensions import db
+from app.http_cache import CATEGORIES_CACHE, conditional_json, make_etag
 from app.models import Category
+from app.replicas import read_replica
 
 categories = Blueprint("categories", __name__)
 
 
 @categories.route("/categories", methods=["GET"])
+@read_replica
 def get_categories():
-    categories = Category.query.all()
-    if not categories:
-        return jsonify([])
-    return jsonify([category.to_dict() for category in categories])
+    count, max_id = db.session.query(
+        func.count(Category.id), func.max(Category.id)
+    ).one()
+
+    def build():
+        return [category.to_dict() for category in Category.query.all()]
+
+    return conditional_json(
+        build, make_etag(count, max_id), cache_control=CATEGORIES_CACHE
+    )
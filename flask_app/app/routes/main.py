@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, abort, jsonify
+from app.extensions import metrics
+from app.metrics import CONTENT_TYPE
 
 main = Blueprint("main", __name__)
 
@@ -6,3 +8,10 @@ main = Blueprint("main", __name__)
 @main.route("/")
 def index():
     return jsonify({"status": "healthy", "version": "1.0"})
+
+
+@main.route("/metrics")
+def prometheus_metrics():
+    if not metrics.enabled:
+        abort(404)
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
@@ -1,30 +1,364 @@
-from flask import Blueprint, jsonify, request
+import json
+from itertools import islice
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    jsonify,
+    request,
+    stream_with_context,
+)
 from flask_login import login_required, current_user
-from app.models import Post, Category, Reply, PostVote, ReplyVote
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app.extensions import payload_cache, vote_queue
+from app.http_cache import conditional_json, make_etag
+from app.models import (
+    MAX_REPLY_DEPTH,
+    REPLY_THREAD_ORDER,
+    Post,
+    Category,
+    Reply,
+)
+from app.pagination import (
+    InvalidCursor,
+    order_keyset,
+    paginate_keyset,
+    parse_limit,
+)
+from app.replicas import read_replica
+from app.serializers import (
+    FULL_FIELDS,
+    InvalidFields,
+    SUMMARY_FIELDS,
+    attach_reply_votes,
+    attach_user_votes,
+    build_tree,
+    load_subtrees,
+    parse_fields,
+    post_query,
+    serialize_post,
+    serialize_posts,
+    serialize_reply,
+)
+from app.votes import (
+    MAX_VOTE_BATCH,
+    apply_post_vote,
+    apply_reply_vote,
+    apply_vote_batch,
+)
 from app import db
 
 posts = Blueprint("posts", __name__)
 
 
+# Keyset ordering of each feed by (sort, window); keys end with the id
+FEED_KEYS = {
+    ("new", "all"): (Post.timestamp, Post.id),
+    ("hot", "all"): (Post.hot_score, Post.id),
+    ("top", "all"): (Post.score, Post.id),
+    ("top", "week"): (Post.week_score, Post.id),
+}
+
+
+# Keyset ordering of a post's replies by sort, as (columns, descending)
+REPLY_KEYS = {
+    "old": (REPLY_THREAD_ORDER, False),
+    "new": (REPLY_THREAD_ORDER, True),
+    "top": ((Reply.score, Reply.id), True),
+}
+# Levels of nested replies returned below each reply in tree views
+THREAD_DEPTH = 3
+# Children returned per reply in tree views; the rest are paged with
+# ?parent_id=<reply>&cursor=<replies_next_cursor>
+THREAD_CHILDREN = 3
+
+
+def _current_user_id():
+    return current_user.id if current_user.is_authenticated else None
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Rows fetched from the database and serialized per step of a stream
+STREAM_BATCH_SIZE = 500
+
+
+def _validators(user_id, last_modified, *stamps) -> tuple:
+    """Entity tag and Last-Modified date for a body built for ``user_id``.
+
+    Votes waiting in the write-behind queue change what their voter sees
+    without touching any stored stamp, so they go into the tag, and the
+    date, which cannot reflect them, is left out while there are any.
+    """
+    pending = ()
+    if user_id is not None and vote_queue.enabled:
+        pending = vote_queue.pending_stamp(user_id)
+    etag = make_etag(*stamps, user_id, *pending)
+    return etag, None if pending else last_modified
+
+
+def _wants_stream() -> bool:
+    if request.args.get("stream") in ("1", "true"):
+        return True
+    best = request.accept_mimetypes.best_match(
+        ["application/json", NDJSON_MIMETYPE]
+    )
+    return best == NDJSON_MIMETYPE
+
+
+def _stream_posts(query, fields, user_id):
+    """Yield posts as newline-delimited JSON, one batch at a time.
+
+    Rows are pulled from the cursor STREAM_BATCH_SIZE at a time and nothing
+    holds on to earlier batches, so memory stays flat however many posts
+    match.
+    """
+    rows = iter(query.yield_per(STREAM_BATCH_SIZE))
+    while True:
+        batch = list(islice(rows, STREAM_BATCH_SIZE))
+        if not batch:
+            break
+        documents = serialize_posts(batch, fields)
+        if user_id is not None and "user_vote" in fields:
+            documents = attach_user_votes(documents, user_id)
+        yield "".join(
+            json.dumps(document, separators=(",", ":")) + "\n"
+            for document in documents
+        )
+
+
 @posts.route("/posts", methods=["GET"])
+@read_replica
 def get_posts():
     category_id = request.args.get("category_id", type=int)
-    query = Post.query.order_by(Post.timestamp.desc())
+    limit = parse_limit(request.args.get("limit", type=int))
+    cursor = request.args.get("cursor")
+    sort = request.args.get("sort", "new")
+    window = request.args.get("t", "all") if sort == "top" else "all"
+    keyset = FEED_KEYS.get((sort, window))
+    if keyset is None:
+        return jsonify({"error": "Invalid sort"}), 400
+
+    default_fields = (
+        FULL_FIELDS if request.args.get("view") == "full" else SUMMARY_FIELDS
+    )
+    try:
+        fields = parse_fields(request.args.get("fields"), default_fields)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = post_query(fields, include=keyset)
+    stamp_query = db.session.query(func.max(Post.modified_at))
 
     if category_id:
         query = query.filter_by(category_id=category_id)
+        stamp_query = stamp_query.filter(Post.category_id == category_id)
+
+    user_id = _current_user_id()
+
+    if _wants_stream():
+        # Export mode: every matching post, starting after the cursor if any
+        try:
+            query = order_keyset(query, keyset, cursor)
+        except InvalidCursor:
+            return jsonify({"error": "Invalid cursor"}), 400
+        return Response(
+            stream_with_context(_stream_posts(query, fields, user_id)),
+            mimetype=NDJSON_MIMETYPE,
+        )
+
+    last_modified = stamp_query.scalar()
 
-    posts = query.all()
-    return jsonify([post.to_dict() for post in posts])
+    def build():
+        cache_key = (
+            category_id, sort, window, cursor, limit, fields, last_modified
+        )
+        page = payload_cache.get_page(cache_key)
+        if page is None:
+            posts, next_cursor = paginate_keyset(
+                query, keyset, cursor, limit
+            )
+            page = {
+                "posts": serialize_posts(posts, fields),
+                "next_cursor": next_cursor,
+            }
+            payload_cache.set_page(cache_key, page)
+
+        if user_id is not None and "user_vote" in fields:
+            page = dict(
+                page, posts=attach_user_votes(page["posts"], user_id)
+            )
+        return page
+
+    try:
+        return conditional_json(
+            build,
+            *_validators(user_id, last_modified, last_modified),
+            user_id=user_id,
+            vary_cookie=True,
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
 
 
 @posts.route("/posts/<int:post_id>", methods=["GET"])
+@read_replica
 def get_post(post_id):
-    post = Post.query.get_or_404(post_id)
-    result = post.to_dict()
-    if current_user.is_authenticated:
-        result["user_vote"] = post.get_user_vote(current_user.id)
-    return jsonify(result)
+    stamp = (
+        db.session.query(Post.revision, Post.modified_at)
+        .filter(Post.id == post_id)
+        .first()
+    )
+    if stamp is None:
+        abort(404)
+
+    user_id = _current_user_id()
+
+    def build():
+        document = payload_cache.get_post(post_id, stamp.revision)
+        if document is None:
+            post = post_query().filter(Post.id == post_id).one()
+            document = serialize_post(post)
+            payload_cache.set_post(post_id, stamp.revision, document)
+
+        if user_id is not None:
+            document = attach_user_votes([document], user_id)[0]
+        return document
+
+    return conditional_json(
+        build,
+        *_validators(user_id, stamp.modified_at, post_id, stamp.revision),
+        user_id=user_id,
+        vary_cookie=True,
+    )
+
+
+def _thread_depth():
+    depth = request.args.get("depth", THREAD_DEPTH, type=int)
+    return max(0, min(depth, MAX_REPLY_DEPTH))
+
+
+def _reply_sort():
+    """The requested reply sort as ``(columns, descending)``, or None."""
+    return REPLY_KEYS.get(request.args.get("sort", "old"))
+
+
+def _serialize_replies(replies, user_id) -> list:
+    documents = [reply.to_dict() for reply in replies]
+    if user_id is not None:
+        documents = attach_reply_votes(documents, user_id)
+    return documents
+
+
+@posts.route("/posts/<int:post_id>/replies", methods=["GET"])
+@read_replica
+def get_replies(post_id):
+    """Page through a post's replies.
+
+    Flat by default, every reply in ``sort`` order. With ``view=tree``
+    the pages are of top-level replies, each with the first
+    ``THREAD_CHILDREN`` replies below it, in ``sort`` order, nested
+    ``depth`` levels deep. With ``parent_id`` the pages are of that
+    reply's children instead, which is how a ``replies_next_cursor`` in
+    a tree is followed.
+    """
+    stamp = (
+        db.session.query(Post.revision, Post.modified_at)
+        .filter(Post.id == post_id)
+        .first()
+    )
+    if stamp is None:
+        abort(404)
+
+    limit = parse_limit(request.args.get("limit", type=int))
+    cursor = request.args.get("cursor")
+    if _reply_sort() is None:
+        return jsonify({"error": "Invalid sort"}), 400
+    keyset, descending = _reply_sort()
+    tree = request.args.get("view") == "tree"
+    depth = _thread_depth()
+    user_id = _current_user_id()
+
+    parent_path = "" if tree else None
+    parent_id = request.args.get("parent_id", type=int)
+    if parent_id is not None:
+        parent = Reply.query.filter_by(id=parent_id, post_id=post_id).first()
+        if parent is None:
+            abort(404)
+        parent_path = parent.subtree_path
+
+    def build():
+        query = Reply.query.options(joinedload(Reply.author)).filter(
+            Reply.post_id == post_id
+        )
+        if parent_path is not None:
+            query = query.filter(Reply.path == parent_path)
+        replies, next_cursor = paginate_keyset(
+            query, keyset, cursor, limit, descending
+        )
+        if tree:
+            below, cursors = load_subtrees(
+                replies, depth, THREAD_CHILDREN, keyset, descending
+            )
+            documents = build_tree(
+                _serialize_replies(replies + below, user_id), cursors
+            )
+        else:
+            documents = _serialize_replies(replies, user_id)
+        return {"replies": documents, "next_cursor": next_cursor}
+
+    # Replies and their votes bump the post's revision
+    try:
+        return conditional_json(
+            build,
+            *_validators(
+                user_id, stamp.modified_at, post_id, stamp.revision
+            ),
+            user_id=user_id,
+            vary_cookie=True,
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+
+@posts.route("/replies/<int:reply_id>/thread", methods=["GET"])
+@read_replica
+def get_thread(reply_id):
+    """A reply with the replies below it nested ``depth`` levels deep.
+
+    As in the tree view of ``get_replies``, each reply has at most
+    ``THREAD_CHILDREN`` children, in ``sort`` order.
+    """
+    row = (
+        db.session.query(Reply, Post.revision, Post.modified_at)
+        .options(joinedload(Reply.author))
+        .join(Post, Post.id == Reply.post_id)
+        .filter(Reply.id == reply_id)
+        .first()
+    )
+    if row is None:
+        abort(404)
+    reply, revision, modified_at = row
+    if _reply_sort() is None:
+        return jsonify({"error": "Invalid sort"}), 400
+    keyset, descending = _reply_sort()
+    depth = _thread_depth()
+    user_id = _current_user_id()
+
+    def build():
+        below, cursors = load_subtrees(
+            [reply], depth, THREAD_CHILDREN, keyset, descending
+        )
+        documents = _serialize_replies([reply, *below], user_id)
+        return build_tree(documents, cursors)[0]
+
+    return conditional_json(
+        build,
+        *_validators(user_id, modified_at, reply.post_id, revision),
+        user_id=user_id,
+        vary_cookie=True,
+    )
 
 
 @posts.route("/posts", methods=["POST"])
@@ -54,7 +388,7 @@ def create_post():
     db.session.add(post)
     db.session.commit()
 
-    return jsonify(post.to_dict()), 201
+    return jsonify(serialize_post(post)), 201
 
 
 @posts.route("/posts/<int:post_id>/replies", methods=["POST"])
@@ -69,11 +403,28 @@ def create_reply(post_id):
     reply = Reply(
         content=data["content"], user_id=current_user.id, post_id=post.id
     )
+    parent_id = data.get("parent_id")
+    if parent_id is not None:
+        # bool is an int subclass, but true is not reply 1
+        valid = isinstance(parent_id, int) and not isinstance(parent_id, bool)
+        parent = db.session.get(Reply, parent_id) if valid else None
+        if parent is None or parent.post_id != post.id:
+            return jsonify({"error": "Invalid parent reply"}), 400
+        if parent.depth >= MAX_REPLY_DEPTH:
+            return (
+                jsonify(
+                    {"error": f"Replies nest at most {MAX_REPLY_DEPTH} deep"}
+                ),
+                400,
+            )
+        reply.place_under(parent)
 
     db.session.add(reply)
+    Post.touch(post.id)
     db.session.commit()
+    payload_cache.invalidate_post(post.id)
 
-    return jsonify(reply.to_dict()), 201
+    return jsonify(serialize_reply(reply)), 201
 
 
 @posts.route("/posts/<int:post_id>/vote", methods=["POST"])
@@ -99,27 +450,22 @@ def vote_post(post_id):
             400,
         )
 
-    # Check if user already voted
-    existing_vote = PostVote.query.filter_by(
-        user_id=current_user.id, post_id=post_id
-    ).first()
-
-    if value == 0 and existing_vote:
-        # Remove vote
-        db.session.delete(existing_vote)
-    elif existing_vote:
-        # Update vote
-        existing_vote.value = value
-    elif value != 0:
-        # Create new vote
-        vote = PostVote(user_id=current_user.id, post_id=post_id, value=value)
-        db.session.add(vote)
+    if vote_queue.enabled:
+        # The queued vote is overlaid on the stored totals
+        vote_queue.submit(current_user.id, "post", post.id, value)
+        document = payload_cache.get_post(post.id, post.revision)
+        if document is None:
+            document = serialize_post(post)
+            payload_cache.set_post(post.id, post.revision, document)
+        return jsonify(attach_user_votes([document], current_user.id)[0])
 
+    apply_post_vote(current_user.id, post.id, value)
     db.session.commit()
 
-    result = post.to_dict()
-    result["user_vote"] = post.get_user_vote(current_user.id)
-    return jsonify(result)
+    # Refresh the cached copy rather than letting the next reader rebuild it
+    document = serialize_post(post)
+    payload_cache.set_post(post.id, post.revision, document)
+    return jsonify(attach_user_votes([document], current_user.id)[0])
 
 
 @posts.route("/replies/<int:reply_id>/vote", methods=["POST"])
@@ -145,31 +491,56 @@ def vote_reply(reply_id):
             400,
         )
 
-    # Check if user already voted
-    existing_vote = ReplyVote.query.filter_by(
-        user_id=current_user.id, reply_id=reply_id
-    ).first()
-
-    if value == 0 and existing_vote:
-        # Remove vote
-        db.session.delete(existing_vote)
-    elif existing_vote:
-        # Update vote
-        existing_vote.value = value
-    elif value != 0:
-        # Create new vote
-        vote = ReplyVote(
-            user_id=current_user.id, reply_id=reply_id, value=value
+    if vote_queue.enabled:
+        vote_queue.submit(current_user.id, "reply", reply.id, value)
+        return jsonify(
+            attach_reply_votes([serialize_reply(reply)], current_user.id)[0]
         )
-        db.session.add(vote)
 
+    apply_reply_vote(current_user.id, reply.id, value)
     db.session.commit()
+    payload_cache.invalidate_post(reply.post_id)
 
-    result = reply.to_dict()
-    result["user_vote"] = reply.get_user_vote(current_user.id)
+    result = serialize_reply(reply)
+    result["user_vote"] = value
     return jsonify(result)
 
 
+@posts.route("/votes:batch", methods=["POST"])
+@login_required
+def vote_batch():
+    data = request.get_json()
+
+    if not isinstance(data, dict) or not isinstance(data.get("votes"), list):
+        return jsonify({"error": "Missing votes"}), 400
+    if len(data["votes"]) > MAX_VOTE_BATCH:
+        return (
+            jsonify(
+                {"error": f"At most {MAX_VOTE_BATCH} votes per batch"}
+            ),
+            400,
+        )
+
+    if vote_queue.enabled:
+        # Votes queued earlier must not overwrite these when they flush
+        targets = [
+            (item.get("target_type"), item.get("target_id"))
+            for item in data["votes"]
+            if isinstance(item, dict)
+            and isinstance(item.get("target_id"), int)
+        ]
+        with vote_queue.bypass(current_user.id, targets):
+            results, post_ids = apply_vote_batch(
+                current_user.id, data["votes"]
+            )
+    else:
+        results, post_ids = apply_vote_batch(current_user.id, data["votes"])
+    for post_id in post_ids:
+        payload_cache.invalidate_post(post_id)
+
+    return jsonify({"results": results})
+
+
 '''
 
 def get_posts_by_user(user_id):
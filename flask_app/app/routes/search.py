@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify, request
+from app.pagination import parse_limit
+from app import search_index
+
+search = Blueprint("search", __name__)
+
+# Ranked results are paged by offset; deeper pages are never useful
+MAX_SEARCH_OFFSET = 1000
+
+
+@search.route("/search", methods=["GET"])
+def search_posts():
+    terms = request.args.get("q", "").strip()
+    if not terms:
+        return jsonify({"error": "Missing search query"}), 400
+
+    limit = parse_limit(request.args.get("limit", type=int))
+    offset = request.args.get("offset", 0, type=int)
+    if not 0 <= offset <= MAX_SEARCH_OFFSET:
+        return jsonify({"error": "Invalid offset"}), 400
+
+    # Fetch one extra row to learn whether another page exists
+    results = search_index.search(terms, limit + 1, offset)
+    next_offset = offset + limit if len(results) > limit else None
+    return jsonify({"results": results[:limit], "next_offset": next_offset})
@@ -0,0 +1,161 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+from app.extensions import db
+
+# The schema version is kept in SQLite's header (PRAGMA user_version), so
+# checking it costs one statement instead of reflecting every table.
+# Databases created before versioning read as 0.
+
+
+def _add_missing_schema(connection) -> bool:
+    """Create whatever tables, columns and indexes the models have but the
+    database lacks.
+
+    Returns:
+        Whether anything was added to an existing table
+    """
+    db.metadata.create_all(connection, checkfirst=True)
+    inspector = inspect(connection)
+    changed = False
+    for table in db.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(
+            table.name
+        )}
+        for column in table.columns:
+            if column.name not in existing:
+                # Columns added later all carry server defaults, so SQLite
+                # can fill in existing rows
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {ddl}"
+                )
+                changed = True
+        indexes = {index["name"] for index in inspector.get_indexes(
+            table.name
+        )}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                changed = True
+    return changed
+
+
+def _upgrade_unversioned(connection) -> None:
+    """Bring a database created by ``db.create_all`` on older models up to
+    date: denormalized vote totals, rankings, revisions and search."""
+    if _add_missing_schema(connection):
+        connection.info["backfill"] = True
+
+
+# (version, description, upgrade function taking a Connection), in order
+MIGRATIONS = [
+    (1, "Vote totals, rankings, revisions and search", _upgrade_unversioned),
+    (2, "Admin flag for users", _add_missing_schema),
+    (3, "Reply indexes for paginated replies", _add_missing_schema),
+    # Existing replies become top-level ones through the column defaults
+    (4, "Nested replies", _add_missing_schema),
+    (5, "Indexes for category feeds and vote totals", _add_missing_schema),
+    (6, "Indexes for ranked category feeds", _add_missing_schema),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _stamp(connection, version: int) -> None:
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def upgrade() -> list:
+    """Run every migration newer than the database; needs an app context.
+
+    An empty database is created at the head version directly.
+
+    Returns:
+        The ``(version, description)`` of each migration that ran
+    """
+    from app.search_index import rebuild_search_index
+    from app.votes import rebuild_vote_totals
+
+    applied = []
+    backfill = False
+    with db.engine.begin() as connection:
+        version = current_version(connection)
+        if version == 0 and not inspect(connection).get_table_names():
+            db.metadata.create_all(connection)
+            _stamp(connection, SCHEMA_VERSION)
+            return applied
+
+        for target, description, migrate in MIGRATIONS:
+            if target <= version:
+                continue
+            migrate(connection)
+            _stamp(connection, target)
+            applied.append((target, description))
+        backfill = connection.info.pop("backfill", False)
+
+    if backfill:
+        rebuild_vote_totals()
+        rebuild_search_index()
+    return applied
+
+
+def ensure_schema(app) -> None:
+    """Bring the database to the head version at startup, if allowed.
+
+    At head this is a single PRAGMA. Otherwise the schema is upgraded when
+    ``SCHEMA_AUTO_UPGRADE`` is set, and a warning is logged when not.
+    """
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+    if version == SCHEMA_VERSION:
+        return
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this code "
+            f"({SCHEMA_VERSION})"
+        )
+    if app.config.get("SCHEMA_AUTO_UPGRADE", True):
+        upgrade()
+    else:
+        app.logger.warning(
+            "Database schema is at version %s, code expects %s; run "
+            "`flask schema upgrade`",
+            version,
+            SCHEMA_VERSION,
+        )
+
+
+schema_cli = AppGroup("schema", help="Inspect and upgrade the database.")
+
+
+@schema_cli.command("current")
+def current_command():
+    """Show the database and code schema versions."""
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+    click.echo(f"database: {version}, head: {SCHEMA_VERSION}")
+
+
+@schema_cli.command("upgrade")
+def upgrade_command():
+    """Apply pending migrations."""
+    applied = upgrade()
+    for version, description in applied:
+        click.echo(f"Applied {version}: {description}")
+    click.echo(f"Schema is at version {SCHEMA_VERSION}")
+
+
+@schema_cli.command("stamp")
+@click.argument("version", type=int, default=SCHEMA_VERSION)
+def stamp_command(version):
+    """Record VERSION (default: head) without running migrations."""
+    with db.engine.begin() as connection:
+        _stamp(connection, version)
+    click.echo(f"Stamped {current_app.config['SQLALCHEMY_DATABASE_URI']} "
+               f"at version {version}")
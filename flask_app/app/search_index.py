@@ -0,0 +1,188 @@
+import html
+import re
+
+from sqlalchemy import event, text
+from app.extensions import db
+
+# Posts and replies share one FTS5 table; their rowids are interleaved so
+# the triggers can address an entry without scanning the index.
+POST_ROWID = "{}.id * 2"
+REPLY_ROWID = "{}.id * 2 + 1"
+
+# Relative bm25 weight of a title match over a body match
+TITLE_WEIGHT = 10.0
+
+# Placeholder highlight markers, swapped for <mark> after HTML-escaping
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        title, body, kind UNINDEXED, post_id UNINDEXED,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_search_insert AFTER INSERT ON post
+    BEGIN
+        INSERT INTO search_index (rowid, title, body, kind, post_id)
+        VALUES ({POST_ROWID.format("new")}, new.title, new.content,
+                'post', new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_search_update
+    AFTER UPDATE OF title, content ON post
+    BEGIN
+        DELETE FROM search_index WHERE rowid = {POST_ROWID.format("old")};
+        INSERT INTO search_index (rowid, title, body, kind, post_id)
+        VALUES ({POST_ROWID.format("new")}, new.title, new.content,
+                'post', new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS post_search_delete AFTER DELETE ON post
+    BEGIN
+        DELETE FROM search_index WHERE rowid = {POST_ROWID.format("old")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reply_search_insert AFTER INSERT ON reply
+    BEGIN
+        INSERT INTO search_index (rowid, title, body, kind, post_id)
+        VALUES ({REPLY_ROWID.format("new")}, NULL, new.content,
+                'reply', new.post_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reply_search_update
+    AFTER UPDATE OF content, post_id ON reply
+    BEGIN
+        DELETE FROM search_index WHERE rowid = {REPLY_ROWID.format("old")};
+        INSERT INTO search_index (rowid, title, body, kind, post_id)
+        VALUES ({REPLY_ROWID.format("new")}, NULL, new.content,
+                'reply', new.post_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reply_search_delete AFTER DELETE ON reply
+    BEGIN
+        DELETE FROM search_index WHERE rowid = {REPLY_ROWID.format("old")};
+    END
+    """,
+]
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Create the FTS5 index and its sync triggers alongside the tables."""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in _SCHEMA:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, "after_drop")
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    connection.exec_driver_sql("DROP TABLE IF EXISTS search_index")
+
+
+def rebuild_search_index() -> None:
+    """Re-index every post and reply from scratch."""
+    db.session.execute(text("DELETE FROM search_index"))
+    db.session.execute(
+        text(
+            "INSERT INTO search_index (rowid, title, body, kind, post_id) "
+            f"SELECT {POST_ROWID.format('post')}, title, content, 'post', id "
+            "FROM post"
+        )
+    )
+    db.session.execute(
+        text(
+            "INSERT INTO search_index (rowid, title, body, kind, post_id) "
+            f"SELECT {REPLY_ROWID.format('reply')}, NULL, content, 'reply', "
+            "post_id FROM reply"
+        )
+    )
+    db.session.commit()
+
+
+def build_match_query(terms: str) -> str:
+    """Turn free text into an FTS5 query that cannot raise syntax errors.
+
+    Every word is quoted and the words are ANDed together; the last word
+    also matches as a prefix so results update while the user types.
+    """
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return ""
+    quoted = ['"{}"'.format(word) for word in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet) -> str:
+    if not snippet:
+        return snippet
+    return (
+        html.escape(snippet)
+        .replace(_MARK_START, "<mark>")
+        .replace(_MARK_END, "</mark>")
+    )
+
+
+def search(terms: str, limit: int, offset: int = 0) -> list:
+    """Rank posts and replies matching ``terms`` with bm25.
+
+    Returns:
+        Result dicts with HTML-safe snippets, best match first
+    """
+    match = build_match_query(terms)
+    if not match:
+        return []
+
+    rows = db.session.execute(
+        text(
+            f"""
+            SELECT search_index.kind, search_index.post_id,
+                   search_index.rowid,
+                   bm25(search_index, {TITLE_WEIGHT}, 1.0) AS rank,
+                   snippet(search_index, 0, :start, :end, '…', 12)
+                       AS title_snippet,
+                   snippet(search_index, 1, :start, :end, '…', 24)
+                       AS body_snippet,
+                   post.title AS post_title
+            FROM search_index
+            JOIN post ON post.id = search_index.post_id
+            WHERE search_index MATCH :match
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+            """
+        ),
+        {
+            "match": match,
+            "start": _MARK_START,
+            "end": _MARK_END,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
+
+    results = []
+    for row in rows:
+        result = {
+            "type": row.kind,
+            "post_id": row.post_id,
+            "post_title": row.post_title,
+            "snippet": _highlight(row.body_snippet),
+            "rank": row.rank,
+        }
+        if row.kind == "post":
+            result["title"] = _highlight(row.title_snippet)
+        else:
+            result["reply_id"] = (row.rowid - 1) // 2
+        results.append(result)
+    return results
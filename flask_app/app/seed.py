@@ -0,0 +1,393 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, select, update
+from app import create_app
+from app.extensions import db, password_hasher
+from app.init_categories import DEFAULT_CATEGORIES, add_categories
+from app.models import (
+    MAX_REPLY_DEPTH,
+    PATH_SEGMENT_WIDTH,
+    Category,
+    Post,
+    PostVote,
+    Reply,
+    ReplyVote,
+    User,
+)
+from app.ranking import refresh_rankings
+from app.search_index import create_search_index, rebuild_search_index
+
+# Rows sent to the database per executemany call
+CHUNK_SIZE = 10000
+# Password shared by every generated user
+SEED_PASSWORD = "password123"
+# Search triggers that index rows one at a time as they are inserted
+SEARCH_INSERT_TRIGGERS = ("post_search_insert", "reply_search_insert")
+# No post or reply gets votes from more than this share of the users
+MAX_VOTER_SHARE = 0.9
+# Share of replies that answer an earlier reply rather than the post
+REPLY_NESTING = 0.5
+
+WORDS = (
+    "match goal keeper derby season transfer coach injury league final "
+    "penalty offside striker defence tactics fixture referee trophy "
+    "rivalry comeback lineup squad draft playoff overtime record upset "
+    "captain academy stadium highlights analysis rumour preview"
+).split()
+
+
+def zipf_weights(count: int, exponent: float, rng) -> list:
+    """Popularity weights following Zipf's law, in random order.
+
+    The item at rank k gets weight ``1 / k**exponent``; ranks are shuffled
+    so popularity does not follow insertion order.
+    """
+    weights = [1 / rank**exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+def allocate(total: int, weights, cap: int) -> list:
+    """Split ``total`` items across buckets in proportion to ``weights``,
+    with no bucket above ``cap``.
+
+    Buckets whose share would pass the cap are filled to it and the rest
+    is shared out among the others; fractions are rounded so the result
+    sums to ``total`` unless every bucket is full.
+    """
+    total = min(total, cap * len(weights))
+    capped = set()
+    while True:
+        free = total - cap * len(capped)
+        weight_sum = sum(
+            weight for i, weight in enumerate(weights) if i not in capped
+        )
+        share = free / weight_sum if weight_sum else 0
+        over = [
+            i for i, weight in enumerate(weights)
+            if i not in capped and weight * share > cap
+        ]
+        if not over:
+            break
+        capped.update(over)
+
+    exact = [
+        cap if i in capped else weight * share
+        for i, weight in enumerate(weights)
+    ]
+    counts = [int(value) for value in exact]
+    by_fraction = sorted(
+        (i for i in range(len(weights)) if i not in capped),
+        key=lambda i: exact[i] - counts[i],
+        reverse=True,
+    )
+    for i in by_fraction[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(connection, model, columns, rows) -> int:
+    """Insert tuples of ``columns`` values with chunked ``executemany``.
+
+    Goes straight to the driver: compiling and type-processing millions of
+    rows through SQLAlchemy would take longer than SQLite takes to store
+    them. Columns left out get their server defaults.
+    """
+    statement = (
+        f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+    inserted = 0
+    for chunk in _chunks(rows):
+        connection.exec_driver_sql(statement, chunk)
+        inserted += len(chunk)
+    return inserted
+
+
+def _sql_time(value: datetime) -> str:
+    # The format SQLAlchemy's SQLite DateTime type stores and parses
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _text(rng, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def _next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _vote_rows(rng, counts, target_ids, target_times, voters, first_user,
+               now, totals):
+    """Generate distinct-voter votes for each target, tallying totals.
+
+    Rows are ``(user_id, target_id, value, timestamp)`` tuples.
+    """
+    for target_id, count, created in zip(target_ids, counts, target_times):
+        if not count:
+            continue
+        # Each target gets its own mix of opinion
+        approval = rng.betavariate(4, 1.5)
+        score = upvotes = 0
+        for user_offset in rng.sample(range(voters), count):
+            value = 1 if rng.random() < approval else -1
+            score += value
+            upvotes += value == 1
+            delay = timedelta(seconds=rng.expovariate(1 / 21600))
+            yield (
+                first_user + user_offset,
+                target_id,
+                value,
+                _sql_time(min(created + delay, now)),
+            )
+        totals.append({
+            "b_id": target_id,
+            "b_score": score,
+            "b_upvotes": upvotes,
+            "b_downvotes": count - upvotes,
+        })
+
+
+def _apply_totals(connection, model, totals) -> None:
+    statement = (
+        update(model.__table__)
+        .where(model.__table__.c.id == bindparam("b_id"))
+        .values(
+            score=bindparam("b_score"),
+            upvotes=bindparam("b_upvotes"),
+            downvotes=bindparam("b_downvotes"),
+        )
+    )
+    for chunk in _chunks(totals):
+        connection.execute(statement, chunk)
+
+
+def nest_replies(rng, reply_posts, reply_times, first_id) -> list:
+    """Make a share of each thread's replies answers to earlier ones.
+
+    Answers are moved no earlier than their parents. ``reply_posts`` must
+    list each post's replies together.
+
+    Returns:
+        ``(parent_id, path, depth)`` per reply, as ``Reply.place_under``
+        would set them
+    """
+    nesting = []
+    thread_start = 0
+    for n, i in enumerate(reply_posts):
+        if n and reply_posts[n - 1] != i:
+            thread_start = n
+        if n > thread_start and rng.random() < REPLY_NESTING:
+            parent = rng.randrange(thread_start, n)
+            _, path, depth = nesting[parent]
+            if depth < MAX_REPLY_DEPTH:
+                parent_id = first_id + parent
+                nesting.append((
+                    parent_id,
+                    f"{path}{parent_id:0{PATH_SEGMENT_WIDTH}d}/",
+                    depth + 1,
+                ))
+                reply_times[n] = max(reply_times[n], reply_times[parent])
+                continue
+        nesting.append((None, "", 0))
+    return nesting
+
+
+def seed(users, posts, replies, votes, reply_votes, seed_value=0,
+         exponent=1.1, hot_threads=10, days=30, log=print) -> dict:
+    """Generate a synthetic forum; needs an app context.
+
+    Post popularity follows Zipf's law, which decides how replies and
+    votes spread over posts. The ``hot_threads`` most popular posts are
+    dated within the last day, like live match threads. Rows go in with
+    chunked ``executemany`` inserts in one transaction, bypassing the ORM,
+    so denormalized totals, rankings and the search index are filled in
+    afterwards.
+
+    Returns:
+        Number of rows inserted per table
+    """
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    add_categories(DEFAULT_CATEGORIES)
+    category_ids = db.session.scalars(select(Category.id)).all()
+    password_hash = password_hasher.hash(SEED_PASSWORD)
+    inserted = {}
+    started = time.perf_counter()
+
+    def report(table, count):
+        inserted[table] = count
+        log(f"{table}: {count} rows ({time.perf_counter() - started:.1f}s)")
+
+    with db.engine.begin() as connection:
+        # Indexing in one pass afterwards is much faster than per row
+        for trigger in SEARCH_INSERT_TRIGGERS:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+        first_user = _next_id(connection, User)
+        report("user", _insert(
+            connection,
+            User,
+            ("id", "username", "password_hash", "created_at"),
+            (
+                (first_user + i, f"seed{first_user + i}", password_hash,
+                 _sql_time(now))
+                for i in range(users)
+            ),
+        ))
+
+        first_post = _next_id(connection, Post)
+        post_ids = range(first_post, first_post + posts)
+        post_weights = zipf_weights(posts, exponent, rng)
+        hottest = set(sorted(
+            range(posts), key=post_weights.__getitem__, reverse=True
+        )[:hot_threads])
+        post_times = [
+            now - timedelta(
+                seconds=rng.uniform(0, 86400 if i in hottest else days * 86400)
+            )
+            for i in range(posts)
+        ]
+        reply_counts = allocate(replies, post_weights, cap=replies)
+        report("post", _insert(
+            connection,
+            Post,
+            ("id", "title", "content", "timestamp", "modified_at", "user_id",
+             "category_id", "reply_count"),
+            (
+                (
+                    post_ids[i],
+                    _text(rng, rng.randint(3, 8)).capitalize(),
+                    _text(rng, rng.randint(20, 120)),
+                    _sql_time(post_times[i]),
+                    _sql_time(now),
+                    first_user + rng.randrange(users),
+                    rng.choice(category_ids),
+                    reply_counts[i],
+                )
+                for i in range(posts)
+            ),
+        ))
+
+        first_reply = _next_id(connection, Reply)
+        reply_posts = [
+            i for i, count in enumerate(reply_counts) for _ in range(count)
+        ]
+        reply_times = [
+            min(post_times[i] + timedelta(
+                seconds=rng.expovariate(1 / 7200)
+            ), now)
+            for i in reply_posts
+        ]
+        nesting = nest_replies(rng, reply_posts, reply_times, first_reply)
+        report("reply", _insert(
+            connection,
+            Reply,
+            ("id", "content", "timestamp", "user_id", "post_id", "parent_id",
+             "path", "depth"),
+            (
+                (
+                    first_reply + n,
+                    _text(rng, rng.randint(5, 40)),
+                    _sql_time(reply_times[n]),
+                    first_user + rng.randrange(users),
+                    post_ids[i],
+                    *nesting[n],
+                )
+                for n, i in enumerate(reply_posts)
+            ),
+        ))
+
+        cap = int(users * MAX_VOTER_SHARE)
+        post_totals = []
+        report("post_vote", _insert(
+            connection,
+            PostVote,
+            ("user_id", "post_id", "value", "timestamp"),
+            _vote_rows(
+                rng, allocate(votes, post_weights, cap), post_ids,
+                post_times, users, first_user, now, post_totals,
+            ),
+        ))
+        _apply_totals(connection, Post, post_totals)
+
+        # Replies inherit their thread's popularity, then vary within it
+        reply_weights = [
+            post_weights[i] * rng.paretovariate(1.5) for i in reply_posts
+        ]
+        reply_totals = []
+        report("reply_vote", _insert(
+            connection,
+            ReplyVote,
+            ("user_id", "reply_id", "value", "timestamp"),
+            _vote_rows(
+                rng, allocate(reply_votes, reply_weights, cap),
+                range(first_reply, first_reply + len(reply_posts)),
+                reply_times, users, first_user, now, reply_totals,
+            ),
+        ))
+        _apply_totals(connection, Reply, reply_totals)
+        create_search_index(db.metadata, connection)
+
+    rebuild_search_index()
+    log(f"search index rebuilt ({time.perf_counter() - started:.1f}s)")
+    refresh_rankings(now)
+    log(f"rankings refreshed ({time.perf_counter() - started:.1f}s)")
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the database with a synthetic, skewed forum."
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--replies", type=int, default=200000)
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument("--reply-votes", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed; equal seeds give equal data")
+    parser.add_argument("--zipf", type=float, default=1.1,
+                        help="Zipf exponent of post popularity")
+    parser.add_argument("--hot-threads", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30,
+                        help="age of the oldest generated post")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop all existing data first")
+    args = parser.parse_args()
+
+    app = create_app(routes=False)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+            db.create_all()
+        seed(
+            args.users,
+            args.posts,
+            args.replies,
+            args.votes,
+            args.reply_votes,
+            seed_value=args.seed,
+            exponent=args.zipf,
+            hot_threads=args.hot_threads,
+            days=args.days,
+        )
+        print("Database seeded successfully!")
+
+
+if __name__ == "__main__":
+    main()
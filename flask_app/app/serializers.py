@@ -0,0 +1,422 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, load_only
+from app.extensions import db, vote_queue
+from app.models import (
+    EXCERPT_LENGTH,
+    REPLY_PREVIEW_SIZE,
+    REPLY_THREAD_ORDER,
+    Post,
+    PostVote,
+    Reply,
+    ReplyVote,
+    User,
+)
+from app.pagination import split_page
+from app.votes import vote_deltas
+
+# Post attributes each selectable field needs loaded from the post row
+POST_FIELD_COLUMNS = {
+    "id": (),
+    "title": ("title",),
+    "content": ("content",),
+    "excerpt": ("excerpt",),
+    "timestamp": ("timestamp",),
+    "user_id": ("user_id",),
+    "category_id": ("category_id",),
+    "author": ("user_id",),
+    "category": ("category_id",),
+    "replies": (),
+    "reply_count": ("reply_count",),
+    "score": ("score",),
+    "vote_count": ("score",),
+    "upvotes": ("upvotes",),
+    "downvotes": ("downvotes",),
+    "user_vote": (),
+}
+
+# The complete post document, as returned by Post.to_dict
+FULL_FIELDS = (
+    "id",
+    "title",
+    "content",
+    "timestamp",
+    "user_id",
+    "category_id",
+    "author",
+    "category",
+    "replies",
+    "vote_count",
+    "upvotes",
+    "downvotes",
+    "reply_count",
+    "user_vote",
+)
+
+# The lightweight projection used by list endpoints
+SUMMARY_FIELDS = (
+    "id",
+    "title",
+    "excerpt",
+    "author",
+    "category",
+    "score",
+    "reply_count",
+    "timestamp",
+    "user_vote",
+)
+
+
+class InvalidFields(ValueError):
+    """Raised when a client asks for fields a post does not have."""
+
+
+def parse_fields(fields, default=SUMMARY_FIELDS) -> tuple:
+    """Parse a comma-separated ``fields=`` argument.
+
+    Raises:
+        InvalidFields: if any requested field is unknown, or the argument
+            names no fields at all (such as ``fields=,,``)
+    """
+    if not fields:
+        return default
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if not names:
+        raise InvalidFields("No fields requested")
+    unknown = [name for name in names if name not in POST_FIELD_COLUMNS]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(names))
+
+
+def post_query(fields=FULL_FIELDS, include=()):
+    """Return a post query that loads exactly what ``fields`` needs.
+
+    Unused columns (such as the full ``content`` for summaries) are never
+    read, and authors and categories are joined in only when requested.
+
+    Args:
+        fields: Fields that will be serialized
+        include: Extra Post columns to load, such as a pagination key
+    """
+    columns = {"id"} | {column.key for column in include}
+    for field in fields:
+        columns.update(POST_FIELD_COLUMNS[field])
+
+    options = [load_only(*[getattr(Post, column) for column in columns])]
+    if "author" in fields:
+        options.append(
+            joinedload(Post.author).load_only(User.id, User.username)
+        )
+    if "category" in fields:
+        options.append(joinedload(Post.category))
+    return Post.query.options(*options)
+
+
+def load_replies(post_ids, limit=REPLY_PREVIEW_SIZE + 1) -> dict:
+    """Load the first ``limit`` replies (with authors) of each post in
+    ``post_ids`` in one query.
+
+    Returns:
+        Mapping of post id to its replies in chronological order
+    """
+    replies_by_post = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return replies_by_post
+
+    query = Reply.query.options(joinedload(Reply.author)).order_by(
+        *REPLY_THREAD_ORDER
+    )
+    if len(post_ids) == 1:
+        # One thread can be read straight off the (post_id, timestamp)
+        # index, stopping after ``limit`` rows
+        query = query.filter(Reply.post_id == post_ids[0]).limit(limit)
+    else:
+        position = (
+            func.row_number()
+            .over(partition_by=Reply.post_id, order_by=REPLY_THREAD_ORDER)
+            .label("position")
+        )
+        first = (
+            select(Reply.id, position)
+            .where(Reply.post_id.in_(post_ids))
+            .subquery()
+        )
+        query = query.join(first, Reply.id == first.c.id).filter(
+            first.c.position <= limit
+        )
+    for reply in query:
+        replies_by_post[reply.post_id].append(reply)
+    return replies_by_post
+
+
+def _load_children(parents, columns, descending, limit) -> dict:
+    """Load the first ``limit`` children of each of ``parents`` in
+    ``columns`` order, in one query.
+
+    Returns:
+        Mapping of each parent's ``subtree_path`` to its children
+    """
+    order = [column.desc() if descending else column.asc()
+             for column in columns]
+    position = (
+        func.row_number()
+        .over(partition_by=Reply.path, order_by=order)
+        .label("position")
+    )
+    # A reply's children are exactly the replies whose path is its
+    # subtree_path: one point of the (post_id, path) index each
+    first = (
+        select(Reply.id, position)
+        .where(
+            Reply.post_id.in_({parent.post_id for parent in parents}),
+            Reply.path.in_([parent.subtree_path for parent in parents]),
+        )
+        .subquery()
+    )
+    children = {parent.subtree_path: [] for parent in parents}
+    query = (
+        Reply.query.options(joinedload(Reply.author))
+        .join(first, Reply.id == first.c.id)
+        .filter(first.c.position <= limit)
+        .order_by(Reply.path, first.c.position)
+    )
+    for reply in query:
+        children[reply.path].append(reply)
+    return children
+
+
+def load_subtrees(parents, depth, limit, columns=REPLY_THREAD_ORDER,
+                  descending=False) -> tuple:
+    """Load the replies below each of ``parents``, at most ``depth`` levels
+    further down, with one query per level.
+
+    Each reply brings at most its first ``limit`` children in ``columns``
+    order, and only those are followed further, so a busy branch cannot
+    make the tree unbounded.
+
+    Returns:
+        A ``(replies, cursors)`` tuple. Replies (with authors) come level by
+        level, so every reply comes after its parent and siblings are in
+        order; see ``build_tree``. ``cursors`` maps the id of every reply
+        whose children were loaded to a cursor for the rest of them, or
+        None if there are no more.
+    """
+    replies, cursors = [], {}
+    level = list(parents)
+    for _ in range(depth):
+        if not level:
+            break
+        children = _load_children(level, columns, descending, limit + 1)
+        next_level = []
+        for parent in level:
+            page, cursors[parent.id] = split_page(
+                children[parent.subtree_path], columns, limit
+            )
+            next_level.extend(page)
+        replies.extend(next_level)
+        level = next_level
+    return replies, cursors
+
+
+def build_tree(documents, cursors=None) -> list:
+    """Nest serialized replies under their parents in one pass.
+
+    ``documents`` must list every parent before its children, as
+    ``load_subtrees`` does. Each gets a ``replies`` list of its children,
+    and a ``replies_next_cursor`` if it is in ``cursors``; those whose
+    parent is not among the documents are returned as the top level.
+    """
+    cursors = cursors or {}
+    nodes = {}
+    top_level = []
+    for document in documents:
+        node = dict(document, replies=[])
+        if node["id"] in cursors:
+            node["replies_next_cursor"] = cursors[node["id"]]
+        nodes[node["id"]] = node
+        parent = nodes.get(node["parent_id"])
+        (top_level if parent is None else parent["replies"]).append(node)
+    return top_level
+
+
+def load_user_votes(vote_model, target_column, target_ids, user_id) -> dict:
+    """Fetch one user's votes on many targets with a single ``IN`` query.
+
+    Returns:
+        Mapping of target id to vote value; targets without a vote map to 0
+    """
+    votes = {target_id: 0 for target_id in target_ids}
+    if not target_ids or user_id is None:
+        return votes
+
+    rows = db.session.execute(
+        db.select(target_column, vote_model.value).where(
+            target_column.in_(target_ids), vote_model.user_id == user_id
+        )
+    )
+    for target_id, value in rows:
+        votes[target_id] = value
+    return votes
+
+
+def _excerpt(post) -> str:
+    text = post.excerpt or ""
+    if len(text) > EXCERPT_LENGTH:
+        return text[:EXCERPT_LENGTH].rstrip() + "…"
+    return text
+
+
+_POST_FIELD_GETTERS = {
+    "id": lambda post: post.id,
+    "title": lambda post: post.title,
+    "content": lambda post: post.content,
+    "excerpt": _excerpt,
+    "timestamp": lambda post: post.timestamp.isoformat(),
+    "user_id": lambda post: post.user_id,
+    "category_id": lambda post: post.category_id,
+    "author": lambda post: post.author.to_dict() if post.author else None,
+    "category": (
+        lambda post: post.category.to_dict() if post.category else None
+    ),
+    "score": lambda post: post.vote_count,
+    "vote_count": lambda post: post.vote_count,
+    "upvotes": lambda post: post.upvotes or 0,
+    "downvotes": lambda post: post.downvotes or 0,
+    "reply_count": lambda post: post.reply_count or 0,
+}
+
+
+def serialize_posts(posts, fields=FULL_FIELDS, user_id=None) -> list:
+    """Serialize posts to dicts containing only ``fields``.
+
+    Posts should come from ``post_query(fields)``. Replies and the votes of
+    ``user_id`` are loaded for the whole batch at once, so the
+    number of queries does not depend on how many posts or replies there
+    are. ``user_vote`` is only included for an authenticated ``user_id``.
+    At most ``REPLY_PREVIEW_SIZE`` replies are embedded per post, with a
+    ``replies_next_cursor`` for the rest.
+    """
+    post_ids = [post.id for post in posts]
+    replies_by_post = load_replies(post_ids) if "replies" in fields else {}
+
+    results = []
+    for post in posts:
+        data = {}
+        for field in fields:
+            if field == "replies":
+                replies, next_cursor = split_page(
+                    replies_by_post[post.id],
+                    REPLY_THREAD_ORDER,
+                    REPLY_PREVIEW_SIZE,
+                )
+                data[field] = [reply.to_dict() for reply in replies]
+                data["replies_next_cursor"] = next_cursor
+            elif field != "user_vote":
+                data[field] = _POST_FIELD_GETTERS[field](post)
+        results.append(data)
+
+    if user_id is not None and "user_vote" in fields:
+        results = attach_user_votes(results, user_id)
+    return results
+
+
+def _with_vote(document, stored, pending) -> dict:
+    """Add the user's vote to a document.
+
+    A vote still waiting in the write-behind queue beats the stored one.
+    Stored totals do not include it until the queue flushes, but they do
+    include the stored vote it replaces, so the totals are shifted by the
+    difference.
+    """
+    if pending is None:
+        return dict(document, user_vote=stored)
+    score, upvotes, downvotes = vote_deltas(stored, pending)
+    data = dict(document, user_vote=pending)
+    for field, delta in (
+        ("vote_count", score),
+        ("score", score),
+        ("upvotes", upvotes),
+        ("downvotes", downvotes),
+    ):
+        if field in data:
+            data[field] += delta
+    return data
+
+
+def attach_user_votes(documents, user_id) -> list:
+    """Add ``user_vote`` to serialized posts and their embedded replies.
+
+    Uses one ``IN`` query for the posts and one for the replies. The input
+    documents are left untouched, so they can come straight from a cache.
+    """
+    post_ids = [document["id"] for document in documents]
+    reply_ids = [
+        reply["id"]
+        for document in documents
+        for reply in document.get("replies", ())
+    ]
+    post_votes = load_user_votes(
+        PostVote, PostVote.post_id, post_ids, user_id
+    )
+    reply_votes = load_user_votes(
+        ReplyVote, ReplyVote.reply_id, reply_ids, user_id
+    )
+    pending_posts, pending_replies = {}, {}
+    if vote_queue.enabled:
+        pending_posts = vote_queue.pending_votes(user_id, "post")
+        pending_replies = vote_queue.pending_votes(user_id, "reply")
+
+    results = []
+    for document in documents:
+        post_id = document["id"]
+        data = _with_vote(
+            document, post_votes[post_id], pending_posts.get(post_id)
+        )
+        if "replies" in document:
+            data["replies"] = [
+                _with_vote(
+                    reply,
+                    reply_votes[reply["id"]],
+                    pending_replies.get(reply["id"]),
+                )
+                for reply in document["replies"]
+            ]
+        results.append(data)
+    return results
+
+
+def attach_reply_votes(documents, user_id) -> list:
+    """Add ``user_vote`` to serialized replies with one ``IN`` query."""
+    votes = load_user_votes(
+        ReplyVote,
+        ReplyVote.reply_id,
+        [document["id"] for document in documents],
+        user_id,
+    )
+    pending = {}
+    if vote_queue.enabled:
+        pending = vote_queue.pending_votes(user_id, "reply")
+    return [
+        _with_vote(document, votes[document["id"]], pending.get(document["id"]))
+        for document in documents
+    ]
+
+
+def serialize_post(post, fields=FULL_FIELDS, user_id=None) -> dict:
+    """Serialize a single post; see ``serialize_posts``."""
+    return serialize_posts([post], fields, user_id)[0]
+
+
+def serialize_replies(replies) -> list:
+    """Serialize replies, loading all of their authors in one query."""
+    author_ids = {reply.user_id for reply in replies if reply.user_id}
+    if author_ids:
+        # Populates the identity map, so reply.author resolves without SQL
+        User.query.filter(User.id.in_(author_ids)).all()
+    return [reply.to_dict() for reply in replies]
+
+
+def serialize_reply(reply) -> dict:
+    """Serialize a single reply; see ``serialize_replies``."""
+    return serialize_replies([reply])[0]
@@ -0,0 +1,295 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# How buffered votes survive a crash: "memory" keeps them in memory only,
+# "journal" appends each vote to a file first, and "fsync" also forces
+# every append to disk before the vote is acknowledged
+DURABILITY_LEVELS = ("memory", "journal", "fsync")
+
+
+class VoteQueue:
+    """Write-behind buffer that absorbs vote storms.
+
+    Votes are held in memory keyed by ``(user_id, target_type, target_id)``
+    so repeated votes by one user on one target collapse into the last one,
+    and a background thread writes everything pending in one transaction
+    every ``VOTE_FLUSH_INTERVAL`` seconds, or as soon as
+    ``VOTE_FLUSH_SIZE`` targets are waiting. Totals in the database lag by
+    at most one interval; ``pending_votes`` lets a voter see their own
+    votes before that.
+
+    Every worker process queues and journals its own votes: the journal
+    path gets the process id appended, and on startup a worker takes over
+    the journals of processes that are gone. Workers forked from a loaded
+    app start with an empty queue and their own flusher thread.
+
+    Disabled unless ``VOTE_WRITE_BEHIND`` is set, in which case votes are
+    written synchronously as before.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.journal_base = None
+        self.journal_path = None
+        self._reset()
+        self._thread = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._pending = {}
+        # Votes taken by a flush that has not committed yet; still visible
+        # to ``pending_votes`` so a voter never sees their vote flicker
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._journal = None
+
+    def _after_fork(self):
+        # The parent's votes are its own to flush, and its flusher thread
+        # did not survive the fork
+        self._reset()
+        self._thread = None
+        if self.enabled:
+            self._start()
+
+    def init_app(self, app) -> None:
+        self.shutdown()
+        app.extensions["vote_queue"] = self
+        self.app = app
+        self.enabled = app.config.get("VOTE_WRITE_BEHIND", False)
+        if not self.enabled:
+            return
+
+        self.flush_interval = app.config.get("VOTE_FLUSH_INTERVAL", 0.5)
+        self.flush_size = app.config.get("VOTE_FLUSH_SIZE", 500)
+        self.durability = app.config.get("VOTE_QUEUE_DURABILITY", "journal")
+        if self.durability not in DURABILITY_LEVELS:
+            raise ValueError(
+                f"VOTE_QUEUE_DURABILITY must be one of {DURABILITY_LEVELS}"
+            )
+        self.journal_base = None
+        self.journal_path = None
+        if self.durability != "memory":
+            self.journal_base = app.config.get("VOTE_QUEUE_JOURNAL") or (
+                os.path.join(app.instance_path, "vote-queue.log")
+            )
+            self.journal_path = self._journal_for(os.getpid())
+            self._replay_journals()
+        self._start()
+
+    def _start(self):
+        if self.journal_base is not None:
+            self.journal_path = self._journal_for(os.getpid())
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="vote-queue", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, user_id: int, target_type: str, target_id: int,
+               value: int) -> None:
+        """Queue a vote; a later vote on the same target replaces it."""
+        key = (user_id, target_type, target_id)
+        with self._lock:
+            self._pending[key] = value
+            self._append_journal(key, value)
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def pending_votes(self, user_id: int, target_type: str) -> dict:
+        """Return a user's unflushed votes on ``target_type`` by target id."""
+        with self._lock:
+            votes = {}
+            for source in (self._flushing, self._pending):
+                for (voter, kind, target_id), value in source.items():
+                    if voter == user_id and kind == target_type:
+                        votes[target_id] = value
+            return votes
+
+    def pending_stamp(self, user_id: int) -> tuple:
+        """A user's unflushed votes in a stable order, for entity tags:
+        they change what the user sees without changing any stored
+        stamp."""
+        with self._lock:
+            votes = {}
+            for source in (self._flushing, self._pending):
+                for (voter, kind, target_id), value in source.items():
+                    if voter == user_id:
+                        votes[(kind, target_id)] = value
+        return tuple(sorted(votes.items()))
+
+    @contextmanager
+    def bypass(self, user_id: int, targets):
+        """Hold off flushes while ``user_id`` votes on ``targets`` without
+        the queue, dropping their queued votes on those targets first.
+
+        Otherwise a later flush would replace the newer direct votes.
+
+        Args:
+            targets: ``(target_type, target_id)`` pairs
+        """
+        with self._flush_lock:
+            with self._lock:
+                dropped = [
+                    self._pending.pop((user_id, *target), None) is not None
+                    for target in targets
+                ]
+                if any(dropped):
+                    self._rewrite_journal()
+            yield
+
+    def flush(self) -> set:
+        """Write every pending vote in one transaction.
+
+        Must run inside an app context. If the write fails the votes are
+        put back, behind any newer votes for the same targets.
+
+        Returns:
+            The ids of every post whose document changed
+        """
+        from app.extensions import db, payload_cache
+        from app.votes import flush_votes
+
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return set()
+                self._flushing, self._pending = self._pending, {}
+
+            try:
+                changed_posts = flush_votes(self._flushing)
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._pending = {**self._flushing, **self._pending}
+                    self._flushing = {}
+                raise
+
+            with self._lock:
+                self._flushing = {}
+                self._rewrite_journal()
+        for post_id in changed_posts:
+            payload_cache.invalidate_post(post_id)
+        return changed_posts
+
+    def shutdown(self) -> None:
+        """Stop the flusher thread and write out anything still pending."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        thread.join()
+        with self.app.app_context():
+            self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        atexit.unregister(self.shutdown)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception("Flushing queued votes failed")
+
+    def _append_journal(self, key, value) -> None:
+        if self.journal_path is None:
+            return
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps([*key, value]) + "\n")
+        self._journal.flush()
+        if self.durability == "fsync":
+            os.fsync(self._journal.fileno())
+
+    def _journal_for(self, pid) -> str:
+        root, extension = os.path.splitext(self.journal_base)
+        return f"{root}-{pid}{extension}"
+
+    def _rewrite_journal(self) -> None:
+        """Shrink the journal to the votes that are still pending."""
+        if self.journal_path is None:
+            return
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w") as journal:
+            for key, value in self._pending.items():
+                journal.write(json.dumps([*key, value]) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temp_path, self.journal_path)
+
+    def _replay_journals(self) -> None:
+        """Queue votes left in the journals of processes that died, and
+        make them this process's own."""
+        root, extension = os.path.splitext(self.journal_base)
+        # Journals written before they were kept per process have no pid
+        paths = [self.journal_base, *glob.glob(f"{root}-*{extension}")]
+        replayed = 0
+        for path in paths:
+            pid = path[len(root) + 1:len(path) - len(extension)]
+            if path != self.journal_base and not _orphaned(pid):
+                continue
+            # Claim the journal first, so two workers starting together
+            # never both replay it
+            claimed = f"{self.journal_path}.{os.path.basename(path)}.replay"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as journal:
+                lines = journal.readlines()
+            for line in lines:
+                try:
+                    user_id, target_type, target_id, value = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append
+                    continue
+                self._pending[(user_id, target_type, target_id)] = value
+                replayed += 1
+            # Journal the claimed votes as this process's before letting
+            # go of the old file
+            self._rewrite_journal()
+            os.remove(claimed)
+        if replayed:
+            logger.info("Replaying %d queued votes", len(self._pending))
+
+
+def _orphaned(pid) -> bool:
+    """Whether the journal of process ``pid`` has no live writer: the
+    process is gone, or is this one restarting its queue."""
+    try:
+        pid = int(pid)
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
@@ -0,0 +1,464 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.extensions import db
+from app.models import Post, Reply, PostVote, ReplyVote
+from app.ranking import TOP_WINDOW, hot_rank_sql, refresh_rankings
+
+
+def vote_deltas(old_value: int, new_value: int) -> tuple:
+    """Return how (score, upvotes, downvotes) change between two votes."""
+    return (
+        new_value - old_value,
+        int(new_value == 1) - int(old_value == 1),
+        int(new_value == -1) - int(old_value == -1),
+    )
+
+
+def week_score_delta(old_value: int, old_timestamp, new_value: int,
+                     now=None) -> int:
+    """Return how a vote change moves a post's ``week_score``.
+
+    The changed vote is stamped now, so it counts in full; the vote it
+    replaces only counted if it was cast inside the window.
+    """
+    now = now or datetime.utcnow()
+    counted = (
+        old_value
+        if old_timestamp is not None and old_timestamp >= now - TOP_WINDOW
+        else 0
+    )
+    return new_value - counted
+
+
+def _total_values(model, score_delta, upvote_delta, downvote_delta,
+                  week_delta=None) -> dict:
+    """Build in-database increments for a target's vote totals.
+
+    The increments are rendered as ``score = score + :delta`` so concurrent
+    voters never overwrite each other's changes. Deltas may be literals or
+    bind parameters; ``week_delta`` defaults to the score's.
+    """
+    values = {
+        "score": model.score + score_delta,
+        "upvotes": model.upvotes + upvote_delta,
+        "downvotes": model.downvotes + downvote_delta,
+    }
+    if model is Post:
+        # Keep the ranked feeds current without a separate pass
+        values["week_score"] = Post.week_score + (
+            score_delta if week_delta is None else week_delta
+        )
+        values["hot_score"] = hot_rank_sql(
+            Post, score=Post.score + score_delta
+        )
+    return values
+
+
+def _apply_vote(vote_model, target_model, target_key, user_id, target_id,
+                value, post_id) -> int:
+    existing_vote = vote_model.query.filter_by(
+        user_id=user_id, **{target_key: target_id}
+    ).first()
+    old_value = existing_vote.value if existing_vote else 0
+    old_timestamp = existing_vote.timestamp if existing_vote else None
+    now = datetime.utcnow()
+
+    if value == 0 and existing_vote:
+        # Remove vote
+        db.session.delete(existing_vote)
+    elif existing_vote and old_value != value:
+        # Update vote; the window for top-of-week counts from the change
+        existing_vote.value = value
+        existing_vote.timestamp = now
+    elif not existing_vote and value != 0:
+        # Create new vote
+        db.session.add(
+            vote_model(user_id=user_id, value=value, **{target_key: target_id})
+        )
+
+    if old_value != value:
+        db.session.execute(
+            update(target_model)
+            .where(target_model.id == target_id)
+            .values(
+                **_total_values(
+                    target_model,
+                    *vote_deltas(old_value, value),
+                    week_score_delta(old_value, old_timestamp, value, now),
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        Post.touch(post_id)
+    return old_value
+
+
+def apply_post_vote(user_id: int, post_id: int, value: int) -> int:
+    """Record a user's vote on a post and adjust the post's totals.
+
+    The caller owns the transaction and must commit.
+
+    Returns:
+        The user's previous vote value (0 if they had not voted)
+    """
+    return _apply_vote(
+        PostVote, Post, "post_id", user_id, post_id, value, post_id
+    )
+
+
+def apply_reply_vote(user_id: int, reply_id: int, value: int) -> int:
+    """Record a user's vote on a reply and adjust the reply's totals.
+
+    The caller owns the transaction and must commit.
+
+    Returns:
+        The user's previous vote value (0 if they had not voted)
+    """
+    post_id = (
+        select(Reply.post_id).where(Reply.id == reply_id).scalar_subquery()
+    )
+    return _apply_vote(
+        ReplyVote, Reply, "reply_id", user_id, reply_id, value, post_id
+    )
+
+
+# target_type -> (vote model, target model, vote column naming the target)
+VOTE_TARGETS = {
+    "post": (PostVote, Post, "post_id"),
+    "reply": (ReplyVote, Reply, "reply_id"),
+}
+
+# Largest number of votes accepted in one batch
+MAX_VOTE_BATCH = 100
+
+
+def _validate_vote_item(item):
+    if not isinstance(item, dict):
+        return "Vote must be an object"
+    if item.get("target_type") not in VOTE_TARGETS:
+        return "target_type must be 'post' or 'reply'"
+    if not isinstance(item.get("target_id"), int):
+        return "target_id must be an integer"
+    if item.get("value") not in (1, -1, 0):
+        return (
+            "Invalid vote value. Must be 1 (upvote), -1 (downvote), "
+            "or 0 (remove vote)"
+        )
+    return None
+
+
+def _write_votes(vote_model, target_key, user_id, values) -> None:
+    """Upsert or delete one user's votes on many targets.
+
+    A vote whose value changes is stamped now, as ``_apply_vote`` does.
+    """
+    target_column = getattr(vote_model, target_key)
+    now = datetime.utcnow()
+    upserts = [
+        {"user_id": user_id, target_key: target_id, "value": value,
+         "timestamp": now}
+        for target_id, value in values.items()
+        if value != 0
+    ]
+    removals = [
+        target_id for target_id, value in values.items() if value == 0
+    ]
+
+    if upserts:
+        statement = sqlite_insert(vote_model)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", target_key],
+            set_={
+                "value": statement.excluded.value,
+                "timestamp": statement.excluded.timestamp,
+            },
+            where=vote_model.value != statement.excluded.value,
+        )
+        db.session.execute(statement, upserts)
+    if removals:
+        db.session.execute(
+            delete(vote_model)
+            .where(
+                vote_model.user_id == user_id,
+                target_column.in_(removals),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _adjust_totals(target_model, deltas, week_deltas) -> None:
+    """Apply many (score, upvotes, downvotes) deltas in one executemany.
+
+    ``week_deltas`` holds each post's ``week_score`` delta; it is unused
+    for replies.
+    """
+    is_post = target_model is Post
+    statement = (
+        update(target_model)
+        .where(target_model.id == bindparam("b_id"))
+        .values(
+            **_total_values(
+                target_model,
+                bindparam("b_score"),
+                bindparam("b_upvotes"),
+                bindparam("b_downvotes"),
+                bindparam("b_week") if is_post else None,
+            )
+        )
+    )
+    rows = []
+    for target_id, (score, upvotes, downvotes) in deltas.items():
+        row = {
+            "b_id": target_id,
+            "b_score": score,
+            "b_upvotes": upvotes,
+            "b_downvotes": downvotes,
+        }
+        if is_post:
+            row["b_week"] = week_deltas[target_id]
+        rows.append(row)
+    db.session.connection().execute(statement, rows)
+
+
+def _stage_votes(user_id: int, items, results: list) -> tuple:
+    """Write one user's votes into the open transaction without committing.
+
+    Malformed items and items naming a missing target get an ``error``
+    entry in ``results``.
+
+    Returns:
+        A ``(wanted, applied, post_ids)`` tuple: the surviving items by
+        target with their indexes, the values written per target type, and
+        the ids of every post whose document changed
+    """
+    # (target_type, target_id) -> (value, indexes of the items naming it)
+    wanted = {}
+    for index, item in enumerate(items):
+        error = _validate_vote_item(item)
+        if error:
+            results[index] = {"index": index, "error": error}
+            continue
+        key = (item["target_type"], item["target_id"])
+        indexes = wanted[key][1] if key in wanted else []
+        wanted[key] = (item["value"], indexes + [index])
+
+    applied = {}
+    changed_posts = set()
+    for target_type, targets in VOTE_TARGETS.items():
+        vote_model, target_model, target_key = targets
+        target_column = getattr(vote_model, target_key)
+        values = {
+            target_id: value
+            for (kind, target_id), (value, _) in wanted.items()
+            if kind == target_type
+        }
+        if not values:
+            continue
+
+        parent_column = (
+            target_model.id if target_model is Post else Reply.post_id
+        )
+        parents = dict(
+            db.session.execute(
+                select(target_model.id, parent_column).where(
+                    target_model.id.in_(values)
+                )
+            ).all()
+        )
+        for target_id in set(values) - set(parents):
+            for index in wanted.pop((target_type, target_id))[1]:
+                results[index] = {
+                    "index": index,
+                    "error": f"{target_type.capitalize()} not found",
+                }
+            del values[target_id]
+        if not values:
+            continue
+
+        old_votes = {
+            target_id: (value, timestamp)
+            for target_id, value, timestamp in db.session.execute(
+                select(
+                    target_column, vote_model.value, vote_model.timestamp
+                ).where(
+                    vote_model.user_id == user_id,
+                    target_column.in_(values),
+                )
+            )
+        }
+        old_values = {
+            target_id: old_value
+            for target_id, (old_value, _) in old_votes.items()
+        }
+        deltas = {
+            target_id: vote_deltas(old_values.get(target_id, 0), value)
+            for target_id, value in values.items()
+            if old_values.get(target_id, 0) != value
+        }
+        week_deltas = {
+            target_id: week_score_delta(
+                *old_votes.get(target_id, (0, None)), values[target_id]
+            )
+            for target_id in deltas
+        }
+
+        _write_votes(vote_model, target_key, user_id, values)
+        if deltas:
+            _adjust_totals(target_model, deltas, week_deltas)
+            changed_posts.update(parents[target_id] for target_id in deltas)
+        applied[target_type] = values
+    return wanted, applied, changed_posts
+
+
+def _touch_posts(post_ids) -> None:
+    if post_ids:
+        db.session.execute(
+            update(Post)
+            .where(Post.id.in_(post_ids))
+            .values(revision=Post.revision + 1, modified_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_vote_batch(user_id: int, items) -> tuple:
+    """Apply many votes by one user in a single transaction.
+
+    Each item is a dict with ``target_type`` ("post" or "reply"),
+    ``target_id`` and ``value``. Malformed items and items whose target
+    does not exist are reported and skipped; the rest are written as
+    upserts. If a target appears more than once, the last item wins.
+
+    Returns:
+        A ``(results, post_ids)`` tuple: one result per item in order, each
+        holding the target's new totals and the user's vote or an
+        ``error``, and the ids of every post whose document changed
+    """
+    results = [None] * len(items)
+    wanted, applied, changed_posts = _stage_votes(user_id, items, results)
+    _touch_posts(changed_posts)
+    db.session.commit()
+
+    for target_type, values in applied.items():
+        target_model = VOTE_TARGETS[target_type][1]
+        totals = db.session.execute(
+            select(
+                target_model.id,
+                target_model.score,
+                target_model.upvotes,
+                target_model.downvotes,
+            ).where(target_model.id.in_(values))
+        )
+        for target_id, score, upvotes, downvotes in totals:
+            for index in wanted[(target_type, target_id)][1]:
+                results[index] = {
+                    "index": index,
+                    "target_type": target_type,
+                    "target_id": target_id,
+                    "score": score,
+                    "upvotes": upvotes,
+                    "downvotes": downvotes,
+                    "user_vote": values[target_id],
+                }
+    return results, changed_posts
+
+
+def flush_votes(votes) -> set:
+    """Apply votes by many users in a single transaction.
+
+    Args:
+        votes: Mapping of ``(user_id, target_type, target_id)`` to value;
+            votes whose target has since been deleted are dropped
+
+    Returns:
+        The ids of every post whose document changed
+    """
+    by_user = {}
+    for (user_id, target_type, target_id), value in votes.items():
+        by_user.setdefault(user_id, []).append(
+            {"target_type": target_type, "target_id": target_id,
+             "value": value}
+        )
+
+    changed_posts = set()
+    for user_id, items in by_user.items():
+        changed_posts |= _stage_votes(user_id, items, [None] * len(items))[2]
+    _touch_posts(changed_posts)
+    db.session.commit()
+    return changed_posts
+
+
+def _count_votes(vote_model, target_column, target_model, *criteria):
+    return (
+        select(func.count(vote_model.id))
+        .where(target_column == target_model.id, *criteria)
+        .scalar_subquery()
+    )
+
+
+def _totals(target_model, vote_model, target_column):
+    """Totals recomputed from the votes, and a clause matching the rows
+    of ``target_model`` whose stored totals differ from them."""
+    totals = {
+        "score": select(func.coalesce(func.sum(vote_model.value), 0))
+        .where(target_column == target_model.id)
+        .scalar_subquery(),
+        "upvotes": _count_votes(
+            vote_model, target_column, target_model, vote_model.value == 1
+        ),
+        "downvotes": _count_votes(
+            vote_model, target_column, target_model, vote_model.value == -1
+        ),
+    }
+    stale = or_(*(
+        getattr(target_model, name) != value
+        for name, value in totals.items()
+    ))
+    return totals, stale
+
+
+def rebuild_vote_totals() -> int:
+    """Recompute all post and reply totals from scratch, then re-rank.
+
+    Only rows whose totals were wrong are written. Posts that change, or
+    whose replies do, get a new revision so cached documents and ETags
+    built from the wrong totals are dropped.
+
+    Returns:
+        The number of posts that changed
+    """
+    post_totals, post_stale = _totals(Post, PostVote, PostVote.post_id)
+    reply_totals, reply_stale = _totals(Reply, ReplyVote, ReplyVote.reply_id)
+    reply_count = (
+        select(func.count(Reply.id))
+        .where(Reply.post_id == Post.id)
+        .scalar_subquery()
+    )
+    # Posts first, while the stale replies can still be told apart
+    changed = db.session.execute(
+        update(Post)
+        .where(or_(
+            post_stale,
+            Post.reply_count != reply_count,
+            select(Reply.id)
+            .where(Reply.post_id == Post.id, reply_stale)
+            .exists(),
+        ))
+        .values(
+            **post_totals,
+            reply_count=reply_count,
+            revision=Post.revision + 1,
+            modified_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.execute(
+        update(Reply)
+        .where(reply_stale)
+        .values(**reply_totals)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    refresh_rankings()
+    return changed
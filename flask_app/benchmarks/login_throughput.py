@@ -0,0 +1,111 @@
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from app import create_app
+from app.extensions import db, password_hasher
+from app.models import Category, User
+
+PASSWORD = "password123"
+
+
+def run(method, workers, clients, duration) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(
+            "development",
+            {
+                "SQLALCHEMY_DATABASE_URI": (
+                    f"sqlite:///{os.path.join(directory, 'bench.db')}"
+                ),
+                "SESSION_COOKIE_SECURE": False,
+                "DEBUG": False,
+                "PASSWORD_HASH_METHOD": method,
+                "PASSWORD_HASH_WORKERS": workers,
+            },
+        )
+        with app.app_context():
+            template = User(username="template")
+            template.set_password(PASSWORD)
+            db.session.add_all(
+                User(username=f"user{i}",
+                     password_hash=template.password_hash)
+                for i in range(clients)
+            )
+            db.session.add(Category(name="Match Discussions"))
+            db.session.commit()
+
+        stop = threading.Event()
+        logins = []
+        reads = []
+
+        def login(number):
+            client = app.test_client()
+            body = {"username": f"user{number}", "password": PASSWORD}
+            while not stop.is_set():
+                response = client.post("/api/auth/login", json=body)
+                logins.append(response.status_code)
+
+        def read():
+            client = app.test_client()
+            while not stop.is_set():
+                started = time.perf_counter()
+                client.get("/api/categories")
+                reads.append(time.perf_counter() - started)
+
+        threads = [
+            threading.Thread(target=login, args=(i,)) for i in range(clients)
+        ] + [threading.Thread(target=read)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        rejected = password_hasher.stats()["rejected"]
+        with app.app_context():
+            db.engine.dispose()
+
+    succeeded = logins.count(200)
+    reads.sort()
+    return {
+        "logins_per_second": succeeded / duration,
+        "per_worker": succeeded / duration / max(workers, 1),
+        "rejected": rejected,
+        "read_p50_ms": statistics.median(reads) * 1000 if reads else 0,
+        "read_p95_ms": reads[int(len(reads) * 0.95)] * 1000 if reads else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure login throughput, and the latency of a "
+        "concurrent reader, per password hashing setting."
+    )
+    parser.add_argument(
+        "--methods", nargs="+",
+        default=["pbkdf2:sha256:600000", "scrypt:32768:8:1"],
+    )
+    parser.add_argument("--workers", nargs="+", type=int, default=[0, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'method':<22} {'workers':>7} {'logins/s':>9} {'/worker':>8} "
+          f"{'503s':>6} {'read p50':>9} {'read p95':>9}")
+    for method in args.methods:
+        for workers in args.workers:
+            result = run(method, workers, args.clients, args.duration)
+            print(f"{method:<22} {workers:>7} "
+                  f"{result['logins_per_second']:>9.1f} "
+                  f"{result['per_worker']:>8.1f} {result['rejected']:>6} "
+                  f"{result['read_p50_ms']:>8.1f}ms "
+                  f"{result['read_p95_ms']:>8.1f}ms")
+    print("Benchmark completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from app import create_app
+from app.extensions import db
+from app.models import Category, Post, User
+
+USERS = 20
+POSTS = 200
+PASSWORD = "password123"
+
+
+def seed(app) -> None:
+    with app.app_context():
+        # Hash once; every benchmark user shares the password
+        template = User(username="template")
+        template.set_password(PASSWORD)
+        db.session.add_all(
+            User(username=f"user{i}", password_hash=template.password_hash)
+            for i in range(USERS)
+        )
+        category = Category(name="Match Discussions")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all(
+            Post(
+                title=f"Post {i}",
+                content="Benchmark post " * 20,
+                user_id=1 + i % USERS,
+                category_id=category.id,
+            )
+            for i in range(POSTS)
+        )
+        db.session.commit()
+
+
+def reader(app, stop, stats) -> None:
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.get("/api/posts?sort=new&limit=20")
+        stats.append(("read", response.status_code,
+                      time.perf_counter() - started))
+
+
+def writer(app, user_number, stop, stats) -> None:
+    client = app.test_client()
+    client.post(
+        "/api/auth/login",
+        json={"username": f"user{user_number}", "password": PASSWORD},
+    )
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.post(
+            f"/api/posts/{random.randint(1, POSTS)}/vote",
+            json={"value": random.choice((1, -1, 0))},
+        )
+        stats.append(("write", response.status_code,
+                      time.perf_counter() - started))
+
+
+def run_profile(profile, readers, writers, duration) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        app = create_app(
+            profile,
+            {
+                "SECRET_KEY": "benchmark",
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                "SESSION_COOKIE_SECURE": False,
+                # Measure the database, not the payload cache
+                "PAYLOAD_CACHE_BACKEND": "null",
+                "DEBUG": False,
+                "TESTING": False,
+                # A fresh database, which production would leave for a manual
+                # `flask schema upgrade`
+                "SCHEMA_AUTO_UPGRADE": True,
+            },
+        )
+        seed(app)
+
+        stop = threading.Event()
+        stats = []
+        threads = [
+            threading.Thread(target=reader, args=(app, stop, stats))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(
+                target=writer, args=(app, i % USERS, stop, stats)
+            )
+            for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        with app.app_context():
+            db.engine.dispose()
+
+    result = {"profile": profile}
+    for kind in ("read", "write"):
+        timings = sorted(t for k, status, t in stats if k == kind)
+        errors = sum(1 for k, status, _ in stats
+                     if k == kind and status >= 500)
+        result[kind] = {
+            "per_second": len(timings) / duration,
+            "p50_ms": statistics.median(timings) * 1000 if timings else 0,
+            "p95_ms": (timings[int(len(timings) * 0.95)] * 1000
+                       if timings else 0),
+            "errors": errors,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare concurrent read/write throughput of the "
+        "SQLite settings in each config profile."
+    )
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--profiles", nargs="+", default=["development", "production"]
+    )
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'op':<6} {'ops/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'errors':>7}")
+    for profile in args.profiles:
+        result = run_profile(
+            profile, args.readers, args.writers, args.duration
+        )
+        for kind in ("read", "write"):
+            row = result[kind]
+            print(f"{profile:<12} {kind:<6} {row['per_second']:>8.1f} "
+                  f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                  f"{row['errors']:>7}")
+    print("Benchmark completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Runs in a fresh interpreter per sample, so imports are cold
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+from app.extensions import db
+imported = time.perf_counter()
+app = create_app("development", {
+    "SQLALCHEMY_DATABASE_URI": sys.argv[1], "DEBUG": False,
+})
+created = time.perf_counter()
+app.test_client().get("/api/categories")
+responded = time.perf_counter()
+with app.app_context():
+    db.create_all()
+create_all = time.perf_counter() - responded
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "first_request": responded - created,
+    "total": responded - started,
+    "create_all": create_all,
+}))
+"""
+
+
+def sample(uri) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, uri],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure cold create_app() plus the first request."
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        # The first boot creates the schema; time the boots after it
+        sample(uri)
+        samples = [sample(uri) for _ in range(args.runs)]
+
+    print(f"{'phase':<14} {'median ms':>10} {'max ms':>8}")
+    for phase in ("import", "create_app", "first_request", "total"):
+        values = [run[phase] * 1000 for run in samples]
+        print(f"{phase:<14} {statistics.median(values):>10.1f} "
+              f"{max(values):>8.1f}")
+    values = [run["create_all"] * 1000 for run in samples]
+    print(f"db.create_all() per boot, as before schema versioning: "
+          f"{statistics.median(values):.1f} ms")
+    print("Benchmark completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
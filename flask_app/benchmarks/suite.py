@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event, func, select
+
+from app import create_app
+from app.extensions import db
+from app.models import Post, User
+from app.seed import SEED_PASSWORD, seed
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Dataset sizes per scale; the name is the number of post votes
+SCALES = {
+    "1k": dict(users=100, posts=200, replies=500, votes=1000,
+               reply_votes=200),
+    "100k": dict(users=2000, posts=10000, replies=30000, votes=100000,
+                 reply_votes=20000),
+    "1m": dict(users=10000, posts=50000, replies=200000, votes=1000000,
+               reply_votes=200000),
+}
+
+# Allowed growth over the baseline before a metric counts as a regression.
+# Query counts are exact budgets; timings and memory are noisy.
+LATENCY_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.5
+# Latencies below this many milliseconds are never flagged
+LATENCY_FLOOR_MS = 2.0
+
+# Share of the iterations run for scenarios dominated by deliberate work,
+# such as password hashing
+ITERATION_SHARE = {"login": 0.1}
+
+# Requests sampled under tracemalloc, which slows them down too much to
+# time them in the same pass
+MEMORY_SAMPLES = 10
+
+
+class _Requests:
+    """The requests each scenario makes, drawn from one seeded RNG."""
+
+    def __init__(self, app, rng):
+        self.rng = rng
+        with app.app_context():
+            self.post_ids = db.session.scalars(
+                select(Post.id).order_by(Post.id)
+            ).all()
+            self.username = db.session.scalar(
+                select(User.username).where(
+                    User.id == select(func.min(User.id)).scalar_subquery()
+                )
+            )
+        self.anonymous = app.test_client()
+        self.member = app.test_client()
+        self.login()
+        # Put the member in the user cache now, so its one-off miss is not
+        # billed to whichever member scenario comes first
+        self.member.get("/api/auth/user")
+
+    def _post_id(self):
+        return self.rng.choice(self.post_ids)
+
+    def get_categories(self):
+        return self.anonymous.get("/api/categories")
+
+    def get_posts(self):
+        sort = self.rng.choice(("hot", "new", "top"))
+        return self.anonymous.get(f"/api/posts?sort={sort}&limit=20")
+
+    def get_post(self):
+        return self.anonymous.get(f"/api/posts/{self._post_id()}")
+
+    def get_replies(self):
+        sort = self.rng.choice(("old", "new", "top"))
+        return self.anonymous.get(
+            f"/api/posts/{self._post_id()}/replies?sort={sort}"
+        )
+
+    def get_reply_tree(self):
+        return self.anonymous.get(
+            f"/api/posts/{self._post_id()}/replies?view=tree&sort=top"
+        )
+
+    def vote_post(self):
+        return self.member.post(
+            f"/api/posts/{self._post_id()}/vote",
+            json={"value": self.rng.choice((1, -1, 0))},
+        )
+
+    def create_reply(self):
+        return self.member.post(
+            f"/api/posts/{self._post_id()}/replies",
+            json={"content": "Benchmark reply"},
+        )
+
+    def login(self):
+        return self.member.post(
+            "/api/auth/login",
+            json={"username": self.username, "password": SEED_PASSWORD},
+        )
+
+
+SCENARIOS = (
+    "get_categories",
+    "get_posts",
+    "get_post",
+    "get_replies",
+    "get_reply_tree",
+    "vote_post",
+    "create_reply",
+    "login",
+)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_scenarios(app, iterations=200, seed_value=0, scenarios=SCENARIOS):
+    """Time each scenario through the test client.
+
+    Returns:
+        Mapping of scenario to ``p50_ms``, ``p95_ms``, ``queries`` (the
+        most statements any one request ran) and ``peak_kb``
+    """
+    requests = _Requests(app, random.Random(seed_value))
+    queries = []
+
+    def count(*args):
+        queries[-1] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    results = {}
+    try:
+        for name in scenarios:
+            make_request = getattr(requests, name)
+            timings = []
+            queries.clear()
+            runs = max(int(iterations * ITERATION_SHARE.get(name, 1)), 1)
+            for _ in range(runs):
+                queries.append(0)
+                started = time.perf_counter()
+                response = make_request()
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    raise RuntimeError(
+                        f"{name} failed with {response.status_code}"
+                    )
+
+            tracemalloc.start()
+            for _ in range(MEMORY_SAMPLES):
+                queries.append(0)
+                make_request()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(_percentile(timings, 0.95), 3),
+                "queries": max(queries),
+                "peak_kb": round(peak / 1024, 1),
+            }
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return results
+
+
+def compare(results, baseline) -> list:
+    """Return a message for every metric that regressed past its budget."""
+    regressions = []
+    for name, metrics in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if metrics["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: {metrics['queries']} queries per request, "
+                f"budget {expected['queries']}"
+            )
+        limit = max(
+            expected["p95_ms"] * (1 + LATENCY_TOLERANCE), LATENCY_FLOOR_MS
+        )
+        if metrics["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {metrics['p95_ms']:.1f} ms, baseline "
+                f"{expected['p95_ms']:.1f} ms"
+            )
+        if metrics["peak_kb"] > expected["peak_kb"] * (1 + MEMORY_TOLERANCE):
+            regressions.append(
+                f"{name}: peak {metrics['peak_kb']:.0f} KiB, baseline "
+                f"{expected['peak_kb']:.0f} KiB"
+            )
+    return regressions
+
+
+def load_baseline(path=BASELINE_PATH) -> dict:
+    try:
+        with open(path) as baseline:
+            return json.load(baseline)
+    except FileNotFoundError:
+        return {}
+
+
+def build_app(directory, profile="development"):
+    return create_app(
+        profile,
+        {
+            "SECRET_KEY": "benchmark",
+            "SQLALCHEMY_DATABASE_URI": (
+                f"sqlite:///{os.path.join(directory, 'bench.db')}"
+            ),
+            "SESSION_COOKIE_SECURE": False,
+            "DEBUG": False,
+            # Seeding is all bulk inserts; don't log them as slow queries
+            "SLOW_QUERY_MS": None,
+            # A fresh database, which production would leave for a manual
+            # `flask schema upgrade`
+            "SCHEMA_AUTO_UPGRADE": True,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the main endpoints against a seeded dataset "
+        "and compare with the stored baseline."
+    )
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--profile", default="development",
+                        help="config profile to run the app with")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = build_app(directory, args.profile)
+        with app.app_context():
+            seed(**SCALES[args.scale], log=lambda message: None)
+        results = run_scenarios(app, args.iterations)
+        with app.app_context():
+            db.engine.dispose()
+
+    baseline = load_baseline(args.baseline)
+    expected = baseline.get(args.scale, {})
+    print(f"{'scenario':<15} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} "
+          f"{'peak KiB':>9} {'base p95':>9} {'base q':>7}")
+    for name, metrics in results.items():
+        base = expected.get(name, {})
+        print(f"{name:<15} {metrics['p50_ms']:>8.2f} {metrics['p95_ms']:>8.2f} "
+              f"{metrics['queries']:>8} {metrics['peak_kb']:>9.1f} "
+              f"{base.get('p95_ms', '-'):>9} {base.get('queries', '-'):>7}")
+
+    if args.update_baseline:
+        baseline[args.scale] = results
+        with open(args.baseline, "w") as output:
+            json.dump(baseline, output, indent=2, sort_keys=True)
+            output.write("\n")
+        print(f"Baseline for {args.scale} written to {args.baseline}")
+        return
+
+    regressions = compare(results, expected)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("Benchmark completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,14 @@
+import os
+
+from sqlalchemy.pool import StaticPool
+
+
+def env_flag(name: str) -> bool:
+    """Whether the environment variable ``name`` is set to 1, true or
+    yes."""
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
 class Config:
     SECRET_KEY = "dev"  # Change this in production
     SQLALCHEMY_DATABASE_URI = "sqlite:///forum.db"
@@ -5,3 +16,135 @@ class Config:
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_SAMESITE = "None"
     SESSION_COOKIE_HTTPONLY = True
+
+    # Read-through cache of serialized posts: "lru", "null" or an import
+    # path to a CacheBackend subclass
+    PAYLOAD_CACHE_BACKEND = "lru"
+    PAYLOAD_CACHE_SIZE = 1024
+    PAYLOAD_CACHE_TTL = 60  # seconds
+
+    # Write-behind voting: queue votes in-process and write them in one
+    # transaction per interval instead of one per request
+    VOTE_WRITE_BEHIND = False
+    VOTE_FLUSH_INTERVAL = 0.5  # seconds
+    VOTE_FLUSH_SIZE = 500  # queued targets that trigger an early flush
+    # "memory", "journal" or "fsync"; see app.vote_queue
+    VOTE_QUEUE_DURABILITY = "journal"
+    # Defaults to vote-queue.log in the instance folder; give every worker
+    # process its own file
+    VOTE_QUEUE_JOURNAL = None
+
+    # Read-only replicas for GET traffic, as database URIs; see app.replicas
+    SQLALCHEMY_REPLICAS = []
+    # Seconds a user's reads stay on the primary after they write
+    REPLICA_STICKY_SECONDS = 5
+
+    # werkzeug hash method and cost for new hashes; stored hashes made with
+    # other settings are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+    # Threads that hash passwords, and logins allowed to wait for one
+    # before the rest are turned away with 503
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE_DEPTH = 16
+
+    # Users loaded for authenticated requests, cached per process
+    USER_CACHE_SIZE = 4096
+    USER_CACHE_TTL = 30  # seconds
+
+    # Apply pending schema migrations at startup; otherwise run
+    # `flask schema upgrade` when deploying
+    SCHEMA_AUTO_UPGRADE = True
+
+    # PRAGMAs run on every new SQLite connection; see app.database
+    SQLITE_PRAGMAS = {}
+
+    # Per-request SQL counts and time in a Server-Timing header and the
+    # app.instrumentation log; see app.instrumentation
+    SQL_INSTRUMENTATION = True
+    # Statements slower than this (milliseconds) are logged with their
+    # parameters and query plan; None turns the slow-query log off
+    SLOW_QUERY_MS = 100
+    # Flag a request that runs one statement at least this many times as a
+    # likely N+1 query; None turns the check off
+    N_PLUS_ONE_THRESHOLD = None
+
+    # Request, database pool and cache metrics on /metrics in Prometheus
+    # text format; see app.metrics
+    METRICS_ENABLED = True
+    # Directory shared by the worker processes, which each write their
+    # metrics there so a scrape of any one reports the totals; None keeps
+    # metrics per process. Empty it on every deploy.
+    METRICS_DIR = None
+    # Seconds between a worker's writes to METRICS_DIR
+    METRICS_SYNC_INTERVAL = 5
+
+    # Profile requests with cProfile; see app.profiling
+    PROFILING = False
+    # Fraction of requests profiled at random, e.g. 0.001; admins can also
+    # profile a request with a token from `flask profile token`
+    PROFILE_SAMPLE_RATE = 0
+    PROFILE_TOKEN_MAX_AGE = 24 * 3600  # seconds
+    # Where profiles are written; defaults to profiles/ in the instance
+    # folder
+    PROFILE_DIR = None
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    N_PLUS_ONE_THRESHOLD = 10
+
+
+class TestingConfig(Config):
+    TESTING = True
+    # One in-memory database behind a single shared connection, so
+    # background threads see the same tables as the test
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False},
+    }
+    SESSION_COOKIE_SECURE = False
+    # Cheap hashes keep the suite fast; never use this cost for real users
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+
+
+class ProductionConfig(Config):
+    SECRET_KEY = os.environ.get("SECRET_KEY")
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL", "sqlite:///forum.db"
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_recycle": 3600,
+        "connect_args": {"check_same_thread": False},
+    }
+    SCHEMA_AUTO_UPGRADE = False
+    # /metrics is unauthenticated and exposes latencies, pool state and
+    # cache internals; only serve it where the scraper alone can reach it
+    METRICS_ENABLED = env_flag("METRICS_ENABLED")
+    PASSWORD_HASH_WORKERS = 4
+    PASSWORD_HASH_QUEUE_DEPTH = 32
+    SQLITE_PRAGMAS = {
+        # Readers no longer block behind the writer, or it behind them
+        "journal_mode": "WAL",
+        # Safe with WAL: a crash can lose the last commits, never corrupt
+        "synchronous": "NORMAL",
+        # Wait for the write lock instead of failing with "database is
+        # locked" (milliseconds)
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        # Negative values are KiB: 64 MiB of page cache per connection
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
+# Profiles selectable by name, e.g. FLASK_CONFIG=production
+config = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+    "default": DevelopmentConfig,
+}
@@ -13,6 +13,7 @@ export default function PostPage({ params }: { params: { postId: string } }) {
   const [categories, setCategories] = useState<Category[]>([]);
   const [newComment, setNewComment] = useState('');
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [isClient, setIsClient] = useState(false);
   const router = useRouter();
@@ -67,6 +68,25 @@ export default function PostPage({ params }: { params: { postId: string } }) {
     }
   };
 
+  const handleLoadMoreComments = async () => {
+    if (!post?.replies_next_cursor) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await api.getReplies(params.postId, post.replies_next_cursor);
+      setPost({
+        ...post,
+        replies: [...post.replies, ...page.replies],
+        replies_next_cursor: page.next_cursor
+      });
+    } catch (err) {
+      setError('Failed to load comments');
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleLogout = async () => {
     try {
       await logout();
@@ -102,6 +122,7 @@ export default function PostPage({ params }: { params: { postId: string } }) {
   }
 
   const category = categories.find((c) => c.id === post.category_id)?.name || 'General';
+  const replyCount = post.reply_count ?? post.replies.length;
 
   return (
     <main className="min-h-screen p-4 bg-gradient-to-br from-white to-blue-50">
@@ -175,7 +196,7 @@ export default function PostPage({ params }: { params: { postId: string } }) {
 
         <div className="bg-white rounded-lg shadow-md p-6 mb-8">
           <h2 className="text-2xl font-semibold text-gray-900 mb-6">
-            {post.replies?.length ? `Comments (${post.replies.length})` : 'No comments yet'}
+            {replyCount ? `Comments (${replyCount})` : 'No comments yet'}
           </h2>
           
           <form
@@ -245,6 +266,18 @@ export default function PostPage({ params }: { params: { postId: string } }) {
               </div>
             ))}
           </div>
+
+          {post.replies_next_cursor && (
+            <div className="flex justify-center mt-6">
+              <button
+                onClick={handleLoadMoreComments}
+                className="btn-secondary"
+                disabled={loadingMore}
+              >
+                {loadingMore ? 'Loading...' : 'Load more comments'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </main>
@@ -12,6 +12,8 @@ export default function Forum() {
   const [posts, setPosts] = useState<Post[]>([]);
   const [categories, setCategories] = useState<Category[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<number | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [title, setTitle] = useState('');
   const [content, setContent] = useState('');
   const [categoryId, setCategoryId] = useState('');
@@ -34,11 +36,12 @@ export default function Forum() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [postsData, categoriesData] = await Promise.all([
+        const [postsPage, categoriesData] = await Promise.all([
           api.getPosts(),
           api.getCategories()
         ]);
-        setPosts(postsData);
+        setPosts(postsPage.posts);
+        setNextCursor(postsPage.next_cursor);
         setCategories(categoriesData);
       } catch (err) {
         console.log(err);
@@ -58,7 +61,9 @@ export default function Forum() {
         content,
         category_id: parseInt(categoryId)
       });
-      setPosts([newPost, ...posts]);
+      if (selectedCategory === null || newPost.category_id === selectedCategory) {
+        setPosts([newPost, ...posts]);
+      }
       setTitle('');
       setContent('');
       setCategoryId('');
@@ -68,6 +73,35 @@ export default function Forum() {
     }
   };
 
+  // The feed is filtered by the server, so each category pages on its own
+  const handleCategoryChange = async (categoryId: number | null) => {
+    setSelectedCategory(categoryId);
+    try {
+      const page = await api.getPosts({ categoryId });
+      setPosts(page.posts);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      console.log(err);
+      setError('Failed to load posts');
+    }
+  };
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await api.getPosts({ cursor: nextCursor, categoryId: selectedCategory });
+      setPosts([...posts, ...page.posts]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      console.log(err);
+      setError('Failed to load posts');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleLogout = async () => {
     try {
       await api.logout();
@@ -77,10 +111,6 @@ export default function Forum() {
     }
   };
 
-  const filteredPosts = selectedCategory
-    ? posts.filter(post => post.category_id === selectedCategory)
-    : posts;
-
   return (
     <main className="min-h-screen p-4 sm:p-8">
       <div className="max-w-4xl mx-auto">
@@ -164,7 +194,7 @@ export default function Forum() {
 
         <div className="flex gap-4 mb-6 overflow-x-auto pb-2">
           <button
-            onClick={() => setSelectedCategory(null)}
+            onClick={() => handleCategoryChange(null)}
             className={`px-4 py-2 rounded-lg text-sm font-medium transition-colors duration-200 ${
               selectedCategory === null
                 ? 'bg-blue-600 text-white'
@@ -176,7 +206,7 @@ export default function Forum() {
           {categories.map(category => (
             <button
               key={category.id}
-              onClick={() => setSelectedCategory(category.id)}
+              onClick={() => handleCategoryChange(category.id)}
               className={`px-4 py-2 rounded-lg text-sm font-medium transition-colors duration-200 ${
                 selectedCategory === category.id
                   ? 'bg-blue-600 text-white'
@@ -189,7 +219,7 @@ export default function Forum() {
         </div>
 
         <div className="space-y-4">
-          {filteredPosts.map((post) => (
+          {posts.map((post) => (
             <div
               key={post.id}
               className="bg-white rounded-lg shadow-md p-6 hover:shadow-lg transition-shadow"
@@ -233,6 +263,18 @@ export default function Forum() {
             </div>
           ))}
         </div>
+
+        {nextCursor && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={handleLoadMore}
+              className="btn-secondary"
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more posts'}
+            </button>
+          </div>
+        )}
       </div>
     </main>
   );
@@ -12,7 +12,9 @@ export default function Forum() {
   const [posts, setPosts] = useState<Post[]>([]);
   const [categories, setCategories] = useState<Category[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<string>('All');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const router = useRouter();
   const { user, logout } = useAuth();
@@ -25,11 +27,12 @@ export default function Forum() {
 
     const fetchData = async () => {
       try {
-        const [postsData, categoriesData] = await Promise.all([
+        const [postsPage, categoriesData] = await Promise.all([
           api.getPosts(),
           api.getCategories()
         ]);
-        setPosts(postsData);
+        setPosts(postsPage.posts);
+        setNextCursor(postsPage.next_cursor);
         setCategories(categoriesData);
       } catch (err) {
         setError('Failed to load data');
@@ -51,8 +54,39 @@ export default function Forum() {
     }
   };
 
-  const handleCategoryChange = (category: string) => {
+  // The feed is filtered by the server, so each category pages on its own
+  const categoryIdFor = (category: string) =>
+    categories.find(c => c.name === category)?.id ?? null;
+
+  const handleCategoryChange = async (category: string) => {
     setSelectedCategory(category);
+    try {
+      const page = await api.getPosts({ categoryId: categoryIdFor(category) });
+      setPosts(page.posts);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError('Failed to load posts');
+      console.error(err);
+    }
+  };
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await api.getPosts({
+        cursor: nextCursor,
+        categoryId: categoryIdFor(selectedCategory)
+      });
+      setPosts([...posts, ...page.posts]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError('Failed to load posts');
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
   if (loading) {
@@ -71,13 +105,6 @@ export default function Forum() {
     );
   }
 
-  const filteredPosts = selectedCategory === 'All'
-    ? posts
-    : posts.filter(post => {
-      const postCategory = categories.find(c => c.id === post.category_id)?.name || 'General';
-      return postCategory === selectedCategory;
-    });
-
   return (
     <main className="min-h-screen bg-gradient-to-br from-white to-blue-50 p-6">
       <div className="max-w-5xl mx-auto">
@@ -127,7 +154,7 @@ export default function Forum() {
 
         {/* Posts */}
         <div className="grid gap-6">
-          {filteredPosts.map((post) => {
+          {posts.map((post) => {
             const category = categories.find(c => c.id === post.category_id)?.name || 'General';
 
             return (
@@ -180,6 +207,18 @@ export default function Forum() {
             );
           })}
         </div>
+
+        {nextCursor && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={handleLoadMore}
+              className="bg-gray-100 hover:bg-gray-200 text-gray-700 font-medium py-2 px-4 rounded-lg border transition"
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more posts'}
+            </button>
+          </div>
+        )}
       </div>
     </main>
   );
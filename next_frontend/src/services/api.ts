@@ -1,4 +1,4 @@
-import { Post, Category, CreatePostData, VoteData, Reply } from '@/types';
+import { Post, PostPage, Category, CreatePostData, VoteData, Reply, ReplyPage } from '@/types';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5001/api';
 
@@ -72,8 +72,15 @@ export const api = {
   },
 
   // Posts
-  getPosts: async (): Promise<Post[]> => {
-    const response = await fetch(`${API_URL}/posts`, {
+  // One page of the feed; pass the previous page's next_cursor for the next one
+  getPosts: async (
+    options: { cursor?: string | null; categoryId?: number | null } = {}
+  ): Promise<PostPage> => {
+    const params = new URLSearchParams();
+    if (options.categoryId) params.set('category_id', String(options.categoryId));
+    if (options.cursor) params.set('cursor', options.cursor);
+    const query = params.toString();
+    const response = await fetch(`${API_URL}/posts${query ? `?${query}` : ''}`, {
       credentials: 'include',
     });
 
@@ -82,18 +89,19 @@ export const api = {
     }
 
     const data = await response.json();
-    return data.map((post: any) => ({
+    const posts = data.posts.map((post: any) => ({
       id: post.id,
       title: post.title,
-      content: post.content,
+      content: post.content ?? post.excerpt ?? '',
       created_at: post.created_at || post.timestamp,
       category_id: post.category_id || post.category?.id,
       user_id: post.user_id || post.author?.id,
       username: post.username || post.author?.username,
       replies: post.replies || [],
-      vote_count: post.vote_count || 0,
+      vote_count: post.vote_count ?? post.score ?? 0,
       user_vote: post.user_vote || 0
     }));
+    return { posts, next_cursor: data.next_cursor ?? null };
   },
 
   getPost: async (postId: string): Promise<Post> => {
@@ -115,6 +123,8 @@ export const api = {
       user_id: post.user_id || post.author?.id,
       username: post.username || post.author?.username,
       replies: post.replies || [],
+      reply_count: post.reply_count ?? post.replies?.length ?? 0,
+      replies_next_cursor: post.replies_next_cursor ?? null,
       vote_count: post.vote_count || 0,
       user_vote: post.user_vote || 0
     };
@@ -150,6 +160,30 @@ export const api = {
   },
 
   // Replies
+  getReplies: async (postId: string, cursor: string): Promise<ReplyPage> => {
+    const params = new URLSearchParams({ cursor });
+    const response = await fetch(`${API_URL}/posts/${postId}/replies?${params}`, {
+      credentials: 'include',
+    });
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch replies');
+    }
+
+    const data = await response.json();
+    return {
+      replies: data.replies.map((reply: any) => ({
+        id: reply.id,
+        content: reply.content,
+        timestamp: reply.timestamp,
+        author: reply.author || { username: reply.username || '' },
+        vote_count: reply.vote_count || 0,
+        user_vote: reply.user_vote || 0
+      })),
+      next_cursor: data.next_cursor ?? null
+    };
+  },
+
   createReply: async (postId: string, data: { content: string }): Promise<Reply> => {
     const response = await fetch(`${API_URL}/posts/${postId}/replies`, {
       method: 'POST',
@@ -12,6 +12,8 @@ export interface Post {
   user_id: number;
   username: string;
   replies: Reply[];
+  reply_count?: number;
+  replies_next_cursor?: string | null;  // Cursor for the replies after the embedded ones
   vote_count?: number;
   user_vote?: number;  // 1 for upvote, -1 for downvote, 0 or undefined if no vote
 }
@@ -30,6 +32,16 @@ export interface Reply {
   post_id?: number;
 }
 
+export interface PostPage {
+  posts: Post[];
+  next_cursor: string | null;
+}
+
+export interface ReplyPage {
+  replies: Reply[];
+  next_cursor: string | null;
+}
+
 export interface CreatePostData {
   title: string;
   content: string;